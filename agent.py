@@ -8,11 +8,13 @@ from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Awaitable, Coroutine, Dict
 from enum import Enum
+import json
+import time
 import uuid
 import models
 
 from python.helpers import extract_tools, files, errors, history, tokens
-from python.helpers import dirty_json
+from python.helpers import dirty_json, prompt_cache, utility_cache
 from python.helpers.print_style import PrintStyle
 from langchain_core.prompts import (
     ChatPromptTemplate,
@@ -20,7 +22,7 @@ from langchain_core.prompts import (
 from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
 
 import python.helpers.log as Log
-from python.helpers.dirty_json import DirtyJson
+from python.helpers.dirty_json import DirtyJson, DirtyJsonStream
 from python.helpers.defer import DeferredTask
 from typing import Callable
 from python.helpers.localization import Localization
@@ -35,6 +37,7 @@ class AgentContextType(Enum):
 class AgentContext:
 
     _contexts: dict[str, "AgentContext"] = {}
+    _unloaded: dict[str, dict[str, Any]] = {}  # saved chats loaded on first access, id -> index entry
     _counter: int = 0
 
     def __init__(
@@ -65,21 +68,32 @@ class AgentContext:
         self.no = AgentContext._counter
         # set to start of unix epoch
         self.last_message = last_message or datetime.now(timezone.utc)
+        self.accessed = time.monotonic()  # idle contexts are unloaded after a while
 
         existing = self._contexts.get(self.id, None)
         if existing:
             AgentContext.remove(self.id)
         self._contexts[self.id] = self
+        self._unloaded.pop(self.id, None)
 
     @staticmethod
     def get(id: str):
-        return AgentContext._contexts.get(id, None)
+        context = AgentContext._contexts.get(id, None)
+        if context is None and id in AgentContext._unloaded:
+            from python.helpers import persist_chat
+
+            context = persist_chat.hydrate_chat(id)
+        if context:
+            context.accessed = time.monotonic()
+        return context
 
     @staticmethod
     def first():
-        if not AgentContext._contexts:
-            return None
-        return list(AgentContext._contexts.values())[0]
+        if AgentContext._contexts:
+            return list(AgentContext._contexts.values())[0]
+        if AgentContext._unloaded:
+            return AgentContext.get(next(iter(AgentContext._unloaded)))
+        return None
 
     @staticmethod
     def all():
@@ -87,6 +101,7 @@ class AgentContext:
 
     @staticmethod
     def remove(id: str):
+        AgentContext._unloaded.pop(id, None)
         context = AgentContext._contexts.pop(id, None)
         if context and context.task:
             context.task.kill()
@@ -114,6 +129,27 @@ class AgentContext:
             "type": self.type.value,
         }
 
+    @staticmethod
+    def serialize_unloaded(entry: dict[str, Any]):
+        # same fields as serialize() from the chat index entry, without loading the chat
+        localization = Localization.get()
+        return {
+            "id": entry["id"],
+            "name": entry.get("name"),
+            "created_at": localization.serialize_datetime(
+                datetime.fromisoformat(entry["created_at"])
+            ),
+            "no": entry["no"],
+            "log_guid": "",
+            "log_version": 0,
+            "log_length": 0,
+            "paused": False,
+            "last_message": localization.serialize_datetime(
+                datetime.fromisoformat(entry["last_message"])
+            ),
+            "type": entry.get("type", AgentContextType.USER.value),
+        }
+
     @staticmethod
     def log_to_all(
         type: Log.Type,
@@ -160,6 +196,13 @@ class AgentContext:
         current_agent = self.get_agent()
 
         if self.task and self.task.is_alive():
+            # parallel subordinates do not stream, every running branch of a fan-out gets the message
+            branches = list(current_agent.get_data(Agent.DATA_NAME_BRANCHES) or [])
+            while branches:
+                branch = branches.pop()
+                branch.intervention = msg
+                branches += branch.get_data(Agent.DATA_NAME_BRANCHES) or []
+
             # set intervention messages to agent(s):
             intervention_agent = current_agent
             while intervention_agent and broadcast_level != 0:
@@ -213,6 +256,8 @@ class AgentConfig:
     prompts_subdir: str = ""
     memory_subdir: str = ""
     knowledge_subdirs: list[str] = field(default_factory=lambda: ["default", "custom"])
+    parallel_tools: bool = False
+    subordinates_concurrency: int = 3
     code_exec_docker_enabled: bool = False
     code_exec_docker_name: str = "A0-dev"
     code_exec_docker_image: str = "agent0ai/agent-zero-run:development"
@@ -271,11 +316,23 @@ class HandledException(Exception):
     pass
 
 
+def _content_blocks(content: str | list) -> list:
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return [
+        block if isinstance(block, dict) else {"type": "text", "text": block}
+        for block in content
+    ]
+
+
 class Agent:
 
     DATA_NAME_SUPERIOR = "_superior"
     DATA_NAME_SUBORDINATE = "_subordinate"
+    DATA_NAME_SUBORDINATES = "_subordinates"  # parallel subordinates of the last fan-out
+    DATA_NAME_BRANCHES = "_branches"  # parallel subordinates still running
     DATA_NAME_CTX_WINDOW = "ctx_window"
+    DATA_NAME_CTX_WINDOW_MESSAGES = "_ctx_window_messages"
 
     def __init__(
         self, number: int, config: AgentConfig, context: AgentContext | None = None
@@ -289,6 +346,7 @@ class Agent:
 
         # non-config vars
         self.number = number
+        self.branch: int | None = None
         self.agent_name = f"A{self.number}"
 
         self.history = history.History(self)
@@ -309,7 +367,8 @@ class Agent:
                 # let the agent run message loop until he stops it with a response tool
                 while True:
 
-                    self.context.streaming_agent = self  # mark self as current streamer
+                    if not self.in_branch():
+                        self.context.streaming_agent = self  # mark self as current streamer
                     self.loop_data.iteration += 1
                     self.loop_data.params_temporary = {}  # clear temporary params
 
@@ -336,7 +395,7 @@ class Agent:
                             if chunk == full:
                                 printer.print("Response: ")  # start of response
                             printer.stream(chunk)
-                            await self.handle_response_stream(full)
+                            await self.handle_response_stream(full, chunk)
 
                         # call main LLM
                         agent_response, _reasoning = await self.call_chat_model(
@@ -393,7 +452,8 @@ class Agent:
             except Exception as e:
                 self.handle_critical_exception(e)
             finally:
-                self.context.streaming_agent = None  # unset current streamer
+                if not self.in_branch():
+                    self.context.streaming_agent = None  # unset current streamer
                 # call monologue_end extensions
                 await self.call_extensions("monologue_end", loop_data=self.loop_data)  # type: ignore
 
@@ -405,7 +465,8 @@ class Agent:
 
         # set system prompt and message history
         loop_data.system = await self.get_system_prompt(self.loop_data)
-        loop_data.history_output = self.history.output()
+        history_output, history_langchain = self.history.output_cached()
+        loop_data.history_output = list(history_output)
 
         # and allow extensions to edit them
         await self.call_extensions("message_loop_prompts_after", loop_data=loop_data)
@@ -414,7 +475,7 @@ class Agent:
         system_text = "\n\n".join(loop_data.system)
 
         # join extras
-        extras = history.Message(
+        extras_msg = history.Message(
             False,
             content=self.read_prompt(
                 "agent.context.extras.md",
@@ -422,32 +483,77 @@ class Agent:
                     {**loop_data.extras_persistent, **loop_data.extras_temporary}
                 ),
             ),
-        ).output()
+        )
+        extras = extras_msg.output()
         loop_data.extras_temporary.clear()
 
-        # convert history + extras to LLM format
-        history_langchain: list[BaseMessage] = history.output_langchain(
-            loop_data.history_output + extras
-        )
+        # convert history + extras to LLM format, history conversion is reused unless extensions edited it
+        if len(loop_data.history_output) != len(history_output) or any(
+            a is not b for a, b in zip(loop_data.history_output, history_output)
+        ):
+            history_langchain = history.output_langchain(loop_data.history_output)
+            history_tokens = tokens.approximate_tokens(
+                history.output_text(loop_data.history_output)
+            )
+        else:
+            history_tokens = self.history.get_tokens()
+        extras_langchain = history.output_langchain(extras)
+        if self.config.chat_model.prompt_cache:
+            history_langchain = self.layout_cached_prompt(
+                history_langchain, extras_langchain
+            )
+            system_message = SystemMessage(
+                content=system_text, additional_kwargs={models.CACHE_BREAKPOINT: -1}
+            )
+        else:
+            history_langchain = history.append_langchain(
+                history_langchain, extras_langchain
+            )
+            system_message = SystemMessage(content=system_text)
 
         # build full prompt from system prompt, message history and extrS
         full_prompt: list[BaseMessage] = [
-            SystemMessage(content=system_text),
+            system_message,
             *history_langchain,
         ]
-        full_text = ChatPromptTemplate.from_messages(full_prompt).format()
 
-        # store as last context window content
+        # store as last context window content, text is only rendered when requested
+        # messages are kept under a private key so they are not persisted with the chat
+        self.set_data(Agent.DATA_NAME_CTX_WINDOW_MESSAGES, full_prompt)
         self.set_data(
             Agent.DATA_NAME_CTX_WINDOW,
             {
-                "text": full_text,
-                "tokens": tokens.approximate_tokens(full_text),
+                "tokens": tokens.approximate_tokens_for_limit(
+                    system_text, self.config.chat_model.ctx_length
+                )
+                + history_tokens
+                + extras_msg.get_tokens(),
             },
         )
 
         return full_prompt
 
+    def layout_cached_prompt(
+        self, history_langchain: list[BaseMessage], extras: list[BaseMessage]
+    ) -> list[BaseMessage]:
+        # history is the stable prefix, volatile extras (datetime, memories...) stay behind the breakpoint
+        if not history_langchain:
+            return extras
+        last = history_langchain[-1]
+        if extras and isinstance(last, type(extras[0])):
+            # same role, extras become trailing content blocks of the last message
+            content = _content_blocks(last.content)
+            last = type(last)(
+                content=[*content, *_content_blocks(extras[0].content)],
+                additional_kwargs={models.CACHE_BREAKPOINT: len(content) - 1},
+            )
+            extras = extras[1:]
+        else:
+            last = type(last)(
+                content=last.content, additional_kwargs={models.CACHE_BREAKPOINT: -1}
+            )
+        return [*history_langchain[:-1], last, *extras]
+
     def handle_critical_exception(self, exception: Exception):
         if isinstance(exception, HandledException):
             raise exception  # Re-raise the exception to kill the loop
@@ -487,8 +593,8 @@ class Agent:
         ):  # if agent has custom folder, use it and use default as backup
             prompt_dir = files.get_abs_path("prompts", self.config.prompts_subdir)
             backup_dir.append(files.get_abs_path("prompts/default"))
-        prompt = files.parse_file(
-            files.get_abs_path(prompt_dir, file), _backup_dirs=backup_dir, **kwargs
+        prompt = prompt_cache.parse_prompt(
+            files.get_abs_path(prompt_dir, file), backup_dir, **kwargs
         )
         return prompt
 
@@ -500,8 +606,8 @@ class Agent:
         ):  # if agent has custom folder, use it and use default as backup
             prompt_dir = files.get_abs_path("prompts", self.config.prompts_subdir)
             backup_dir.append(files.get_abs_path("prompts/default"))
-        prompt = files.read_file(
-            files.get_abs_path(prompt_dir, file), _backup_dirs=backup_dir, **kwargs
+        prompt = prompt_cache.read_prompt(
+            files.get_abs_path(prompt_dir, file), backup_dir, **kwargs
         )
         prompt = files.remove_code_fences(prompt)
         return prompt
@@ -509,6 +615,37 @@ class Agent:
     def get_data(self, field: str):
         return self.data.get(field, None)
 
+    def set_branch(self, branch: int):
+        # parallel subordinates share the number, the branch tells them apart
+        self.branch = branch
+        self.agent_name = f"A{self.number}.{branch}"
+
+    def in_branch(self) -> bool:
+        # parallel subordinates and agents below them leave the streaming agent to the superior
+        agent: Agent | None = self
+        while agent:
+            if agent.branch is not None:
+                return True
+            agent = agent.get_data(Agent.DATA_NAME_SUPERIOR)
+        return False
+
+    def get_subordinates(self) -> list["Agent"]:
+        subordinates = []
+        subordinate = self.get_data(Agent.DATA_NAME_SUBORDINATE)
+        if subordinate:
+            subordinates.append(subordinate)
+        subordinates += self.get_data(Agent.DATA_NAME_SUBORDINATES) or []
+        return subordinates
+
+    def get_ctx_window(self) -> dict | None:
+        window = self.get_data(Agent.DATA_NAME_CTX_WINDOW)
+        if not window or not isinstance(window, dict):
+            return None
+        # messages are not persisted, a restored chat only knows the token count
+        messages = self.get_data(Agent.DATA_NAME_CTX_WINDOW_MESSAGES)
+        text = ChatPromptTemplate.from_messages(messages).format() if messages else ""
+        return {"text": text, "tokens": window.get("tokens", 0)}
+
     def set_data(self, field: str, value):
         self.data[field] = value
 
@@ -570,6 +707,7 @@ class Agent:
         return models.get_chat_model(
             self.config.chat_model.provider,
             self.config.chat_model.name,
+            prompt_cache=self.config.chat_model.prompt_cache,
             **self.config.chat_model.build_kwargs(),
         )
 
@@ -600,9 +738,33 @@ class Agent:
         message: str,
         callback: Callable[[str], Awaitable[None]] | None = None,
         background: bool = False,
+        interruptible: bool = True,
+        semantic_cache: bool = False,
     ):
         model = self.get_utility_model()
 
+        # repeated summaries and query rewrites are answered from the response cache
+        # similar instead of equal messages only for short calls that opt in, like query rewrites
+        cache, cache_model, embedding = None, "", None
+        if self.config.utility_model.response_cache:
+            cache = utility_cache.get_cache()
+            cache_model = self.get_utility_cache_model()
+            response = cache.get(cache_model, system, message)
+            if (
+                response is None
+                and semantic_cache
+                and self.config.utility_model.response_cache_semantic
+                and len(message) <= utility_cache.SEMANTIC_MAX_CHARS
+            ):
+                embedding = await self.embed_for_utility_cache(message)
+                if embedding is not None:
+                    response = cache.get_similar(cache_model, system, embedding)
+            if response is not None:
+                if callback:
+                    await callback(response)
+                return response
+            cache.miss()
+
         # rate limiter
         limiter = await self.rate_limiter(
             self.config.utility_model, f"SYSTEM: {system}\nUSER: {message}", background
@@ -610,7 +772,9 @@ class Agent:
 
         # add output tokens to rate limiter in tokens callback
         async def tokens_callback(delta: str, tokens: int):
-            await self.handle_intervention()
+            # work outside the message loop must not consume the intervention
+            if interruptible:
+                await self.handle_intervention()
             limiter.add(output=tokens)
 
         # propagate stream to callback if set
@@ -625,8 +789,34 @@ class Agent:
             tokens_callback=tokens_callback,
         )
 
+        if cache and response:
+            cache.set(cache_model, system, message, response, embedding)
+
         return response
 
+    def get_utility_cache_model(self) -> str:
+        # parameters like temperature change the responses, they are part of the key
+        config = self.config.utility_model
+        kwargs = json.dumps(config.build_kwargs(), sort_keys=True, default=str)
+        return f"{config.provider.name}/{config.name}/{kwargs}"
+
+    async def embed_for_utility_cache(self, message: str) -> list[float] | None:
+        from langchain.embeddings import CacheBackedEmbeddings
+        from python.helpers import embedding_cache
+
+        config = self.config.embeddings_model
+        try:
+            embedder = CacheBackedEmbeddings.from_bytes_store(
+                self.get_embedding_model(),
+                embedding_cache.get_cache(),
+                namespace=files.safe_file_name(config.provider.name + "_" + config.name),
+            )
+            return (await embedder.aembed_documents([message]))[0]
+        except Exception as e:
+            # the exact tier still works without embeddings
+            PrintStyle.error(f"Utility cache embedding failed: {errors.format_error(e)}")
+            return None
+
     async def call_chat_model(
         self,
         messages: list[BaseMessage],
@@ -685,7 +875,9 @@ class Agent:
             model_config.limit_input,
             model_config.limit_output,
         )
-        limiter.add(input=tokens.approximate_tokens(input))
+        limiter.add(
+            input=tokens.approximate_tokens_for_limit(input, model_config.limit_input)
+        )
         limiter.add(requests=1)
         await limiter.wait(callback=wait_callback)
         return limiter
@@ -712,47 +904,28 @@ class Agent:
         # search for tool usage requests in agent message
         tool_request = extract_tools.json_parse_dirty(msg)
 
+        # multiple tool calls in one response, if enabled
+        if (
+            tool_request is not None
+            and self.config.parallel_tools
+            and isinstance(tool_request.get("tool_calls"), list)
+            and tool_request["tool_calls"]
+        ):
+            return await self.process_tool_calls(tool_request["tool_calls"], msg)
+
         if tool_request is not None:
             raw_tool_name = tool_request.get("tool_name", "")  # Get the raw tool name
             tool_args = tool_request.get("tool_args", {})
 
-            tool_name = raw_tool_name  # Initialize tool_name with raw_tool_name
-            tool_method = None  # Initialize tool_method
-
-            # Split raw_tool_name into tool_name and tool_method if applicable
-            if ":" in raw_tool_name:
-                tool_name, tool_method = raw_tool_name.split(":", 1)
-
-            tool = None  # Initialize tool to None
-
-            # Try getting tool from MCP first
-            try:
-                import python.helpers.mcp_handler as mcp_helper
-
-                mcp_tool_candidate = mcp_helper.MCPConfig.get_instance().get_tool(
-                    self, tool_name
-                )
-                if mcp_tool_candidate:
-                    tool = mcp_tool_candidate
-            except ImportError:
-                PrintStyle(
-                    background_color="black", font_color="yellow", padding=True
-                ).print("MCP helper module not found. Skipping MCP tool lookup.")
-            except Exception as e:
-                PrintStyle(
-                    background_color="black", font_color="red", padding=True
-                ).print(f"Failed to get MCP tool '{tool_name}': {e}")
-
-            # Fallback to local get_tool if MCP tool was not found or MCP lookup failed
-            if not tool:
-                tool = self.get_tool(
-                    name=tool_name, method=tool_method, args=tool_args, message=msg, loop_data=self.loop_data
-                )
+            tool = self.resolve_tool(raw_tool_name, tool_args, msg)
 
             if tool:
                 await self.handle_intervention()
                 await tool.before_execution(**tool_args)
                 await self.handle_intervention()
+                await self.call_extensions(
+                    "tool_execute_before", loop_data=self.loop_data, tool=tool
+                )
                 response = await tool.execute(**tool_args)
                 await self.handle_intervention()
                 await tool.after_execution(response)
@@ -760,22 +933,120 @@ class Agent:
                 if response.break_loop:
                     return response.message
             else:
-                error_detail = (
-                    f"Tool '{raw_tool_name}' not found or could not be initialized."
-                )
-                self.hist_add_warning(error_detail)
-                PrintStyle(font_color="red", padding=True).print(error_detail)
-                self.context.log.log(
-                    type="error", content=f"{self.agent_name}: {error_detail}"
-                )
+                self.handle_tool_not_found(raw_tool_name)
         else:
-            warning_msg_misformat = self.read_prompt("fw.msg_misformat.md")
-            self.hist_add_warning(warning_msg_misformat)
-            PrintStyle(font_color="red", padding=True).print(warning_msg_misformat)
-            self.context.log.log(
-                type="error",
-                content=f"{self.agent_name}: Message misformat, no valid tool request found.",
+            self.handle_misformat()
+
+    async def process_tool_calls(self, tool_calls: list, msg: str):
+        # resolve all tools first, results are added to history in the order of calls
+        # an unresolved call keeps its slot, its warning is added in its place
+        slots: list[tuple] = []
+        for call in tool_calls:
+            if not isinstance(call, dict):
+                continue
+            raw_tool_name = call.get("tool_name", "")
+            tool_args = call.get("tool_args", {}) or {}
+            slots.append(
+                (raw_tool_name, self.resolve_tool(raw_tool_name, tool_args, msg), tool_args)
+            )
+        if not slots:
+            self.handle_misformat()
+            return
+
+        # consecutive tools safe to run concurrently share a batch, others run alone
+        batches: list[list] = []
+        for slot in slots:
+            tool = slot[1]
+            last = batches[-1][-1][1] if batches else None
+            if tool and last and tool.concurrent and last.concurrent:
+                batches[-1].append(slot)
+            else:
+                batches.append([slot])
+
+        for slots_batch in batches:
+            raw_tool_name, tool, _ = slots_batch[0]
+            if not tool:
+                self.handle_tool_not_found(raw_tool_name)
+                continue
+            batch = [(tool, tool_args) for _, tool, tool_args in slots_batch]
+            await self.handle_intervention()
+            for tool, tool_args in batch:
+                await tool.before_execution(**tool_args)
+            await self.handle_intervention()
+            for tool, _ in batch:
+                await self.call_extensions(
+                    "tool_execute_before", loop_data=self.loop_data, tool=tool
+                )
+            responses = await asyncio.gather(
+                *[tool.execute(**tool_args) for tool, tool_args in batch],
+                return_exceptions=True,
             )
+            break_message = None
+            for (tool, _), response in zip(batch, responses):
+                # a failed call raises only after results of the previous ones are stored
+                if isinstance(response, BaseException):
+                    raise response
+                await self.handle_intervention()
+                await tool.after_execution(response)
+                if response.break_loop and break_message is None:
+                    break_message = response.message
+            await self.handle_intervention()
+            if break_message is not None:
+                return break_message
+
+    def resolve_tool(self, raw_tool_name: str, tool_args: dict, msg: str):
+        tool_name = raw_tool_name  # Initialize tool_name with raw_tool_name
+        tool_method = None  # Initialize tool_method
+
+        # Split raw_tool_name into tool_name and tool_method if applicable
+        if ":" in raw_tool_name:
+            tool_name, tool_method = raw_tool_name.split(":", 1)
+
+        tool = None  # Initialize tool to None
+
+        # Try getting tool from MCP first
+        try:
+            import python.helpers.mcp_handler as mcp_helper
+
+            mcp_tool_candidate = mcp_helper.MCPConfig.get_instance().get_tool(
+                self, tool_name
+            )
+            if mcp_tool_candidate:
+                tool = mcp_tool_candidate
+        except ImportError:
+            PrintStyle(
+                background_color="black", font_color="yellow", padding=True
+            ).print("MCP helper module not found. Skipping MCP tool lookup.")
+        except Exception as e:
+            PrintStyle(
+                background_color="black", font_color="red", padding=True
+            ).print(f"Failed to get MCP tool '{tool_name}': {e}")
+
+        # Fallback to local get_tool if MCP tool was not found or MCP lookup failed
+        if not tool:
+            tool = self.get_tool(
+                name=tool_name, method=tool_method, args=tool_args, message=msg, loop_data=self.loop_data
+            )
+        return tool
+
+    def handle_misformat(self):
+        warning_msg_misformat = self.read_prompt("fw.msg_misformat.md")
+        self.hist_add_warning(warning_msg_misformat)
+        PrintStyle(font_color="red", padding=True).print(warning_msg_misformat)
+        self.context.log.log(
+            type="error",
+            content=f"{self.agent_name}: Message misformat, no valid tool request found.",
+        )
+
+    def handle_tool_not_found(self, raw_tool_name: str):
+        error_detail = (
+            f"Tool '{raw_tool_name}' not found or could not be initialized."
+        )
+        self.hist_add_warning(error_detail)
+        PrintStyle(font_color="red", padding=True).print(error_detail)
+        self.context.log.log(
+            type="error", content=f"{self.agent_name}: {error_detail}"
+        )
 
     async def handle_reasoning_stream(self, stream: str):
         await self.call_extensions(
@@ -784,17 +1055,29 @@ class Agent:
             text=stream,
         )
 
-    async def handle_response_stream(self, stream: str):
+    async def handle_response_stream(self, stream: str, chunk: str | None = None):
         try:
-            if len(stream) < 25:
+            # incremental parser, only the new chunk is parsed each time
+            parser = self.loop_data.params_temporary.get("response_parser")
+            if not parser or chunk is None or chunk == stream:  # new response
+                parser = self.loop_data.params_temporary["response_parser"] = (
+                    DirtyJsonStream()
+                )
+                chunk = stream
+            events = parser.feed(chunk)
+
+            if len(stream) < 25 or not events:
                 return  # no reason to try
-            response = DirtyJson.parse_string(stream)
+            # live view updated in place by later chunks, extensions copy what they keep
+            # reading it joins the string being streamed, so only when something changed
+            response = parser.result
             if isinstance(response, dict):
                 await self.call_extensions(
                     "response_stream",
                     loop_data=self.loop_data,
                     text=stream,
                     parsed=response,
+                    events=events,
                 )
 
         except Exception as e:
@@ -806,7 +1089,7 @@ class Agent:
         from python.tools.unknown import Unknown
         from python.helpers.tool import Tool
 
-        classes = extract_tools.load_classes_from_folder(
+        classes = extract_tools.get_classes_from_folder(
             "python/tools", name + ".py", Tool
         )
         tool_class = classes[0] if classes else Unknown
@@ -817,15 +1100,10 @@ class Agent:
     async def call_extensions(self, folder: str, **kwargs) -> Any:
         from python.helpers.extension import Extension
 
-        cache = {}  # some extensions can be called very often, like response_stream
-
-        if folder in cache:
-            classes = cache[folder]
-        else:
-            classes = extract_tools.load_classes_from_folder(
-                "python/extensions/" + folder, "*", Extension
-            )
-            cache[folder] = classes
+        # some extensions can be called very often, like response_stream
+        classes = extract_tools.get_classes_from_folder(
+            "python/extensions/" + folder, "*", Extension
+        )
 
         for cls in classes:
             await cls(agent=self).execute(**kwargs)
@@ -33,6 +33,7 @@ def initialize_agent():
         api_base=current_settings["chat_model_api_base"],
         ctx_length=current_settings["chat_model_ctx_length"],
         vision=current_settings["chat_model_vision"],
+        prompt_cache=current_settings["chat_model_prompt_cache"],
         limit_requests=current_settings["chat_model_rl_requests"],
         limit_input=current_settings["chat_model_rl_input"],
         limit_output=current_settings["chat_model_rl_output"],
@@ -46,6 +47,8 @@ def initialize_agent():
         name=current_settings["util_model_name"],
         api_base=current_settings["util_model_api_base"],
         ctx_length=current_settings["util_model_ctx_length"],
+        response_cache=current_settings["util_model_cache"],
+        response_cache_semantic=current_settings["util_model_cache_semantic"],
         limit_requests=current_settings["util_model_rl_requests"],
         limit_input=current_settings["util_model_rl_input"],
         limit_output=current_settings["util_model_rl_output"],
@@ -78,6 +81,8 @@ def initialize_agent():
         prompts_subdir=current_settings["agent_prompts_subdir"],
         memory_subdir=current_settings["agent_memory_subdir"],
         knowledge_subdirs=["default", current_settings["agent_knowledge_subdir"]],
+        parallel_tools=current_settings["agent_parallel_tools"],
+        subordinates_concurrency=current_settings["agent_subordinates_concurrency"],
         mcp_servers=current_settings["mcp_servers"],
         code_exec_docker_enabled=False,
         # code_exec_docker_name = "A0-dev",
@@ -141,6 +146,16 @@ def initialize_mcp():
         return _initialize_mcp(set["mcp_servers"])
     return defer.DeferredTask().start_task(initialize_mcp_async)
 
+def initialize_memory():
+    async def initialize_memory_async():
+        from agent import AgentContext
+        from python.helpers.memory import Memory
+        # detached context, only carries the log and rate limiter of the warm-up
+        context = AgentContext(config=initialize_agent())
+        AgentContext.remove(context.id)
+        await Memory.warmup(context.agent0)
+    return defer.DeferredTask("MemoryInit").start_task(initialize_memory_async)
+
 def initialize_job_loop():
     from python.helpers.job_loop import run_loop
     return defer.DeferredTask("JobLoop").start_task(run_loop)
@@ -1,7 +1,10 @@
+import asyncio
 from dataclasses import dataclass, field
 from enum import Enum
 import logging
 import os
+import random
+import time
 from typing import (
     Any,
     Awaitable,
@@ -14,13 +17,13 @@ from typing import (
     TypedDict,
 )
 
-from litellm import completion, acompletion, embedding
+from litellm import completion, acompletion, embedding, aembedding
 import litellm
 
-from python.helpers import dotenv
+from python.helpers import dotenv, embedding_worker
 from python.helpers.dotenv import load_dotenv
 from python.helpers.rate_limiter import RateLimiter
-from python.helpers.tokens import approximate_tokens
+from python.helpers.tokens import approximate_tokens, DeltaEstimator
 
 from langchain_core.language_models.chat_models import SimpleChatModel
 from langchain_core.outputs.chat_generation import ChatGenerationChunk
@@ -35,7 +38,7 @@ from langchain_core.messages import (
     SystemMessage,
 )
 from langchain.embeddings.base import Embeddings
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
 
 # disable extra logging, must be done repeatedly, otherwise browser-use will turn it back on for some reason
@@ -85,6 +88,9 @@ class ModelConfig:
     limit_input: int = 0
     limit_output: int = 0
     vision: bool = False
+    prompt_cache: bool = False
+    response_cache: bool = False
+    response_cache_semantic: bool = False
     kwargs: dict = field(default_factory=dict)
 
     def build_kwargs(self):
@@ -103,6 +109,10 @@ class ChatChunk(TypedDict):
 
 rate_limiters: dict[str, RateLimiter] = {}
 
+# additional_kwargs key of a message, index of the content block ending a cacheable prefix
+CACHE_BREAKPOINT = "cache_breakpoint"
+_prompt_caching_support: dict[str, bool] = {}
+
 
 def get_api_key(service: str) -> str:
     return (
@@ -127,11 +137,14 @@ def get_rate_limiter(
 class LiteLLMChatWrapper(SimpleChatModel):
     model_name: str
     provider: str
+    prompt_cache: bool = False
     kwargs: dict = {}
 
-    def __init__(self, model: str, provider: str, **kwargs: Any):
+    def __init__(
+        self, model: str, provider: str, prompt_cache: bool = False, **kwargs: Any
+    ):
         model_value = f"{provider}/{model}"
-        super().__init__(model_name=model_value, provider=provider, kwargs=kwargs)  # type: ignore
+        super().__init__(model_name=model_value, provider=provider, prompt_cache=prompt_cache, kwargs=kwargs)  # type: ignore
 
     @property
     def _llm_type(self) -> str:
@@ -150,6 +163,12 @@ class LiteLLMChatWrapper(SimpleChatModel):
             role = role_mapping.get(m.type, m.type)
             message_dict = {"role": role, "content": m.content}
 
+            # mark the end of a stable prefix for providers with prompt caching
+            breakpoint = m.additional_kwargs.get(CACHE_BREAKPOINT)
+            if breakpoint is not None and self.prompt_cache:
+                if _supports_prompt_caching(self.model_name):
+                    message_dict["content"] = _with_cache_control(m.content, breakpoint)
+
             # Handle tool calls for AI messages
             tool_calls = getattr(m, "tool_calls", None)
             if tool_calls:
@@ -279,6 +298,8 @@ class LiteLLMChatWrapper(SimpleChatModel):
         # results
         reasoning = ""
         response = ""
+        reasoning_tokens = DeltaEstimator()
+        response_tokens = DeltaEstimator()
 
         # iterate over chunks
         async for chunk in _completion:  # type: ignore
@@ -291,7 +312,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
                 if tokens_callback:
                     await tokens_callback(
                         parsed["reasoning_delta"],
-                        approximate_tokens(parsed["reasoning_delta"]),
+                        reasoning_tokens.add(parsed["reasoning_delta"]),
                     )
             # collect response delta and call callbacks
             if parsed["response_delta"]:
@@ -301,7 +322,7 @@ class LiteLLMChatWrapper(SimpleChatModel):
                 if tokens_callback:
                     await tokens_callback(
                         parsed["response_delta"],
-                        approximate_tokens(parsed["response_delta"]),
+                        response_tokens.add(parsed["response_delta"]),
                     )
 
         # return complete results
@@ -345,22 +366,103 @@ class LiteLLMEmbeddingWrapper(Embeddings):
     model_name: str
     kwargs: dict = {}
 
+    # request splitting and concurrency, can be overridden in model kwargs
+    BATCH_SIZE = 256  # texts per request
+    BATCH_TOKENS = 100000  # approximate tokens per request
+    CONCURRENCY = 4  # parallel requests per call
+    RETRIES = 6  # attempts on rate limit errors
+    RETRY_DELAY = 1.0  # seconds, doubled each attempt
+    RETRY_MAX_DELAY = 60.0
+
     def __init__(self, model: str, provider: str, **kwargs: Any):
         self.model_name = f"{provider}/{model}" if provider != "openai" else model
+        self.batch_size = int(kwargs.pop("batch_size", self.BATCH_SIZE))
+        self.batch_tokens = int(kwargs.pop("batch_tokens", self.BATCH_TOKENS))
+        self.concurrency = max(1, int(kwargs.pop("concurrency", self.CONCURRENCY)))
         self.kwargs = kwargs
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        resp = embedding(model=self.model_name, input=texts, **self.kwargs)
+        result: List[List[float]] = []
+        for batch in self._batches(texts):
+            result += self._embed_batch(batch)
+        return result
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: List[str]):
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        # gather keeps the order of batches
+        results = await asyncio.gather(*[run(b) for b in self._batches(texts)])
+        return [vector for batch in results for vector in batch]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed_batch([text]))[0]
+
+    def _batches(self, texts: List[str]) -> Iterator[List[str]]:
+        # split by count and approximate size to stay within provider request limits
+        batch: List[str] = []
+        tokens = 0
+        for text in texts:
+            text_tokens = approximate_tokens(text)
+            if batch and (
+                len(batch) >= self.batch_size
+                or tokens + text_tokens > self.batch_tokens
+            ):
+                yield batch
+                batch, tokens = [], 0
+            batch.append(text)
+            tokens += text_tokens
+        if batch:
+            yield batch
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.RETRIES):
+            try:
+                resp = embedding(model=self.model_name, input=texts, **self.kwargs)
+                return self._parse_response(resp)
+            except litellm.RateLimitError as e:
+                if attempt == self.RETRIES - 1:
+                    raise
+                time.sleep(self._retry_delay(e, attempt))
+        raise RuntimeError("unreachable")
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.RETRIES):
+            try:
+                resp = await aembedding(
+                    model=self.model_name, input=texts, **self.kwargs
+                )
+                return self._parse_response(resp)
+            except litellm.RateLimitError as e:
+                if attempt == self.RETRIES - 1:
+                    raise
+                await asyncio.sleep(self._retry_delay(e, attempt))
+        raise RuntimeError("unreachable")
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        # honor retry-after from the provider when present, exponential backoff with jitter otherwise
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after", 0))
+        except (TypeError, ValueError):
+            retry_after = 0
+        delay = retry_after or self.RETRY_DELAY * (2**attempt)
+        return min(self.RETRY_MAX_DELAY, delay) * random.uniform(1.0, 1.25)
+
+    @staticmethod
+    def _parse_response(resp: Any) -> List[List[float]]:
         return [
             item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
             for item in resp.data  # type: ignore
         ]
 
-    def embed_query(self, text: str) -> List[float]:
-        resp = embedding(model=self.model_name, input=[text], **self.kwargs)
-        item = resp.data[0]  # type: ignore
-        return item.get("embedding") if isinstance(item, dict) else item.embedding  # type: ignore
-
 
 class LocalSentenceTransformerWrapper(Embeddings):
     """Local wrapper for sentence-transformers models to avoid HuggingFace API calls"""
@@ -370,19 +472,55 @@ class LocalSentenceTransformerWrapper(Embeddings):
         if model.startswith("sentence-transformers/"):
             model = model[len("sentence-transformers/") :]
 
-        self.model = SentenceTransformer(model, **kwargs)
+        # model is loaded once and shared, requests are batched on its worker thread
+        self.worker = embedding_worker.get_worker(model, **kwargs)
+        self.model = self.worker.model
         self.model_name = model
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        embeddings = self.model.encode(texts, convert_to_tensor=False)  # type: ignore
-        return embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings  # type: ignore
+        return self.worker.encode(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        embedding = self.model.encode([text], convert_to_tensor=False)  # type: ignore
-        result = (
-            embedding[0].tolist() if hasattr(embedding[0], "tolist") else embedding[0]
-        )
-        return result  # type: ignore
+        return self.worker.encode([text])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return (await self.worker.aencode(texts)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.worker.aencode([text]))[0].tolist()
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        return self.worker.encode(texts)
+
+    async def aembed_array(self, texts: List[str]) -> np.ndarray:
+        return await self.worker.aencode(texts)
+
+
+def _supports_prompt_caching(model: str) -> bool:
+    if model not in _prompt_caching_support:
+        try:
+            supported = bool(litellm.supports_prompt_caching(model=model))
+        except Exception:
+            supported = False
+        # routers like openrouter pass cache_control through to anthropic models
+        if not supported and "claude" in model.lower():
+            supported = True
+        _prompt_caching_support[model] = supported
+    return _prompt_caching_support[model]
+
+
+def _with_cache_control(content: Any, breakpoint: int) -> list[dict]:
+    # copy into content blocks, the cached message objects stay untouched
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    else:
+        blocks = [
+            dict(block) if isinstance(block, dict) else {"type": "text", "text": str(block)}
+            for block in content
+        ]
+    if blocks:
+        blocks[breakpoint] = {**blocks[breakpoint], "cache_control": {"type": "ephemeral"}}
+    return blocks
 
 
 def _get_litellm_chat(
@@ -0,0 +1,11 @@
+from python.helpers.api import ApiHandler, Input, Output, Request
+from python.helpers import embedding_cache, utility_cache
+
+
+class CacheStats(ApiHandler):
+    async def process(self, input: Input, request: Request) -> Output:
+        # hit, miss and size counters of the persistent caches since start
+        return {
+            "embeddings": embedding_cache.get_cache().stats(),
+            "utility": utility_cache.get_cache().stats(),
+        }
@@ -8,8 +8,8 @@ class GetCtxWindow(ApiHandler):
         ctxid = input.get("context", [])
         context = self.get_context(ctxid)
         agent = context.streaming_agent or context.agent0
-        window = agent.get_data(agent.DATA_NAME_CTX_WINDOW)
-        if not window or not isinstance(window, dict):
+        window = agent.get_ctx_window()
+        if not window:
             return {"content": "", "tokens": 0}
 
         text = window["text"]
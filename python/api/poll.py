@@ -3,6 +3,7 @@ from python.helpers.api import ApiHandler, Request, Response
 from agent import AgentContext
 
 from python.helpers import persist_chat
+from python.helpers.memory import Memory
 from python.helpers.task_scheduler import TaskScheduler
 from python.helpers.localization import Localization
 from python.helpers.dotenv import get_dotenv_value
@@ -37,27 +38,30 @@ class Poll(ApiHandler):
         tasks = []
         processed_contexts = set()  # Track processed context IDs
 
-        all_ctxs = list(AgentContext._contexts.values())
+        # saved chats not loaded yet are listed from the chat index
+        all_ctxs = [ctx.serialize() for ctx in list(AgentContext._contexts.values())]
+        all_ctxs += [
+            AgentContext.serialize_unloaded(entry)
+            for entry in list(AgentContext._unloaded.values())
+        ]
         # First, identify all tasks
-        for ctx in all_ctxs:
+        for context_data in all_ctxs:
+            ctx_id = context_data["id"]
             # Skip if already processed
-            if ctx.id in processed_contexts:
+            if ctx_id in processed_contexts:
                 continue
 
-            # Create the base context data that will be returned
-            context_data = ctx.serialize()
-
-            context_task = scheduler.get_task_by_uuid(ctx.id)
+            context_task = scheduler.get_task_by_uuid(ctx_id)
             # Determine if this is a task-dedicated context by checking if a task with this UUID exists
             is_task_context = (
-                context_task is not None and context_task.context_id == ctx.id
+                context_task is not None and context_task.context_id == ctx_id
             )
 
             if not is_task_context:
                 ctxs.append(context_data)
             else:
                 # If this is a task, get task details from the scheduler
-                task_details = scheduler.serialize_task(ctx.id)
+                task_details = scheduler.serialize_task(ctx_id)
                 if task_details:
                     # Add task details to context_data with the same field names
                     # as used in scheduler endpoints to maintain UI compatibility
@@ -85,7 +89,7 @@ class Poll(ApiHandler):
                 tasks.append(context_data)
 
             # Mark as processed
-            processed_contexts.add(ctx.id)
+            processed_contexts.add(ctx_id)
 
         # Sort tasks and chats by their creation date, descending
         ctxs.sort(key=lambda x: x["created_at"], reverse=True)
@@ -102,4 +106,5 @@ class Poll(ApiHandler):
             "log_progress": context.log.progress,
             "log_progress_active": context.log.progress_active,
             "paused": context.paused,
+            "memory_status": Memory.get_status(context.config.memory_subdir),
         }
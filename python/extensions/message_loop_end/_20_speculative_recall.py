@@ -0,0 +1,16 @@
+from python.helpers.extension import Extension
+from agent import LoopData
+from python.extensions.message_loop_prompts_after._50_recall_memories import RecallMemories
+from python.extensions.message_loop_prompts_after._51_recall_solutions import RecallSolutions
+
+
+class SpeculativeRecall(Extension):
+
+    async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
+        # the response and tool results of this iteration are in history now, prepare the
+        # next iteration's recall meanwhile, it is used if no message is added before it
+        next_iteration = loop_data.iteration + 1
+        if next_iteration % RecallMemories.INTERVAL == 0:
+            RecallMemories(self.agent).speculate(loop_data, next_iteration)
+        if next_iteration % RecallSolutions.INTERVAL == 0:
+            RecallSolutions(self.agent).speculate(loop_data, next_iteration)
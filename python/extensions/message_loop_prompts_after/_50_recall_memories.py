@@ -1,9 +1,11 @@
 import asyncio
+from python.helpers import speculation
 from python.helpers.extension import Extension
 from python.helpers.memory import Memory
 from agent import LoopData
 
 DATA_NAME_TASK = "_recall_memories_task"
+DATA_NAME_SPECULATION = "_recall_memories_speculation"
 
 
 class RecallMemories(Extension):
@@ -12,34 +14,72 @@ class RecallMemories(Extension):
     HISTORY = 10000
     RESULTS = 3
     THRESHOLD = 0.6
+    READY_TIMEOUT = 10  # seconds to wait for memory still loading after startup
 
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
 
         # every 3 iterations (or the first one) recall memories
         if loop_data.iteration % RecallMemories.INTERVAL == 0:
-            task = asyncio.create_task(
-                self.search_memories(loop_data=loop_data, **kwargs)
+            # search started while the previous response was streaming, if still valid
+            search = speculation.take(
+                self.agent,
+                DATA_NAME_SPECULATION,
+                self.get_key(loop_data, loop_data.iteration),
             )
+            task = asyncio.create_task(self.recall(loop_data, search))
         else:
             task = None
 
         # set to agent to be able to wait for it
         self.agent.set_data(DATA_NAME_TASK, task)
 
-    async def search_memories(self, loop_data: LoopData, **kwargs):
+    def speculate(self, loop_data: LoopData, iteration: int):
+        # output is shown only if the search is used
+        log_item = speculation.DeferredLogItem(
+            self.agent.context.log, type="util", heading="Searching memories..."
+        )
+        speculation.start(
+            self.agent,
+            DATA_NAME_SPECULATION,
+            self.get_key(loop_data, iteration),
+            self.search_memories(loop_data, log_item),
+            log_item,
+        )
+
+    def get_key(self, loop_data: LoopData, iteration: int):
+        # same user message, no message added and no history compression since the search started
+        history = self.agent.history
+        return (loop_data.user_message, history.version, history.added, iteration)
+
+    async def recall(self, loop_data: LoopData, search: asyncio.Task | None):
 
         # cleanup
         extras = loop_data.extras_persistent
         if "memories" in extras:
             del extras["memories"]
 
+        if search:
+            memories_prompt = await search
+        else:
+            memories_prompt = await self.search_memories(loop_data)
+
+        # append to prompt
+        if memories_prompt:
+            extras["memories"] = memories_prompt
+
+    async def search_memories(
+        self, loop_data: LoopData, log_item: speculation.DeferredLogItem | None = None
+    ):
+
         # try:
         
         # show full util message
-        log_item = self.agent.context.log.log(
-            type="util",
-            heading="Searching memories...",
-        )
+        speculative = log_item is not None
+        if not log_item:
+            log_item = self.agent.context.log.log(
+                type="util",
+                heading="Searching memories...",
+            )
 
         # get system message and chat history for util llm
         # msgs_text = self.agent.concat_messages(
@@ -61,8 +101,16 @@ class RecallMemories(Extension):
                 loop_data.user_message.output_text() if loop_data.user_message else "None"
             ),
             callback=log_callback,
+            background=speculative,
+            interruptible=not speculative,
+            semantic_cache=True,
         )
 
+        # memory may still be warming up after startup, do not hold the conversation
+        if not await Memory.wait_ready(self.agent, RecallMemories.READY_TIMEOUT):
+            log_item.update(heading="Memory is still loading, recall skipped")
+            return None
+
         # get solutions database
         db = await Memory.get(self.agent)
 
@@ -78,7 +126,7 @@ class RecallMemories(Extension):
             log_item.update(
                 heading="No useful memories found",
             )
-            return
+            return None
         else:
             log_item.update(
                 heading=f"{len(memories)} memories found",
@@ -94,13 +142,10 @@ class RecallMemories(Extension):
         log_item.update(memories=memories_text)
 
         # place to prompt
-        memories_prompt = self.agent.parse_prompt(
+        return self.agent.parse_prompt(
             "agent.system.memories.md", memories=memories_text
         )
 
-        # append to prompt
-        extras["memories"] = memories_prompt
-
     # except Exception as e:čč
     #     err = errors.format_error(e)
     #     self.agent.context.log.log(
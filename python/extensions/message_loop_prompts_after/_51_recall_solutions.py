@@ -1,9 +1,11 @@
 import asyncio
+from python.helpers import speculation
 from python.helpers.extension import Extension
 from python.helpers.memory import Memory
 from agent import LoopData
 
 DATA_NAME_TASK = "_recall_solutions_task"
+DATA_NAME_SPECULATION = "_recall_solutions_speculation"
 
 class RecallSolutions(Extension):
 
@@ -12,32 +14,75 @@ class RecallSolutions(Extension):
     SOLUTIONS_COUNT = 2
     INSTRUMENTS_COUNT = 2
     THRESHOLD = 0.6
+    READY_TIMEOUT = 10  # seconds to wait for memory still loading after startup
 
     async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
 
         # every 3 iterations (or the first one) recall memories
         if loop_data.iteration % RecallSolutions.INTERVAL == 0:
-            task = asyncio.create_task(self.search_solutions(loop_data=loop_data, **kwargs))
+            # search started while the previous response was streaming, if still valid
+            search = speculation.take(
+                self.agent,
+                DATA_NAME_SPECULATION,
+                self.get_key(loop_data, loop_data.iteration),
+            )
+            task = asyncio.create_task(self.recall(loop_data, search))
         else:
             task = None
 
         # set to agent to be able to wait for it
         self.agent.set_data(DATA_NAME_TASK, task)
 
-    async def search_solutions(self, loop_data: LoopData, **kwargs):
+    def speculate(self, loop_data: LoopData, iteration: int):
+        # output is shown only if the search is used
+        log_item = speculation.DeferredLogItem(
+            self.agent.context.log, type="util", heading="Searching memory for solutions..."
+        )
+        speculation.start(
+            self.agent,
+            DATA_NAME_SPECULATION,
+            self.get_key(loop_data, iteration),
+            self.search_solutions(loop_data, log_item),
+            log_item,
+        )
+
+    def get_key(self, loop_data: LoopData, iteration: int):
+        # same user message, no message added and no history compression since the search started
+        history = self.agent.history
+        return (loop_data.user_message, history.version, history.added, iteration)
+
+    async def recall(self, loop_data: LoopData, search: asyncio.Task | None):
 
         #cleanup
         extras = loop_data.extras_persistent
         if "solutions" in extras:
             del extras["solutions"]
-        
+
+        if search:
+            instruments_prompt, solutions_prompt = await search
+        else:
+            instruments_prompt, solutions_prompt = await self.search_solutions(loop_data)
+
+        if instruments_prompt:
+            loop_data.system.append(instruments_prompt)
+
+        # append to prompt
+        if solutions_prompt:
+            extras["solutions"] = solutions_prompt
+
+    async def search_solutions(
+        self, loop_data: LoopData, log_item: speculation.DeferredLogItem | None = None
+    ) -> tuple[str, str]:
+
         # try:
 
         # show full util message
-        log_item = self.agent.context.log.log(
-            type="util",
-            heading="Searching memory for solutions...",
-        )
+        speculative = log_item is not None
+        if not log_item:
+            log_item = self.agent.context.log.log(
+                type="util",
+                heading="Searching memory for solutions...",
+            )
 
         # get system message and chat history for util llm
         # msgs_text = self.agent.concat_messages(
@@ -56,9 +101,15 @@ class RecallSolutions(Extension):
 
         # call util llm to summarize conversation
         query = await self.agent.call_utility_model(
-            system=system, message=loop_data.user_message.output_text() if loop_data.user_message else "None", callback=log_callback
+            system=system, message=loop_data.user_message.output_text() if loop_data.user_message else "None", callback=log_callback,
+            background=speculative, interruptible=not speculative, semantic_cache=True,
         )
 
+        # memory may still be warming up after startup, do not hold the conversation
+        if not await Memory.wait_ready(self.agent, RecallSolutions.READY_TIMEOUT):
+            log_item.update(heading="Memory is still loading, recall skipped")
+            return "", ""
+
         # get solutions database
         db = await Memory.get(self.agent)
 
@@ -79,6 +130,7 @@ class RecallSolutions(Extension):
             heading=f"{len(instruments)} instruments, {len(solutions)} solutions found",
         )
 
+        instruments_prompt = ""
         if instruments:
             instruments_text = ""
             for instrument in instruments:
@@ -88,8 +140,8 @@ class RecallSolutions(Extension):
             instruments_prompt = self.agent.read_prompt(
                 "agent.system.instruments.md", instruments=instruments_text
             )
-            loop_data.system.append(instruments_prompt)
 
+        solutions_prompt = ""
         if solutions:
             solutions_text = ""
             for solution in solutions:
@@ -100,8 +152,7 @@ class RecallSolutions(Extension):
                 "agent.system.solutions.md", solutions=solutions_text
             )
 
-            # append to prompt
-            extras["solutions"] = solutions_prompt
+        return instruments_prompt, solutions_prompt
 
     # except Exception as e:
     #     err = errors.format_error(e)
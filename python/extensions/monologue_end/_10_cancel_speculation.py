@@ -0,0 +1,13 @@
+from python.helpers import speculation
+from python.helpers.extension import Extension
+from agent import LoopData
+from python.extensions.message_loop_prompts_after._50_recall_memories import DATA_NAME_SPECULATION as DATA_NAME_SPECULATION_MEMORIES
+from python.extensions.message_loop_prompts_after._51_recall_solutions import DATA_NAME_SPECULATION as DATA_NAME_SPECULATION_SOLUTIONS
+
+
+class CancelSpeculation(Extension):
+
+    async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
+        # no next iteration, speculative recall is not needed anymore
+        speculation.cancel(self.agent, DATA_NAME_SPECULATION_MEMORIES)
+        speculation.cancel(self.agent, DATA_NAME_SPECULATION_SOLUTIONS)
@@ -80,27 +80,21 @@ class MemorizeMemories(Extension):
         # save chat history
         db = await Memory.get(self.agent)
 
-        memories_txt = ""
-        rem = []
-        for memory in memories:
-            # solution to plain text:
-            txt = f"{memory}"
-            memories_txt += "\n\n" + txt
-            log_item.update(memories=memories_txt.strip())
-
-            # remove previous fragments too similiar to this one
-            if self.REPLACE_THRESHOLD > 0:
-                rem += await db.delete_documents_by_query(
-                    query=txt,
-                    threshold=self.REPLACE_THRESHOLD,
-                    filter=f"area=='{Memory.Area.FRAGMENTS.value}'",
-                )
-                if rem:
-                    rem_txt = "\n\n".join(Memory.format_docs_plain(rem))
-                    log_item.update(replaced=rem_txt)
-
-            # insert new solution
-            await db.insert_text(text=txt, metadata={"area": Memory.Area.FRAGMENTS.value})
+        # memories to plain text:
+        texts = [f"{memory}" for memory in memories]
+        memories_txt = "\n\n".join(texts)
+        log_item.update(memories=memories_txt.strip())
+
+        # insert all at once, remove previous fragments too similiar to new ones
+        _ids, rem = await db.insert_texts_batch(
+            texts=texts,
+            metadata={"area": Memory.Area.FRAGMENTS.value},
+            replace_threshold=self.REPLACE_THRESHOLD,
+            replace_filter=f"area=='{Memory.Area.FRAGMENTS.value}'",
+        )
+        if rem:
+            rem_txt = "\n\n".join(Memory.format_docs_plain(rem))
+            log_item.update(replaced=rem_txt)
 
         log_item.update(
             result=f"{len(memories)} entries memorized.",
@@ -81,8 +81,7 @@ class MemorizeSolutions(Extension):
         # save chat history
         db = await Memory.get(self.agent)
 
-        solutions_txt = ""
-        rem = []
+        texts = []
         for solution in solutions:
             # solution to plain text:
             if isinstance(solution, dict):
@@ -92,21 +91,19 @@ class MemorizeSolutions(Extension):
             else:
                 # If solution is not a dict, convert it to string
                 txt = f"# Solution\n {str(solution)}"
-            solutions_txt += txt + "\n\n"
-
-            # remove previous solutions too similiar to this one
-            if self.REPLACE_THRESHOLD > 0:
-                rem += await db.delete_documents_by_query(
-                    query=txt,
-                    threshold=self.REPLACE_THRESHOLD,
-                    filter=f"area=='{Memory.Area.SOLUTIONS.value}'",
-                )
-                if rem:
-                    rem_txt = "\n\n".join(Memory.format_docs_plain(rem))
-                    log_item.update(replaced=rem_txt)
-
-            # insert new solution
-            await db.insert_text(text=txt, metadata={"area": Memory.Area.SOLUTIONS.value})
+            texts.append(txt)
+        solutions_txt = "\n\n".join(texts)
+
+        # insert all at once, remove previous solutions too similiar to new ones
+        _ids, rem = await db.insert_texts_batch(
+            texts=texts,
+            metadata={"area": Memory.Area.SOLUTIONS.value},
+            replace_threshold=self.REPLACE_THRESHOLD,
+            replace_filter=f"area=='{Memory.Area.SOLUTIONS.value}'",
+        )
+        if rem:
+            rem_txt = "\n\n".join(Memory.format_docs_plain(rem))
+            log_item.update(replaced=rem_txt)
 
         solutions_txt = solutions_txt.strip()
         log_item.update(solutions=solutions_txt)
@@ -0,0 +1,34 @@
+import asyncio
+from python.helpers import errors, persist_chat
+from python.helpers.extension import Extension
+from python.helpers.print_style import PrintStyle
+from agent import Agent, LoopData
+from python.extensions.message_loop_end._10_organize_history import DATA_NAME_TASK
+
+
+class PresummarizeHistory(Extension):
+
+    async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
+        # waiting for user input, summarize history now instead of before the next prompt
+        start(self.agent)
+
+
+def start(agent: Agent):
+    # shares the task slot with history organization so they never run at once,
+    # the wait extension awaits it if the hard limit is reached meanwhile
+    task = agent.get_data(DATA_NAME_TASK)
+    if task and not task.done():
+        return
+    if not agent.history.is_over_soft_limit():
+        return
+    agent.set_data(DATA_NAME_TASK, asyncio.create_task(presummarize(agent)))
+
+
+async def presummarize(agent: Agent):
+    try:
+        if await agent.history.presummarize():
+            # the chat may stay idle for long, keep the summaries on disk
+            persist_chat.save_tmp_chat(agent.context)
+    except Exception as e:
+        # nothing is lost, the limit is enforced again before the next prompt
+        PrintStyle.error(f"Idle history summarization failed: {errors.format_error(e)}")
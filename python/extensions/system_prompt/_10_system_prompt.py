@@ -28,6 +28,8 @@ def get_tools_prompt(agent: Agent):
     prompt = agent.read_prompt("agent.system.tools.md")
     if agent.config.chat_model.vision:
         prompt += '\n' + agent.read_prompt("agent.system.tools_vision.md")
+    if agent.config.parallel_tools:
+        prompt += '\n' + agent.read_prompt("agent.system.tools_parallel.md")
     return prompt
 
 
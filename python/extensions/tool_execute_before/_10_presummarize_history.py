@@ -0,0 +1,11 @@
+from python.helpers.extension import Extension
+from agent import LoopData
+from python.extensions.monologue_end._60_presummarize_history import start
+
+
+class PresummarizeHistoryDuringTool(Extension):
+
+    async def execute(self, loop_data: LoopData = LoopData(), **kwargs):
+        # the tool run leaves time to summarize, idle summarization only touches finished
+        # topics and bulks, so an intervention starting a new topic meanwhile is safe
+        start(self.agent)
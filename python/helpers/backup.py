@@ -68,9 +68,11 @@ class BackupService:
 {agent_root}/instruments/**
 !{agent_root}/instruments/default/**
 
-# Memory (excluding embeddings cache)
+# Memory (excluding embeddings and utility caches)
 {agent_root}/memory/**
 !{agent_root}/memory/**/embeddings/**
+!{agent_root}/memory/embeddings.db*
+!{agent_root}/memory/utility_cache.db*
 
 # Configuration and Settings (CRITICAL)
 {agent_root}/.env
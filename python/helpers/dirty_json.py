@@ -1,4 +1,6 @@
 import json
+import re
+from typing import Any
 
 def try_parse(json_string: str):
     try:
@@ -333,3 +335,371 @@ class DirtyJson:
         chars = ["{", "[", '"']
         indices = [input_str.find(char) for char in chars if input_str.find(char) != -1]
         return min(indices) if indices else 0
+
+
+_STRING_RUN = {q: re.compile(r"[^" + re.escape(q) + r"\\]+") for q in ['"', "'", "`"]}
+_NUMBER_RUN = re.compile(r"[0-9+\-.eE]+")
+_LITERAL_END = re.compile(r"[:,}\]]")
+_KEY_END = re.compile(r"[\s:,}\]]")
+_ESCAPES = {"b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_LITERALS = {"true": True, "false": False, "null": None, "undefined": None}
+
+
+class _Frame:
+    def __init__(self, container: dict | list, path: tuple, double: bool = False):
+        self.container = container
+        self.path = path
+        self.double = double  # opened with {{, closes with }}
+        self.state = "key" if isinstance(container, dict) else "value"
+        self.key: Any = None
+
+
+class _Token:
+    def __init__(self, kind: str, quote: str = "", is_key: bool = False):
+        self.kind = kind
+        self.quote = quote
+        self.is_key = is_key
+        self.parts: list[str] = []
+        self.exposed = 0  # parts already reported as streamed
+        self.container: dict | list | None = None
+        self.slot: Any = None
+        self.path: tuple = ()
+
+
+class DirtyJsonStream:
+    """
+    Incremental counterpart of DirtyJson for streamed LLM output.
+    State is kept between feed() calls, so each chunk is processed once and the
+    cost of a feed is proportional to the chunk, not to the whole response.
+    The result is built and updated in place, strings being streamed are
+    visible partially: their parts are only joined when the result is read.
+    Accepts the same relaxed syntax as DirtyJson.
+    """
+
+    def __init__(self):
+        self._result: Any = None
+        self._partial = False  # streamed string has parts not yet joined into the result
+        self.done = False
+        self._started = False
+        self._stack: list[_Frame] = []
+        self._token: _Token | None = None
+        self._tail = ""
+        self._events: list[tuple[tuple, Any]] = []
+
+    @property
+    def result(self) -> Any:
+        token = self._token
+        if self._partial and token:
+            # join the string being streamed once per read, not once per chunk
+            value = "".join(token.parts)
+            token.parts = [value]
+            token.exposed = 1
+            self._place(token, value.lstrip() if token.kind == "multiline" else value)
+        self._partial = False
+        return self._result
+
+    def feed(self, chunk: str) -> list[tuple[tuple, Any]]:
+        """
+        Parse the next chunk, returns (path, value) events for values set or extended by it.
+        For a string still being streamed the value is the text added by this chunk.
+        """
+        text = self._tail + chunk
+        self._tail = ""
+        self._events = []
+        i = 0
+        while i < len(text) and not self.done:
+            consumed = self._step(text, i)
+            if consumed is None:
+                # need more input to decide, keep the few undecided chars for next feed
+                self._tail = text[i:]
+                break
+            i += consumed
+        self._flush_partial()
+        return self._events
+
+    def _step(self, text: str, i: int) -> int | None:
+        # returns number of chars consumed, 0 to re-read the same char in a new state
+        if self._token:
+            return self._step_token(text, i)
+
+        c = text[i]
+        if not self._started:
+            if c not in '{["':
+                return 1  # skip anything before the json
+            consumed = self._start_value(text, i)
+            self._started = consumed is not None
+            return consumed
+
+        if c.isspace():
+            return 1
+        if c == "/":
+            if i + 1 >= len(text):
+                return None
+            if text[i + 1] == "/":
+                self._token = _Token("line_comment")
+                return 2
+            if text[i + 1] == "*":
+                self._token = _Token("block_comment")
+                return 2
+
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            return self._step_object(frame, text, i)
+        return self._step_array(frame, text, i)
+
+    def _step_object(self, frame: _Frame, text: str, i: int) -> int | None:
+        c = text[i]
+        if frame.state == "key":
+            if c == "}":
+                return self._close_object(frame, text, i)
+            if c == ",":
+                return 1
+            if c in "\"'":
+                self._token = _Token("string", quote=c, is_key=True)
+                return 1
+            self._token = _Token("key")
+            return 0
+        if frame.state == "colon":
+            if c == ":":
+                frame.state = "value"
+                return 1
+            if c == "}":
+                self._attach(None)
+                return 0
+            frame.state = "value"
+            return 0
+        if frame.state == "value":
+            return self._start_value(text, i)
+        # after value
+        if c == ",":
+            frame.state = "key"
+            return 1
+        if c == "}":
+            return self._close_object(frame, text, i)
+        frame.state = "key"
+        return 0
+
+    def _step_array(self, frame: _Frame, text: str, i: int) -> int | None:
+        c = text[i]
+        if c == "]":
+            self._close()
+            return 1
+        if frame.state == "value":
+            if c == ",":
+                return 1  # empty or trailing element
+            return self._start_value(text, i)
+        # after value
+        if c == ",":
+            frame.state = "value"
+            return 1
+        self._close()  # unexpected content ends the array
+        return 0
+
+    def _close_object(self, frame: _Frame, text: str, i: int) -> int | None:
+        if frame.double:
+            if i + 1 >= len(text):
+                return None
+            if text[i + 1] == "}":
+                self._close()
+                return 2
+        self._close()
+        return 1
+
+    def _close(self):
+        self._stack.pop()
+        if not self._stack:
+            self.done = True
+
+    def _start_value(self, text: str, i: int) -> int | None:
+        c = text[i]
+        if c == "{":
+            if i + 1 >= len(text):
+                return None
+            double = text[i + 1] == "{"
+            obj: dict = {}
+            path = self._attach(obj)
+            self._stack.append(_Frame(obj, path, double))
+            return 2 if double else 1
+        if c == "[":
+            arr: list = []
+            path = self._attach(arr)
+            self._stack.append(_Frame(arr, path))
+            return 1
+        if c in "\"'`":
+            if i + 2 >= len(text):
+                return None
+            kind = "multiline" if text[i + 1 : i + 3] == c * 2 else "string"
+            token = _Token(kind, quote=c)
+            token.path = self._attach("")
+            token.container, token.slot = self._slot()
+            self._token = token
+            return 3 if kind == "multiline" else 1
+        if c.isdigit() or c in "-+":
+            self._token = _Token("number")
+            return 0
+        self._token = _Token("literal")
+        return 0
+
+    def _attach(self, value: Any) -> tuple:
+        # place a value into the current container, returns its path
+        if not self._stack:
+            self._result = value
+            path: tuple = ()
+        else:
+            frame = self._stack[-1]
+            if isinstance(frame.container, dict):
+                frame.container[frame.key] = value
+                path = frame.path + (frame.key,)
+            else:
+                frame.container.append(value)
+                path = frame.path + (len(frame.container) - 1,)
+            frame.state = "after"
+        self._events.append((path, value))
+        return path
+
+    def _slot(self) -> tuple[dict | list | None, Any]:
+        # container and key/index of the value attached last
+        if not self._stack:
+            return None, None
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            return frame.container, frame.key
+        return frame.container, len(frame.container) - 1
+
+    def _set(self, token: _Token, value: Any):
+        self._place(token, value)
+        self._events.append((token.path, value))
+
+    def _place(self, token: _Token, value: Any):
+        if token.container is None:
+            self._result = value
+        else:
+            token.container[token.slot] = value  # type: ignore
+
+    def _finish_scalar(self, value: Any):
+        self._token = None
+        if not self._stack:
+            self.done = True
+        self._attach(value)
+
+    def _step_token(self, text: str, i: int) -> int | None:
+        token: _Token = self._token  # type: ignore
+        c = text[i]
+
+        if token.kind == "line_comment":
+            end = text.find("\n", i)
+            if end == -1:
+                return len(text) - i
+            self._token = None
+            return end - i + 1
+
+        if token.kind == "block_comment":
+            end = text.find("*/", i)
+            if end == -1:
+                # a trailing * may be the start of */
+                return max(len(text) - i - 1, 0) or None
+            self._token = None
+            return end - i + 2
+
+        if token.kind == "string":
+            run = _STRING_RUN[token.quote].match(text, i)
+            if run:
+                token.parts.append(run.group())
+                return run.end() - i
+            if c == token.quote:
+                self._end_string(token, "".join(token.parts))
+                return 1
+            # escape sequence
+            if i + 1 >= len(text):
+                return None
+            e = text[i + 1]
+            if e != "u":
+                token.parts.append(_ESCAPES.get(e, e))
+                return 2
+            digits = ""
+            for j in range(i + 2, min(i + 6, len(text))):
+                if not text[j].isalnum():
+                    break
+                digits += text[j]
+            else:
+                if len(digits) < 4:
+                    return None  # wait for the rest of \uXXXX
+            try:
+                token.parts.append(chr(int(digits, 16)) if len(digits) == 4 else "\\u" + digits)
+            except ValueError:
+                token.parts.append("\\u" + digits)
+            return 2 + len(digits)
+
+        if token.kind == "multiline":
+            end = text.find(token.quote * 3, i)
+            if end == -1:
+                # last two chars may be the start of the closing quotes
+                safe = len(text) - 2
+                if safe <= i:
+                    return None
+                token.parts.append(text[i:safe])
+                return safe - i
+            token.parts.append(text[i:end])
+            self._end_string(token, "".join(token.parts).strip())
+            return end - i + 3
+
+        if token.kind == "number":
+            run = _NUMBER_RUN.match(text, i)
+            if run:
+                token.parts.append(run.group())
+                return run.end() - i
+            number = "".join(token.parts)
+            try:
+                value: Any = int(number)
+            except ValueError:
+                try:
+                    value = float(number)
+                except ValueError:
+                    value = number
+            self._finish_scalar(value)
+            return 0
+
+        if token.kind == "literal":
+            end = _LITERAL_END.search(text, i)
+            if not end:
+                token.parts.append(text[i:])
+                return len(text) - i
+            token.parts.append(text[i : end.start()])
+            value = "".join(token.parts).strip()
+            self._finish_scalar(_LITERALS.get(value.lower(), value))
+            return end.start() - i
+
+        # unquoted key
+        end = _KEY_END.search(text, i)
+        if not end:
+            token.parts.append(text[i:])
+            return len(text) - i
+        token.parts.append(text[i : end.start()])
+        self._end_key("".join(token.parts))
+        return end.start() - i
+
+    def _end_string(self, token: _Token, value: str):
+        self._token = None
+        self._partial = False
+        if token.is_key:
+            self._end_key(value)
+            return
+        self._set(token, value)
+        if not self._stack:
+            self.done = True
+
+    def _end_key(self, key: str):
+        self._token = None
+        frame = self._stack[-1]
+        frame.key = key
+        frame.state = "colon"
+
+    def _flush_partial(self):
+        # report the text streamed by this chunk, the joined value is built when read
+        token = self._token
+        if token and token.kind in ("string", "multiline") and not token.is_key:
+            if len(token.parts) > token.exposed:
+                added = "".join(token.parts[token.exposed :])
+                token.exposed = len(token.parts)
+                self._partial = True
+                self._events.append((token.path, added))
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterator, Optional, Sequence
+
+from langchain_core.stores import ByteStore
+
+from python.helpers import files
+from python.helpers.print_style import PrintStyle
+
+CACHE_FILE = "memory/embeddings.db"
+
+# evict a bit below the budget so not every insert triggers eviction
+EVICT_TARGET_RATIO = 0.9
+
+
+class EmbeddingCache(ByteStore):
+    """
+    Persistent embedding cache in a single SQLite file, shared by all embedders.
+    Keys are namespaced by the embedding model and hashed text by CacheBackedEmbeddings.
+    Least recently used entries are evicted once the stored bytes exceed the budget.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings(accessed)"
+        )
+        self.conn.commit()
+        self.bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def mget(self, keys: Sequence[str]) -> list[Optional[bytes]]:
+        if not keys:
+            return []
+        with self.lock:
+            found: dict[str, bytes] = {}
+            for chunk in _chunks(list(keys)):
+                rows = self.conn.execute(
+                    f"SELECT key, value FROM embeddings WHERE key IN ({_params(chunk)})",
+                    chunk,
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE embeddings SET accessed=? WHERE key=?",
+                    [(now, key) for key in found],
+                )
+                self.conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return [found.get(key) for key in keys]
+
+    def mset(self, key_value_pairs: Sequence[tuple[str, bytes]]) -> None:
+        if not key_value_pairs:
+            return
+        with self.lock:
+            now = time.time()
+            keys = [key for key, _ in key_value_pairs]
+            replaced = self._size_of(keys)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                [(key, value, len(value), now) for key, value in key_value_pairs],
+            )
+            self.conn.commit()
+            self.bytes += sum(len(value) for _, value in key_value_pairs) - replaced
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    def mdelete(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+        with self.lock:
+            self.bytes -= self._size_of(list(keys))
+            for chunk in _chunks(list(keys)):
+                self.conn.execute(
+                    f"DELETE FROM embeddings WHERE key IN ({_params(chunk)})", chunk
+                )
+            self.conn.commit()
+
+    def yield_keys(self, *, prefix: Optional[str] = None) -> Iterator[str]:
+        with self.lock:
+            if prefix:
+                rows = self.conn.execute(
+                    "SELECT key FROM embeddings WHERE substr(key, 1, ?) = ?",
+                    (len(prefix), prefix),
+                ).fetchall()
+            else:
+                rows = self.conn.execute("SELECT key FROM embeddings").fetchall()
+        for (key,) in rows:
+            yield key
+
+    def set_max_bytes(self, max_bytes: int):
+        with self.lock:
+            self.max_bytes = max_bytes
+            if self.bytes > self.max_bytes:
+                self._evict()
+
+    def stats(self) -> dict[str, int | float]:
+        with self.lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": count,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evicted": self.evicted,
+            }
+
+    def _size_of(self, keys: list[str]) -> int:
+        size = 0
+        for chunk in _chunks(keys):
+            size += self.conn.execute(
+                f"SELECT COALESCE(SUM(size), 0) FROM embeddings WHERE key IN ({_params(chunk)})",
+                chunk,
+            ).fetchone()[0]
+        return size
+
+    def _evict(self):
+        # drop least recently used entries until below the target size
+        target = int(self.max_bytes * EVICT_TARGET_RATIO)
+        to_free = self.bytes - target
+        if to_free <= 0:
+            return
+        freed = 0
+        keys = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM embeddings ORDER BY accessed"
+        ):
+            keys.append(key)
+            freed += size
+            if freed >= to_free:
+                break
+        for chunk in _chunks(keys):
+            self.conn.execute(
+                f"DELETE FROM embeddings WHERE key IN ({_params(chunk)})", chunk
+            )
+        self.conn.commit()
+        self.bytes -= freed
+        self.evicted += len(keys)
+        PrintStyle.standard(
+            f"Embedding cache evicted {len(keys)} entries ({freed} bytes)"
+        )
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EmbeddingCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from python.helpers import settings
+
+            max_mb = settings.get_settings()["memory_embedding_cache_mb"]
+            _cache = EmbeddingCache(files.get_abs_path(CACHE_FILE), max_mb * 1024 * 1024)
+        return _cache
+
+
+def set_max_mb(max_mb: int):
+    # only applies to an already opened cache, a new one reads the settings
+    if _cache:
+        _cache.set_max_bytes(max_mb * 1024 * 1024)
+
+
+def _params(chunk: list[str]) -> str:
+    return ",".join("?" * len(chunk))
+
+
+def _chunks(keys: list[str], size: int = 500):
+    # stay below sqlite's limit of bound parameters
+    for i in range(0, len(keys), size):
+        yield keys[i : i + size]
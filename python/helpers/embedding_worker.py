@@ -0,0 +1,103 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any
+
+import numpy as np
+
+from python.helpers.print_style import PrintStyle
+
+BATCH_WINDOW = 0.005  # seconds to wait for more requests to join a batch
+MAX_BATCH = 256  # texts encoded together at most
+
+
+class EmbeddingWorker:
+    """
+    Shared local sentence-transformers model running on a dedicated thread.
+    Concurrent requests are collected into micro-batches and encoded together,
+    callers get numpy arrays back through futures and never block the event loop.
+    """
+
+    def __init__(self, model_name: str, **kwargs: Any):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, **kwargs)
+        self.requests: queue.Queue[tuple[list[str], Future]] = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run, name=f"embeddings-{model_name}", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, texts: list[str]) -> Future:
+        future: Future = Future()
+        if not texts:
+            future.set_result(np.zeros((0, self.dimension()), dtype=np.float32))
+        else:
+            self.requests.put((texts, future))
+        return future
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return self.submit(texts).result()
+
+    async def aencode(self, texts: list[str]) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def dimension(self) -> int:
+        return int(self.model.get_sentence_embedding_dimension() or 0)
+
+    def _run(self):
+        # the thread is shared by all callers, nothing may end it
+        while True:
+            try:
+                batch = [self.requests.get()]
+                size = len(batch[0][0])
+                # collect whatever arrives within the window
+                while size < MAX_BATCH:
+                    try:
+                        item = self.requests.get(timeout=BATCH_WINDOW)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    size += len(item[0])
+                self._encode_batch(batch)
+            except Exception as e:
+                PrintStyle.error(f"Local embedding worker error: {e}")
+
+    def _encode_batch(self, batch: list[tuple[list[str], Future]]):
+        # requests cancelled by their caller (an awaiting task was cancelled) are skipped
+        batch = [
+            (request, future)
+            for request, future in batch
+            if future.set_running_or_notify_cancel()
+        ]
+        if not batch:
+            return
+        texts = [text for request, _ in batch for text in request]
+        try:
+            vectors = np.asarray(
+                self.model.encode(texts, convert_to_numpy=True), dtype=np.float32
+            )
+        except Exception as e:
+            PrintStyle.error(f"Local embedding failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        start = 0
+        for request, future in batch:
+            future.set_result(vectors[start : start + len(request)])
+            start += len(request)
+
+
+_workers: dict[str, EmbeddingWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_worker(model_name: str, **kwargs: Any) -> EmbeddingWorker:
+    # one worker, and one copy of the model, per model and load arguments
+    key = f"{model_name}|{sorted(kwargs.items())!r}"
+    with _workers_lock:
+        if key not in _workers:
+            _workers[key] = EmbeddingWorker(model_name, **kwargs)
+        return _workers[key]
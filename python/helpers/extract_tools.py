@@ -1,4 +1,5 @@
-import re, os, importlib, inspect
+import re, os, sys, importlib, inspect, threading, time
+from json import loads as json_loads
 from typing import Any, Type, TypeVar
 from .dirty_json import DirtyJson
 from .files import get_abs_path
@@ -11,6 +12,12 @@ def json_parse_dirty(json:str) -> dict[str,Any] | None:
 
     ext_json = extract_json_object_string(json.strip())
     if ext_json:
+        # well-formed responses take the strict parser, dirty json only repairs the rest
+        try:
+            data = json_loads(ext_json)
+            if isinstance(data,dict): return data
+        except ValueError:
+            pass
         try:
             data = DirtyJson.parse_string(ext_json)
             if isinstance(data,dict): return data
@@ -85,3 +92,81 @@ def load_classes_from_folder(folder: str, name_pattern: str, base_class: Type[T]
                     break
 
     return classes
+
+
+# process-wide registry of loaded classes, folders are scanned only once
+_registry: dict[tuple, list] = {}
+_signatures: dict[str, dict[str, float]] = {}  # folder -> {file name: mtime} at load time
+_registry_lock = threading.RLock()
+_watcher: threading.Thread | None = None
+
+WATCH_INTERVAL = 1.0  # seconds between checks of the file watcher
+
+
+def get_classes_from_folder(folder: str, name_pattern: str, base_class: Type[T], one_per_file: bool = True) -> list[Type[T]]:
+    key = (folder, name_pattern, base_class, one_per_file)
+    classes = _registry.get(key)
+    if classes is None:
+        with _registry_lock:
+            classes = _registry.get(key)
+            if classes is None:
+                if folder not in _signatures:
+                    _signatures[folder] = _folder_signature(folder)
+                classes = load_classes_from_folder(folder, name_pattern, base_class, one_per_file)
+                _registry[key] = classes
+    return classes
+
+
+def clear_registry(folder: str | None = None):
+    with _registry_lock:
+        for key in list(_registry):
+            if folder is None or key[0] == folder:
+                del _registry[key]
+        if folder is None:
+            _signatures.clear()
+        else:
+            _signatures.pop(folder, None)
+
+
+def watch_class_folders(interval: float = WATCH_INTERVAL):
+    # development only, reloads changed modules and invalidates their folders
+    global _watcher
+    if _watcher:
+        return
+    _watcher = threading.Thread(target=_watch, args=(interval,), name="ClassWatcher", daemon=True)
+    _watcher.start()
+
+
+def _watch(interval: float):
+    while True:
+        time.sleep(interval)
+        with _registry_lock:
+            folders = list(_signatures.items())
+        for folder, old in folders:
+            try:
+                new = _folder_signature(folder)
+            except OSError:
+                continue
+            if new == old:
+                continue
+            with _registry_lock:
+                for file_name, mtime in new.items():
+                    if old.get(file_name) not in (None, mtime):
+                        module = sys.modules.get(folder.replace("/", ".") + "." + file_name[:-3])
+                        if module:
+                            try:
+                                importlib.reload(module)
+                            except Exception as e:
+                                from python.helpers.print_style import PrintStyle
+                                PrintStyle.error(f"Reloading {file_name} failed: {e}")
+                clear_registry(folder)
+                _signatures[folder] = new
+
+
+def _folder_signature(folder: str) -> dict[str, float]:
+    abs_folder = get_abs_path(folder)
+    return {
+        file_name: os.path.getmtime(os.path.join(abs_folder, file_name))
+        for file_name in os.listdir(abs_folder)
+        if file_name.endswith(".py")
+    }
@@ -21,8 +21,19 @@ class VariablesPlugin(ABC):
 
 
 def load_plugin_variables(file: str, backup_dirs: list[str] | None = None) -> dict[str, Any]:
-    if not file.endswith(".md"):
+    plugin_file = find_plugin_file(file, backup_dirs)
+    if not plugin_file:
+        return {}
+    plugin_class = load_plugin_class(plugin_file)
+    if not plugin_class:
         return {}
+    return plugin_class().get_variables()  # type: ignore
+
+
+def find_plugin_file(file: str, backup_dirs: list[str] | None = None) -> str | None:
+    # companion .py file of a .md prompt, in the same folder or the backup dirs
+    if not file.endswith(".md"):
+        return None
 
     if backup_dirs is None:
         backup_dirs = []
@@ -33,33 +44,36 @@ def load_plugin_variables(file: str, backup_dirs: list[str] | None = None) -> di
             backup_dirs
         )
     except FileNotFoundError:
-        plugin_file = None
-
-    if plugin_file and exists(plugin_file):
-        # load python code and extract variables variables from it
-        module = None
-        module_name = dirname(plugin_file).replace("/", ".") + "." + basename(plugin_file, '.py')
-        try:
-            spec = importlib.util.spec_from_file_location(module_name, plugin_file)
-            if not spec:
-                return {}
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[spec.name] = module
-            spec.loader.exec_module(module)  # type: ignore
-        except ImportError:
-            return {}
-
-        if module is None:
-            return {}
-
-        # Get all classes in the module
-        class_list = inspect.getmembers(module, inspect.isclass)
-        # Filter for classes that are subclasses of VariablesPlugin
-        # iterate backwards to skip imported superclasses
-        for cls in reversed(class_list):
-            if cls[1] is not VariablesPlugin and issubclass(cls[1], VariablesPlugin):
-                return cls[1]().get_variables()  # type: ignore
-    return {}
+        return None
+
+    return plugin_file if exists(plugin_file) else None
+
+
+def load_plugin_class(plugin_file: str) -> type[VariablesPlugin] | None:
+    # load python code and extract variables plugin class from it
+    module = None
+    module_name = dirname(plugin_file).replace("/", ".") + "." + basename(plugin_file, '.py')
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, plugin_file)
+        if not spec:
+            return None
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
+        spec.loader.exec_module(module)  # type: ignore
+    except ImportError:
+        return None
+
+    if module is None:
+        return None
+
+    # Get all classes in the module
+    class_list = inspect.getmembers(module, inspect.isclass)
+    # Filter for classes that are subclasses of VariablesPlugin
+    # iterate backwards to skip imported superclasses
+    for cls in reversed(class_list):
+        if cls[1] is not VariablesPlugin and issubclass(cls[1], VariablesPlugin):
+            return cls[1]
+    return None
 
 from python.helpers.strings import sanitize_string
 
@@ -2,6 +2,7 @@ from abc import abstractmethod
 import asyncio
 from collections import OrderedDict
 from collections.abc import Mapping
+from contextvars import ContextVar
 import json
 import math
 from typing import Coroutine, Literal, TypedDict, cast, Union, Dict, List, Any
@@ -17,6 +18,12 @@ HISTORY_BULK_RATIO = 0.2
 TOPIC_COMPRESS_RATIO = 0.65
 LARGE_MESSAGE_TO_TOPIC_RATIO = 0.25
 RAW_MESSAGE_OUTPUT_TEXT_TRIM = 100
+SUMMARY_TOKENS_ESTIMATE = 500  # expected size of a summary when planning compression
+COMPRESSION_CONCURRENCY = 4  # summarizations of one compression round running at once
+SOFT_COMPRESS_RATIO = 0.8  # share of the budgets topics and bulks are summarized to in idle time
+
+# set in idle time summarization, its utility calls must not take the user's intervention
+_background: ContextVar[bool] = ContextVar("history_background", default=False)
 
 
 class RawMessage(TypedDict):
@@ -74,13 +81,22 @@ class Record:
     def output_text(self, human_label="user", ai_label="ai"):
         return output_text(self.output(), ai_label, human_label)
 
+    def get_summary_tokens(self) -> int:
+        # counted once per summary text instead of on every limit check
+        summary: str = getattr(self, "summary", "")
+        cached = getattr(self, "_summary_tokens", None)
+        if not cached or cached[0] != summary:
+            cached = (summary, tokens.approximate_tokens(summary))
+            self._summary_tokens = cached
+        return cached[1]
+
 
 class Message(Record):
     def __init__(self, ai: bool, content: MessageContent, tokens: int = 0):
         self.ai = ai
         self.content = content
         self.summary: str = ""
-        self.tokens: int = tokens or self.calculate_tokens()
+        self.tokens: int = tokens  # counted lazily on first use
 
     def get_tokens(self) -> int:
         if not self.tokens:
@@ -93,7 +109,7 @@ class Message(Record):
 
     def set_summary(self, summary: str):
         self.summary = summary
-        self.tokens = self.calculate_tokens()
+        self.tokens = 0
 
     async def compress(self):
         return False
@@ -133,7 +149,7 @@ class Topic(Record):
 
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            return self.get_summary_tokens()
         else:
             return sum(msg.get_tokens() for msg in self.messages)
 
@@ -155,7 +171,7 @@ class Topic(Record):
         self.summary = await self.summarize_messages(self.messages)
         return self.summary
 
-    async def compress_large_messages(self) -> bool:
+    def compress_large_messages(self) -> bool:
         set = settings.get_settings()
         msg_max_size = (
             set["chat_model_ctx_length"]
@@ -195,15 +211,32 @@ class Topic(Record):
         return False
 
     async def compress(self) -> bool:
-        compress = await self.compress_large_messages()
+        compress = self.compress_large_messages()
         if not compress:
             compress = await self.compress_attention()
         return compress
 
-    async def compress_attention(self) -> bool:
+    def plan_attention(self, excess: float) -> int:
+        # number of messages after the first to summarize at once to free the excess,
+        # the last message is always kept
+        if len(self.messages) <= 2:
+            return 0
+        count = math.ceil((len(self.messages) - 2) * TOPIC_COMPRESS_RATIO)
+        freed = (
+            sum(m.get_tokens() for m in self.messages[1 : count + 1])
+            - SUMMARY_TOKENS_ESTIMATE
+        )
+        while freed < excess and count < len(self.messages) - 2:
+            count += 1
+            freed += self.messages[count].get_tokens()
+        return count
+
+    async def compress_attention(self, count: int = 0) -> bool:
 
         if len(self.messages) > 2:
-            cnt_to_sum = math.ceil((len(self.messages) - 2) * TOPIC_COMPRESS_RATIO)
+            cnt_to_sum = count or math.ceil(
+                (len(self.messages) - 2) * TOPIC_COMPRESS_RATIO
+            )
             msg_to_sum = self.messages[1 : cnt_to_sum + 1]
             summary = await self.summarize_messages(msg_to_sum)
             sum_msg_content = self.history.agent.parse_prompt(
@@ -217,12 +250,7 @@ class Topic(Record):
     async def summarize_messages(self, messages: list[Message]):
         # FIXME: vision bytes are sent to utility LLM, send summary instead
         msg_txt = [m.output_text() for m in messages]
-        summary = await self.history.agent.call_utility_model(
-            system=self.history.agent.read_prompt("fw.topic_summary.sys.md"),
-            message=self.history.agent.read_prompt(
-                "fw.topic_summary.msg.md", content=msg_txt
-            ),
-        )
+        summary = await self.history.summarize_content(msg_txt)
         return summary
 
     def to_dict(self):
@@ -250,7 +278,7 @@ class Bulk(Record):
 
     def get_tokens(self):
         if self.summary:
-            return tokens.approximate_tokens(self.summary)
+            return self.get_summary_tokens()
         else:
             return sum([r.get_tokens() for r in self.records])
 
@@ -267,12 +295,7 @@ class Bulk(Record):
         return False
 
     async def summarize(self):
-        self.summary = await self.history.agent.call_utility_model(
-            system=self.history.agent.read_prompt("fw.topic_summary.sys.md"),
-            message=self.history.agent.read_prompt(
-                "fw.topic_summary.msg.md", content=self.output_text()
-            ),
-        )
+        self.summary = await self.history.summarize_content(self.output_text())
         return self.summary
 
     def to_dict(self):
@@ -299,6 +322,14 @@ class History(Record):
         self.topics: list[Topic] = []
         self.current = Topic(history=self)
         self.agent: Agent = agent
+        # converted output is extended while messages are only appended,
+        # any change to existing records bumps the version and converts again
+        self.version = 0
+        self._output_version = -1
+        self._output: list[OutputMessage] = []
+        self._output_langchain: list[BaseMessage] = []
+        self._appended: list[Message] = []
+        self.added = 0  # messages added in this session, tells apart appends the version does not
 
     def get_tokens(self) -> int:
         return (
@@ -312,6 +343,15 @@ class History(Record):
         total = self.get_tokens()
         return total > limit
 
+    def is_over_soft_limit(self):
+        # topics or bulks worth summarizing ahead of time
+        total = _get_ctx_size_for_history() * SOFT_COMPRESS_RATIO
+        return (
+            self.get_topics_tokens() > HISTORY_TOPIC_RATIO * total
+            or len(self.bulks) > 1
+            and self.get_bulks_tokens() > HISTORY_BULK_RATIO * total
+        )
+
     def get_bulks_tokens(self) -> int:
         return sum(record.get_tokens() for record in self.bulks)
 
@@ -324,7 +364,10 @@ class History(Record):
     def add_message(
         self, ai: bool, content: MessageContent, tokens: int = 0
     ) -> Message:
-        return self.current.add_message(ai, content=content, tokens=tokens)
+        msg = self.current.add_message(ai, content=content, tokens=tokens)
+        self._appended.append(msg)
+        self.added += 1
+        return msg
 
     def new_topic(self):
         if self.current.messages:
@@ -338,11 +381,32 @@ class History(Record):
         result += self.current.output()
         return result
 
+    def output_cached(self) -> tuple[list[OutputMessage], list[BaseMessage]]:
+        # output and its langchain form, only messages added since the last call are converted
+        if self._output_version != self.version:
+            self._appended = []
+            self._output = self.output()
+            self._output_langchain = output_langchain(self._output)
+            self._output_version = self.version
+        elif self._appended:
+            added = [o for m in self._appended for o in m.output()]
+            self._appended = []
+            self._output += added
+            self._output_langchain = append_langchain(
+                self._output_langchain, output_langchain(added)
+            )
+        return list(self._output), list(self._output_langchain)
+
+    def touch(self):
+        # existing records changed, cached output is converted again
+        self.version += 1
+
     @staticmethod
     def from_dict(data: dict, history: "History"):
         history.bulks = [Bulk.from_dict(b, history=history) for b in data["bulks"]]
         history.topics = [Topic.from_dict(t, history=history) for t in data["topics"]]
         history.current = Topic.from_dict(data["current"], history=history)
+        history.touch()
         return history
 
     def to_dict(self):
@@ -357,82 +421,121 @@ class History(Record):
         data = self.to_dict()
         return _json_dumps(data)
 
-    async def compress(self):
+    async def compress(self, ratio: float = 1.0, idle: bool = False):
+        # each round plans every summarization needed to fit the budgets and runs
+        # them concurrently, the next round corrects for summaries larger than estimated
         compressed = False
         while True:
-            curr, hist, bulk = (
-                self.get_current_topic_tokens(),
-                self.get_topics_tokens(),
-                self.get_bulks_tokens(),
-            )
-            total = _get_ctx_size_for_history()
-            ratios = [
-                (curr, CURRENT_TOPIC_RATIO, "current_topic"),
-                (hist, HISTORY_TOPIC_RATIO, "history_topic"),
-                (bulk, HISTORY_BULK_RATIO, "history_bulk"),
-            ]
-            ratios = sorted(ratios, key=lambda x: (x[0] / total) / x[1], reverse=True)
-            compressed_part = False
-            for ratio in ratios:
-                if ratio[0] > ratio[1] * total:
-                    over_part = ratio[2]
-                    if over_part == "current_topic":
-                        compressed_part = await self.current.compress()
-                    elif over_part == "history_topic":
-                        compressed_part = await self.compress_topics()
-                    else:
-                        compressed_part = await self.compress_bulks()
-                    if compressed_part:
-                        break
-
-            if compressed_part:
-                compressed = True
-                continue
-            else:
+            changed, jobs = await self.plan_compression(ratio, idle)
+            if jobs:
+                await self.run_compression(jobs)
+            elif not changed:
                 return compressed
-
-    async def compress_topics(self) -> bool:
-        # summarize topics one by one
+            self.touch()
+            compressed = True
+
+    async def presummarize(self):
+        # idle time summarization of topics and bulks below their budgets so the next
+        # prompt does not wait for it
+        token = _background.set(True)
+        try:
+            return await self.compress(SOFT_COMPRESS_RATIO, idle=True)
+        finally:
+            _background.reset(token)
+
+    async def plan_compression(
+        self, ratio: float = 1.0, idle: bool = False
+    ) -> tuple[bool, list[Coroutine]]:
+        # cheap changes are applied right away, summarizations are returned as jobs,
+        # in idle time the still growing current topic is left alone and nothing is removed
+        total = _get_ctx_size_for_history() * ratio
+        jobs: list[Coroutine] = []
+        changed = False
+        if not idle:
+            changed = self.plan_current_topic(CURRENT_TOPIC_RATIO * total, jobs)
+        changed = self.plan_topics(HISTORY_TOPIC_RATIO * total, jobs) or changed
+        # topics moved to bulks above are counted in the bulks budget
+        changed = self.plan_bulks(HISTORY_BULK_RATIO * total, jobs, remove=not idle) or changed
+        return changed, jobs
+
+    def plan_current_topic(self, budget: float, jobs: list[Coroutine]) -> bool:
+        changed = False
+        # large messages are truncated first, no model call needed
+        while self.current.get_tokens() > budget and self.current.compress_large_messages():
+            changed = True
+        excess = self.current.get_tokens() - budget
+        if excess > 0:
+            count = self.current.plan_attention(excess)
+            if count:
+                jobs.append(self.current.compress_attention(count))
+        return changed
+
+    def plan_topics(self, budget: float, jobs: list[Coroutine]) -> bool:
+        projected = self.get_topics_tokens()
+        # summarize as many of the oldest topics as the estimate says are needed
         for topic in self.topics:
+            if projected <= budget:
+                break
             if not topic.summary:
-                await topic.summarize()
-                return True
-
-        # move oldest topic to bulks and summarize
-        for topic in self.topics:
+                tokens = topic.get_tokens()
+                jobs.append(topic.summarize())
+                projected -= tokens - min(tokens, SUMMARY_TOKENS_ESTIMATE)
+
+        # move oldest summarized topics to bulks, order is kept so stop at a pending one
+        moved = False
+        while projected > budget and self.topics and self.topics[0].summary:
+            topic = self.topics.pop(0)
             bulk = Bulk(history=self)
             bulk.records.append(topic)
-            if topic.summary:
-                bulk.summary = topic.summary
-            else:
-                await bulk.summarize()
+            bulk.summary = topic.summary
             self.bulks.append(bulk)
-            self.topics.remove(topic)
-            return True
-        return False
-
-    async def compress_bulks(self):
-        # merge bulks if possible
-        compressed = await self.merge_bulks_by(BULK_MERGE_COUNT)
-        # remove oldest bulk if necessary
-        if not compressed:
+            projected -= topic.get_tokens()
+            moved = True
+        return moved
+
+    def plan_bulks(
+        self, budget: float, jobs: list[Coroutine], remove: bool = True
+    ) -> bool:
+        if self.get_bulks_tokens() <= budget:
+            return False
+        # merge bulks in groups of count, even if there are fewer than count
+        if len(self.bulks) > 1:
+            for i in range(0, len(self.bulks), BULK_MERGE_COUNT):
+                jobs.append(self.merge_bulks_group(self.bulks[i : i + BULK_MERGE_COUNT]))
+            return False
+        # a single bulk over the budget is removed
+        if remove:
             self.bulks.pop(0)
             return True
-        return compressed
+        return False
 
-    async def merge_bulks_by(self, count: int):
-        # if bulks is empty, return False
-        if len(self.bulks) == 0:
-            return False
-        # merge bulks in groups of count, even if there are fewer than count
-        bulks = await asyncio.gather(
-            *[
-                self.merge_bulks(self.bulks[i : i + count])
-                for i in range(0, len(self.bulks), count)
-            ]
+    async def run_compression(self, jobs: list[Coroutine]):
+        semaphore = asyncio.Semaphore(COMPRESSION_CONCURRENCY)
+
+        async def run(job: Coroutine):
+            async with semaphore:
+                return await job
+
+        # jobs change distinct records, finished ones are kept if another one fails
+        results = await asyncio.gather(*[run(job) for job in jobs], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def merge_bulks_group(self, group: list[Bulk]):
+        merged = await self.merge_bulks(group)
+        # other groups may have been replaced meanwhile, the position is looked up now
+        index = self.bulks.index(group[0])
+        self.bulks[index : index + len(group)] = [merged]
+
+    async def summarize_content(self, content: MessageContent) -> str:
+        background = _background.get()
+        return await self.agent.call_utility_model(
+            system=self.agent.read_prompt("fw.topic_summary.sys.md"),
+            message=self.agent.read_prompt("fw.topic_summary.msg.md", content=content),
+            background=background,
+            interruptible=not background,
         )
-        self.bulks = bulks
-        return True
 
     async def merge_bulks(self, bulks: list[Bulk]) -> Bulk:
         bulk = Bulk(history=self)
@@ -526,6 +629,15 @@ def output_langchain(messages: list[OutputMessage]):
     return result
 
 
+def append_langchain(
+    messages: list[BaseMessage], added: list[BaseMessage]
+) -> list[BaseMessage]:
+    # same result as grouping the whole list, only the boundary can merge
+    if messages and added and isinstance(messages[-1], type(added[0])):
+        return messages[:-1] + group_messages_abab([messages[-1], *added])
+    return messages + added
+
+
 def output_text(messages: list[OutputMessage], ai_label="ai", human_label="human"):
     return "\n".join(_stringify_output(o, ai_label, human_label) for o in messages)
 
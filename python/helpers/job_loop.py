@@ -5,6 +5,7 @@ from python.helpers.task_scheduler import TaskScheduler
 from python.helpers.print_style import PrintStyle
 from python.helpers import errors
 from python.helpers import runtime
+from python.helpers import persist_chat
 
 
 SLEEP_TIME = 60
@@ -31,6 +32,11 @@ async def run_loop():
                 await scheduler_tick()
             except Exception as e:
                 PrintStyle().error(errors.format_error(e))
+        # idle chats go back to disk, also in a paused loop
+        try:
+            persist_chat.unload_idle_chats()
+        except Exception as e:
+            PrintStyle().error(errors.format_error(e))
         await asyncio.sleep(SLEEP_TIME)  # TODO! - if we lower it under 1min, it can run a 5min job multiple times in it's target minute
 
 
@@ -1,8 +1,17 @@
 import glob
 import os
 import hashlib
+import multiprocessing
 import json
-from typing import Any, Dict, Literal, TypedDict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, Literal, NotRequired, TypedDict
 from langchain_community.document_loaders import (
     CSVLoader,
     JSONLoader,
@@ -21,54 +30,133 @@ text_loader_kwargs = {"autodetect_encoding": True}
 class KnowledgeImport(TypedDict):
     file: str
     checksum: str
+    mtime: NotRequired[float]
+    size: NotRequired[int]
     ids: list[str]
     state: Literal["changed", "original", "removed"]
-    documents: list[Any]
+
+
+class KnowledgeJob(TypedDict):
+    file: str
+    checksum: str
+    mtime: float
+    size: int
+    metadata: dict[str, Any]
+
+
+# Mapping file extensions to corresponding loader classes
+file_types_loaders = {
+    "txt": TextLoader,
+    "pdf": PyPDFLoader,
+    "csv": CSVLoader,
+    "html": UnstructuredHTMLLoader,
+    # "json": JSONLoader,
+    "json": TextLoader,
+    # "md": UnstructuredMarkdownLoader,
+    "md": TextLoader,
+}
+
+PROGRESS_EVERY = 50  # files between progress updates
+MAX_WORKERS = 4  # import runs next to the agent, leave it the rest of the cpu
+PROCESS_TYPES = {"pdf", "html"}  # parsed in worker processes, other loaders mostly read files
+PENDING_PER_WORKER = 2  # files parsed ahead of the embedding, bounds documents held in memory
 
 
 def calculate_checksum(file_path: str) -> str:
     hasher = hashlib.md5()
     with open(file_path, "rb") as f:
-        buf = f.read()
-        hasher.update(buf)
+        for buf in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(buf)
     return hasher.hexdigest()
 
 
-def load_knowledge(
+def load_file(file_path: str) -> list[Any]:
+    ext = file_path.split(".")[-1].lower()
+    loader_cls = file_types_loaders[ext]
+    loader = loader_cls(
+        file_path,
+        **(text_loader_kwargs if ext in ["txt", "csv", "html", "md"] else {}),
+    )
+    return loader.load_and_split()
+
+
+def _process_file(file_path: str, checksum: str) -> tuple[str, list[Any] | None]:
+    # runs in a worker process, parses the file only when its content changed
+    new_checksum = calculate_checksum(file_path)
+    if new_checksum == checksum:
+        return new_checksum, None
+    return new_checksum, load_file(file_path)
+
+
+def _start_process_pool(workers: int) -> ProcessPoolExecutor | None:
+    try:
+        # spawn, forking a process with running event loop threads is not safe
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    except Exception as e:
+        # no process support in this environment, threads parse everything
+        PrintStyle.error(f"Knowledge import process pool unavailable: {e}")
+        return None
+
+
+def _process_files(
+    jobs: list[tuple[str, str]],
+) -> Iterator[tuple[str, str, list[Any] | None]]:
+    # hash and parse files in parallel, yields results as they complete
+    # only a few files are parsed ahead of the consumer, pools only live for one import
+    workers = min(MAX_WORKERS, os.cpu_count() or 1)
+    cpu_jobs = {job for job in jobs if job[0].split(".")[-1].lower() in PROCESS_TYPES}
+    threads = ThreadPoolExecutor(max_workers=workers)
+    processes = _start_process_pool(workers) if cpu_jobs else None
+    queued = iter(jobs)
+    futures: dict[Future, tuple[str, str]] = {}
+
+    def submit():
+        for file_path, checksum in queued:
+            pool = processes if processes and (file_path, checksum) in cpu_jobs else threads
+            futures[pool.submit(_process_file, file_path, checksum)] = (file_path, checksum)
+            if len(futures) >= workers * PENDING_PER_WORKER:
+                return
+
+    try:
+        submit()
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, checksum = futures.pop(future)
+                try:
+                    yield file_path, *future.result()
+                except BrokenProcessPool:
+                    yield file_path, *_process_file(file_path, checksum)
+                except Exception as e:
+                    # keep the previous version, the file is retried on next import
+                    PrintStyle.error(f"Error importing knowledge file {file_path}: {e}")
+                    yield file_path, "", None
+            submit()
+    finally:
+        threads.shutdown(cancel_futures=True)
+        if processes:
+            processes.shutdown(cancel_futures=True)
+
+
+def scan_knowledge(
     log_item: LogItem | None,
     knowledge_dir: str,
     index: Dict[str, KnowledgeImport],
     metadata: dict[str, Any] = {},
     filename_pattern: str = "**/*",
-) -> Dict[str, KnowledgeImport]:
-
-    # from python.helpers.memory import Memory
-
-    # Mapping file extensions to corresponding loader classes
-    file_types_loaders = {
-        "txt": TextLoader,
-        "pdf": PyPDFLoader,
-        "csv": CSVLoader,
-        "html": UnstructuredHTMLLoader,
-        # "json": JSONLoader,
-        "json": TextLoader,
-        # "md": UnstructuredMarkdownLoader,
-        "md": TextLoader,
-    }
-
-    cnt_files = 0
-    cnt_docs = 0
-
-    # for area in Memory.Area:
-    #     subdir = files.get_abs_path(knowledge_dir, area.value)
-
-    # if not os.path.exists(knowledge_dir):
-    #     os.makedirs(knowledge_dir)
-    #     continue
+) -> list[KnowledgeJob]:
+    # marks unchanged files, returns the ones to hash and parse by iter_document_batches
 
     # Fetch all files in the directory with specified extensions
     kn_files = glob.glob(knowledge_dir + "/" + filename_pattern, recursive=True)
-    kn_files = [f for f in kn_files if os.path.isfile(f)]
+    kn_files = [
+        f
+        for f in kn_files
+        if f.split(".")[-1].lower() in file_types_loaders and os.path.isfile(f)
+    ]
 
     if kn_files:
         PrintStyle.standard(
@@ -79,49 +167,84 @@ def load_knowledge(
                 progress=f"\nFound {len(kn_files)} knowledge files in {knowledge_dir}, processing...",
             )
 
+    # unchanged mtime and size means unchanged file, no need to read it
+    jobs: list[KnowledgeJob] = []
     for file_path in kn_files:
-        ext = file_path.split(".")[-1].lower()
-        if ext in file_types_loaders:
-            checksum = calculate_checksum(file_path)
-            file_key = file_path  # os.path.relpath(file_path, knowledge_dir)
-
-            # Load existing data from the index or create a new entry
-            file_data = index.get(file_key, {})
-
-            if file_data.get("checksum") == checksum:
-                file_data["state"] = "original"
-            else:
-                file_data["state"] = "changed"
-
-            if file_data["state"] == "changed":
-                file_data["checksum"] = checksum
-                loader_cls = file_types_loaders[ext]
-                loader = loader_cls(
-                    file_path,
-                    **(
-                        text_loader_kwargs
-                        if ext in ["txt", "csv", "html", "md"]
-                        else {}
-                    ),
-                )
-                file_data["documents"] = loader.load_and_split()
-                for doc in file_data["documents"]:
-                    doc.metadata = {**doc.metadata, **metadata}
-                cnt_files += 1
-                cnt_docs += len(file_data["documents"])
-                # PrintStyle.standard(f"Imported {len(file_data['documents'])} documents from {file_path}")
-
-            # Update the index
-            index[file_key] = file_data  # type: ignore
+        file_key = file_path  # os.path.relpath(file_path, knowledge_dir)
+        file_data = index.get(file_key, {})
+        stat = os.stat(file_path)
+        if not (
+            file_data.get("checksum")
+            and file_data.get("mtime") == stat.st_mtime
+            and file_data.get("size") == stat.st_size
+        ):
+            jobs.append(
+                {
+                    "file": file_path,
+                    "checksum": file_data.get("checksum", ""),
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "metadata": metadata,
+                }
+            )
+        # the final state of files to process is set when they are parsed
+        file_data["state"] = "original"
+        index[file_key] = file_data  # type: ignore
 
     # loop index where state is not set and mark it as removed
     for file_key, file_data in index.items():
         if not file_data.get("state", ""):
             index[file_key]["state"] = "removed"
 
+    return jobs
+
+
+def iter_document_batches(
+    log_item: LogItem | None,
+    index: Dict[str, KnowledgeImport],
+    jobs: list[KnowledgeJob],
+    batch_size: int,
+) -> Iterator[list[tuple[str, Any]]]:
+    # documents of changed files in batches of (file key, document), across file boundaries
+    # files are parsed while earlier batches are embedded, the corpus is never held at once
+    cnt_files = 0
+    cnt_docs = 0
+    by_file = {job["file"]: job for job in jobs}
+    batch: list[tuple[str, Any]] = []
+
+    for done, (file_path, checksum, documents) in enumerate(
+        _process_files([(job["file"], job["checksum"]) for job in jobs]), start=1
+    ):
+        job = by_file[file_path]
+        file_key = file_path
+        file_data = index[file_key]
+        if checksum:
+            file_data["mtime"] = job["mtime"]
+            file_data["size"] = job["size"]
+
+        if documents is None:
+            file_data["state"] = "original"
+        else:
+            file_data["state"] = "changed"
+            file_data["checksum"] = checksum
+            for doc in documents:
+                doc.metadata = {**doc.metadata, **job["metadata"]}
+                batch.append((file_key, doc))
+            cnt_files += 1
+            cnt_docs += len(documents)
+
+        if log_item and done % PROGRESS_EVERY == 0:
+            log_item.stream(progress=f"\nProcessed {done}/{len(jobs)} files")
+
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+
+    if batch:
+        yield batch
+
     PrintStyle.standard(f"Processed {cnt_docs} documents from {cnt_files} files.")
     if log_item:
         log_item.stream(
             progress=f"\nProcessed {cnt_docs} documents from {cnt_files} files."
         )
-    return index
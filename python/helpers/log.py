@@ -1,3 +1,4 @@
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 import json
 from typing import Any, Literal, Optional, Dict
@@ -31,6 +32,9 @@ KEY_MAX_LEN: int = 60
 VALUE_MAX_LEN: int = 3000
 PROGRESS_MAX_LEN: int = 120
 
+# name of the parallel subordinate agent logging in the current task, if any
+current_agent: ContextVar[str | None] = ContextVar("log_current_agent", default=None)
+
 
 def _truncate_heading(text: str | None) -> str:
     if text is None:
@@ -106,6 +110,7 @@ class LogItem:
     update_progress: Optional[ProgressUpdate] = "persistent"
     kvps: Optional[OrderedDict] = None  # Use OrderedDict for kvps
     id: Optional[str] = None  # Add id field
+    agent: Optional[str] = None  # parallel subordinate that produced the item
     guid: str = ""
 
     def __post_init__(self):
@@ -157,6 +162,7 @@ class LogItem:
             "content": self.content,
             "temp": self.temp,
             "kvps": self.kvps,
+            "agent": self.agent,
         }
 
 
@@ -210,6 +216,7 @@ class Log:
             ),
             temp=temp if temp is not None else False,
             id=id,  # Pass id to LogItem
+            agent=current_agent.get(),
         )
         self.logs.append(item)
         self.updates += [item.no]
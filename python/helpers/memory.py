@@ -1,6 +1,10 @@
+import asyncio
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Any, List, Sequence
-from langchain.storage import InMemoryByteStore, LocalFileStore
+import operator
+import threading
+from typing import Any, Callable, Iterable, List, Literal, Sequence
+from langchain.storage import InMemoryByteStore
 from langchain.embeddings import CacheBackedEmbeddings
 
 # from langchain_chroma import Chroma
@@ -25,13 +29,16 @@ from python.helpers.print_style import PrintStyle
 from . import files
 from langchain_core.documents import Document
 import uuid
-from python.helpers import knowledge_import
+from python.helpers import knowledge_import, embedding_cache
+from python.helpers.memory_wal import MemoryWal
+from python.helpers.memory_ann import AnnConfig, MemoryAnn
+from python.helpers.memory_filter import MemoryFilter, MetadataIndex
+from python.helpers.memory_migration import MemoryMigration
 from python.helpers.log import Log, LogItem
 from enum import Enum
 from agent import Agent
 import models
 import logging
-from simpleeval import simple_eval
 
 
 # Raise the log level so WARNING messages aren't shown
@@ -39,6 +46,16 @@ logging.getLogger("langchain_core.vectorstores.base").setLevel(logging.ERROR)
 
 
 class MyFaiss(FAISS):
+    wal: MemoryWal | None = None
+    ann: MemoryAnn | None = None
+    meta: MetadataIndex | None = None
+    migration: MemoryMigration | None = None
+    _positions: dict[str, int] | None = None
+    _lock: threading.RLock | None = None
+
+    # filtered search scans candidates directly when they are at most this portion of the index
+    PREFILTER_RATIO = 0.25
+
     # override aget_by_ids
     def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
         # return all self.docstore._dict[id] in ids
@@ -50,6 +67,198 @@ class MyFaiss(FAISS):
     def get_all_docs(self):
         return self.docstore._dict  # type: ignore
 
+    def get_lock(self):
+        # all index mutations are serialized with log appends and compaction
+        if self.wal:
+            return self.wal.lock
+        if not self._lock:
+            self._lock = threading.RLock()
+        return self._lock
+
+    def get_meta_index(self) -> MetadataIndex:
+        # built lazily from the docstore, then maintained by add_embeddings and delete
+        with self.get_lock():
+            if self.meta is None:
+                meta = MetadataIndex()
+                for doc_id, doc in self.get_all_docs().items():
+                    meta.add(doc_id, doc.metadata)
+                self.meta = meta
+            return self.meta
+
+    def _get_positions(self) -> dict[str, int]:
+        # docstore id -> position in the flat index
+        if self._positions is None:
+            self._positions = {
+                doc_id: pos for pos, doc_id in self.index_to_docstore_id.items()
+            }
+        return self._positions
+
+    # all adds go through add_embeddings so the ann index gets the vectors too
+    def add_texts(self, texts: Iterable[str], metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        embeddings = self._embed_documents(texts)
+        return self.add_embeddings(
+            zip(texts, embeddings), metadatas=metadatas, ids=ids, **kwargs
+        )
+
+    async def aadd_texts(self, texts: Iterable[str], metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        embeddings = await self._aembed_documents(texts)
+        return self.add_embeddings(
+            zip(texts, embeddings), metadatas=metadatas, ids=ids, **kwargs
+        )
+
+    def add_embeddings(self, text_embeddings, metadatas=None, ids=None, **kwargs):
+        text_embeddings = list(text_embeddings)
+        with self.get_lock():
+            start = self.index.ntotal
+            ids = super().add_embeddings(
+                text_embeddings, metadatas=metadatas, ids=ids, **kwargs
+            )
+            if self._positions is not None:
+                for pos, doc_id in enumerate(ids, start):
+                    self._positions[doc_id] = pos
+            if self.meta is not None:
+                for doc_id, metadata in zip(ids, metadatas or [{}] * len(ids)):
+                    self.meta.add(doc_id, metadata)
+            if self.ann:
+                vectors = np.asarray([e for _, e in text_embeddings], dtype=np.float32)
+                self.ann.on_add(self, ids, vectors)
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        with self.get_lock():
+            docs = self.get_all_docs()
+            removed = (
+                [(id, docs[id].metadata) for id in ids if id in docs]
+                if self.meta is not None and ids
+                else []
+            )
+            result = super().delete(ids, **kwargs)
+            self._positions = None  # faiss renumbers the remaining vectors
+            for doc_id, metadata in removed:
+                self.meta.remove(doc_id, metadata)  # type: ignore
+            if self.ann and ids:
+                self.ann.on_delete(self, list(ids))
+        return result
+
+    def search_vectors(
+        self, vectors: np.ndarray, k: int
+    ) -> list[list[tuple[str, float]]]:
+        # raw nearest neighbour search, ann index when built, brute force otherwise
+        # index and mapping are taken together, a migration may swap them meanwhile
+        index, mapping = self.index, self.index_to_docstore_id
+        if vectors.shape[1] != index.d:
+            return [[] for _ in range(len(vectors))]  # query embedded by a swapped out model
+        if self.ann and self.ann.ready:
+            return self.ann.search(vectors, k)
+        k = min(k, index.ntotal)
+        if k <= 0:
+            return [[] for _ in range(len(vectors))]
+        scores, indices = index.search(vectors, k)  # type: ignore
+        return [
+            [
+                (mapping[int(i)], float(score))
+                for score, i in zip(row_scores, row_indices)
+                if i != -1 and int(i) in mapping
+            ]
+            for row_scores, row_indices in zip(scores, indices)
+        ]
+
+    def search_filtered(
+        self, embedding: List[float], k: int, filter: MemoryFilter | None = None
+    ) -> list[tuple[Document, float]]:
+        # top k documents matching the filter, best first
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+
+        with self.get_lock():
+            total = self.index.ntotal
+            if vector.shape[1] != self.index.d:
+                return []  # query embedded by a swapped out model
+            candidates = filter.candidates(self.get_meta_index()) if filter else None
+            if candidates is not None and len(candidates) <= max(
+                k, total * self.PREFILTER_RATIO
+            ):
+                # exact scan over the matching subset only
+                return self._search_subset(vector[0], k, candidates, filter)
+
+        # filter does not narrow the search enough, post-filter with growing depth
+        docs: list[tuple[Document, float]] = []
+        fetch_k = k if filter is None else k * 4
+        while True:
+            docs = []
+            results = self.search_vectors(vector, fetch_k)[0]
+            for doc_id, score in results:
+                doc = self.docstore.search(doc_id)
+                if isinstance(doc, Document) and (not filter or filter(doc.metadata)):
+                    docs.append((doc, score))
+                    if len(docs) >= k:
+                        return docs
+            if len(results) < fetch_k or fetch_k >= total:
+                return docs
+            fetch_k *= 4
+
+    def _search_subset(
+        self,
+        vector: np.ndarray,
+        k: int,
+        doc_ids: set[str],
+        filter: MemoryFilter | None,
+    ) -> list[tuple[Document, float]]:
+        positions = self._get_positions()
+        ids = [doc_id for doc_id in doc_ids if doc_id in positions]
+        if not ids or k <= 0:
+            return []
+        vectors = self.index.reconstruct_batch(
+            np.array([positions[id] for id in ids], dtype=np.int64)
+        )
+        scores = vectors @ vector
+        docs: list[tuple[Document, float]] = []
+        for i in np.argsort(-scores):
+            doc = self.docstore.search(ids[i])
+            # candidates may be a superset when the filter has non-indexed parts
+            if isinstance(doc, Document) and (not filter or filter(doc.metadata)):
+                docs.append((doc, float(scores[i])))
+                if len(docs) >= k:
+                    break
+        return docs
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Callable | dict[str, Any] | None = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ):
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(vector)
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+
+        docs = []
+        for doc_id, score in self.search_vectors(
+            vector, k if filter is None else fetch_k
+        )[0]:
+            doc = self.docstore.search(doc_id)
+            if not isinstance(doc, Document):
+                continue
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, score))
+
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            cmp = (
+                operator.ge
+                if self.distance_strategy
+                in (DistanceStrategy.MAX_INNER_PRODUCT, DistanceStrategy.JACCARD)
+                else operator.le
+            )
+            docs = [(doc, score) for doc, score in docs if cmp(score, score_threshold)]
+        return docs[:k]
+
 
 class Memory:
 
@@ -60,42 +269,110 @@ class Memory:
         INSTRUMENTS = "instruments"
 
     index: dict[str, "MyFaiss"] = {}
+    loading: dict[str, Future] = {}  # memory subdirs being warmed up in background
+
+    REPLACE_SEARCH_LIMIT = 100
+    KNOWLEDGE_BATCH_SIZE = 512  # documents embedded per request when importing knowledge
 
     @staticmethod
     async def get(agent: Agent):
         memory_subdir = agent.config.memory_subdir or "default"
         if Memory.index.get(memory_subdir) is None:
-            log_item = agent.context.log.log(
-                type="util",
-                heading=f"Initializing VectorDB in '/{memory_subdir}'",
-            )
-            db, created = Memory.initialize(
-                log_item,
-                agent.config.embeddings_model,
-                memory_subdir,
-                False,
-            )
-            Memory.index[memory_subdir] = db
-            wrap = Memory(agent, db, memory_subdir=memory_subdir)
-            if agent.config.knowledge_subdirs:
-                await wrap.preload_knowledge(
-                    log_item, agent.config.knowledge_subdirs, memory_subdir
-                )
-            return wrap
-        else:
-            return Memory(
-                agent=agent,
-                db=Memory.index[memory_subdir],
-                memory_subdir=memory_subdir,
+            loading = Memory.loading.get(memory_subdir)
+            if loading:
+                # warm-up in progress, wait for it instead of loading twice
+                # if it fails, memory is loaded again below and errors surface there
+                await asyncio.wait([asyncio.wrap_future(loading)])
+            if Memory.index.get(memory_subdir) is None:
+                return await Memory._load(agent, memory_subdir)
+        return Memory(
+            agent=agent,
+            db=Memory.index[memory_subdir],
+            memory_subdir=memory_subdir,
+        )
+
+    @staticmethod
+    async def _load(agent: Agent, memory_subdir: str):
+        log_item = agent.context.log.log(
+            type="util",
+            heading=f"Initializing VectorDB in '/{memory_subdir}'",
+        )
+        db, created = Memory.initialize(
+            log_item,
+            agent.config.embeddings_model,
+            memory_subdir,
+            False,
+        )
+        Memory.index[memory_subdir] = db
+        wrap = Memory(agent, db, memory_subdir=memory_subdir)
+        if agent.config.knowledge_subdirs:
+            await wrap.preload_knowledge(
+                log_item, agent.config.knowledge_subdirs, memory_subdir
             )
+        return wrap
+
+    @staticmethod
+    async def warmup(agent: Agent):
+        # load the memory and preload knowledge ahead of the first chat
+        memory_subdir = agent.config.memory_subdir or "default"
+        if Memory.index.get(memory_subdir) is not None or Memory.loading.get(
+            memory_subdir
+        ):
+            return
+        future: Future = Future()
+        Memory.loading[memory_subdir] = future
+        try:
+            await Memory._load(agent, memory_subdir)
+            if Memory.loading.get(memory_subdir) is not future:
+                # reloaded meanwhile, stale
+                Memory._close(Memory.index.pop(memory_subdir, None))
+            future.set_result(True)
+        except Exception as e:
+            PrintStyle.error(f"Memory warm-up in '/{memory_subdir}' failed: {e}")
+            future.set_exception(e)
+        finally:
+            if not future.done():
+                future.cancel()  # warm-up task was cancelled
+            if Memory.loading.get(memory_subdir) is future:
+                del Memory.loading[memory_subdir]
+
+    @staticmethod
+    async def wait_ready(agent: Agent, timeout: float) -> bool:
+        # False when the memory is still warming up after timeout seconds
+        loading = Memory.loading.get(agent.config.memory_subdir or "default")
+        if not loading:
+            return True
+        done, _ = await asyncio.wait([asyncio.wrap_future(loading)], timeout=timeout)
+        return bool(done)
+
+    @staticmethod
+    def get_status(
+        memory_subdir: str,
+    ) -> Literal["unloaded", "loading", "migrating", "ready"]:
+        memory_subdir = memory_subdir or "default"
+        if Memory.loading.get(memory_subdir):
+            return "loading"
+        db = Memory.index.get(memory_subdir)
+        if db is not None:
+            return "migrating" if db.migration else "ready"
+        return "unloaded"
 
     @staticmethod
     async def reload(agent: Agent):
         memory_subdir = agent.config.memory_subdir or "default"
-        if Memory.index.get(memory_subdir):
-            del Memory.index[memory_subdir]
+        Memory._close(Memory.index.pop(memory_subdir, None))
         return await Memory.get(agent)
 
+    @staticmethod
+    def _close(db: "MyFaiss | None"):
+        # background work of a dropped database must not write over its reloaded copy
+        if not db:
+            return
+        if db.migration:
+            db.migration.stop()
+        if db.wal:
+            db.wal.wait_compaction()
+
     @staticmethod
     def initialize(
         log_item: LogItem | None,
@@ -109,19 +386,15 @@ class Memory:
         if log_item:
             log_item.stream(progress="\nInitializing VectorDB")
 
-        em_dir = files.get_abs_path(
-            "memory/embeddings"
-        )  # just caching, no need to parameterize
         db_dir = Memory._abs_db_dir(memory_subdir)
 
-        # make sure embeddings and database directories exist
+        # make sure database directory exists
         os.makedirs(db_dir, exist_ok=True)
 
         if in_memory:
             store = InMemoryByteStore()
         else:
-            os.makedirs(em_dir, exist_ok=True)
-            store = LocalFileStore(em_dir)
+            store = embedding_cache.get_cache()  # shared, just caching
 
         embeddings_model = models.get_embedding_model(
             model_config.provider,
@@ -140,36 +413,71 @@ class Memory:
         # initial DB and docs variables
         db: MyFaiss | None = None
         docs: dict[str, Document] | None = None
+        migration: MemoryMigration | None = None
 
         created = False
 
+        # finish a snapshot switch interrupted by a crash, before reading the snapshot
+        if not in_memory:
+            MemoryWal.get(db_dir).recover()
+
+        # finish a re-indexing that completed right before shutdown
+        if not in_memory and MemoryMigration.promote(db_dir):
+            PrintStyle.standard("Applied completed memory re-indexing")
+
+        # the embedding model the stored index was built with
+        embedding_set = {}
+        emb_set_file = files.get_abs_path(db_dir, "embedding.json")
+        if files.exists(emb_set_file):
+            embedding_set = json.loads(files.read_file(emb_set_file))
+        emb_ok = (
+            embedding_set.get("model_provider") == model_config.provider.name
+            and embedding_set.get("model_name") == model_config.name
+        )
+
         # if db folder exists and is not empty:
         if os.path.exists(db_dir) and files.exists(db_dir, "index.faiss"):
+            # on model change keep serving with the old model while re-indexing in background
+            db_embedder = embedder
+            if not emb_ok and not in_memory and embedding_set:
+                old_embedder = Memory._get_old_embedder(
+                    embedding_set, model_config, store
+                )
+                if old_embedder:
+                    db_embedder = old_embedder
+
             db = MyFaiss.load_local(
                 folder_path=db_dir,
-                embeddings=embedder,
+                embeddings=db_embedder,
                 allow_dangerous_deserialization=True,
                 distance_strategy=DistanceStrategy.COSINE,
                 # normalize_L2=True,
                 relevance_score_fn=Memory._cosine_normalizer,
             )  # type: ignore
 
-            # if there is a mismatch in embeddings used, re-index the whole DB
-            emb_ok = False
-            emb_set_file = files.get_abs_path(db_dir, "embedding.json")
-            if files.exists(emb_set_file):
-                embedding_set = json.loads(files.read_file(emb_set_file))
-                if (
-                    embedding_set["model_provider"] == model_config.provider.name
-                    and embedding_set["model_name"] == model_config.name
-                ):
-                    # model matches
-                    emb_ok = True
+            # apply changes logged since the last snapshot
+            wal = MemoryWal.get(db_dir)
+            db.wal = wal  # type: ignore
+            replayed = wal.replay(db)  # type: ignore
+            if replayed:
+                PrintStyle.standard(f"Replayed {replayed} memory log entries")
 
-            # re-index -  create new DB and insert existing docs
-            if db and not emb_ok:
+            # if there is a mismatch in embeddings used, re-index the whole DB
+            if db and not emb_ok and db_embedder is not embedder:
+                migration = MemoryMigration(
+                    db,  # type: ignore
+                    db_dir,
+                    embedder,
+                    model_config.provider.name,
+                    model_config.name,
+                )
+                db.migration = migration  # type: ignore
+            # old model not available, create new DB and insert existing docs
+            elif db and not emb_ok:
                 docs = db.get_all_docs()
                 db = None
+            if db and replayed:
+                wal.schedule_compaction(db)
 
         # DB not loaded, create one
         if not db:
@@ -192,8 +500,10 @@ class Memory:
                     log_item.stream(progress="\nIndexing memories")
                 db.add_documents(documents=list(docs.values()), ids=list(docs.keys()))
 
-            # save DB
+            # save DB, full snapshot makes the log obsolete
+            db.wal = MemoryWal.get(db_dir)
             Memory._save_db_file(db, memory_subdir)
+            db.wal.clear()
             # save meta file
             meta_file_path = files.get_abs_path(db_dir, "embedding.json")
             files.write_file(
@@ -208,8 +518,42 @@ class Memory:
 
             created = True
 
+        # approximate index for large corpora, built in background when needed
+        db.ann = MemoryAnn(AnnConfig.load(db_dir))
+        db.ann.maybe_rebuild(db)
+
+        if migration:
+            migration.start()
+
         return db, created
 
+    @staticmethod
+    def _get_old_embedder(
+        embedding_set: dict, model_config: models.ModelConfig, store
+    ) -> Embeddings | None:
+        # embedder of the model the stored index was built with, None if unavailable
+        try:
+            provider = models.ModelProvider[embedding_set["model_provider"]]
+            name = embedding_set["model_name"]
+            # model kwargs only apply to the same provider
+            kwargs = (
+                model_config.build_kwargs()
+                if provider == model_config.provider
+                else {}
+            )
+            model = models.get_embedding_model(provider, name, **kwargs)
+            model.embed_query("example")  # make sure it still works
+            return CacheBackedEmbeddings.from_bytes_store(
+                model,
+                store,
+                namespace=files.safe_file_name(provider.name + "_" + name),
+            )
+        except Exception as e:
+            PrintStyle.error(
+                f"Previous embedding model unavailable, re-indexing memory now: {e}"
+            )
+            return None
+
     def __init__(
         self,
         agent: Agent,
@@ -241,51 +585,86 @@ class Memory:
             with open(index_path, "r") as f:
                 index = json.load(f)
 
-        # preload knowledge folders
-        index = self._preload_knowledge_folders(log_item, kn_dirs, index)
+        # find changed knowledge files, off the event loop
+        jobs = await asyncio.to_thread(
+            self._preload_knowledge_folders, log_item, kn_dirs, index
+        )
 
-        for file in index:
-            if index[file]["state"] in ["changed", "removed"] and index[file].get(
-                "ids", []
-            ):  # for knowledge files that have been changed or removed and have IDs
-                await self.delete_documents_by_ids(
-                    index[file]["ids"]
-                )  # remove original version
-            if index[file]["state"] == "changed":
-                index[file]["ids"] = await self.insert_documents(
-                    index[file]["documents"]
-                )  # insert new version
+        # remove knowledge files that have been removed
+        rem_ids = [
+            id
+            for file in index
+            if index[file]["state"] == "removed"
+            for id in index[file].get("ids", [])
+        ]
+        if rem_ids:
+            await self.delete_documents_by_ids(rem_ids)
+
+        # parse changed files in background and insert new versions as they come, batched across files
+        batches = knowledge_import.iter_document_batches(
+            log_item, index, jobs, Memory.KNOWLEDGE_BATCH_SIZE
+        )
+        replaced: set[str] = set()
+        done = 0
+        try:
+            while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                # original version of a changed file goes before its first new documents
+                await self._replace_knowledge_files(
+                    index, [file for file, _ in batch], replaced
+                )
+                ids = await self.insert_documents([doc for _, doc in batch])
+                for (file, _), id in zip(batch, ids):
+                    index[file]["ids"].append(id)
+                done += len(batch)
+                if log_item:
+                    log_item.stream(progress=f"\nIndexed {done} documents")
+        finally:
+            await asyncio.to_thread(batches.close)
+
+        # changed files without any documents left
+        await self._replace_knowledge_files(
+            index, [file for file in index if index[file]["state"] == "changed"], replaced
+        )
 
         # remove index where state="removed"
         index = {k: v for k, v in index.items() if v["state"] != "removed"}
 
-        # strip state and documents from index and save it
+        # strip state from index and save it
         for file in index:
-            if "documents" in index[file]:
-                del index[file]["documents"]  # type: ignore
             if "state" in index[file]:
                 del index[file]["state"]  # type: ignore
         with open(index_path, "w") as f:
             json.dump(index, f)
 
+        # show how much of the import was answered from the embedding cache
+        stats = embedding_cache.get_cache().stats()
+        summary = (
+            f"Embedding cache: {stats['entries']} entries, {stats['bytes'] / 2**20:.1f} MB, "
+            f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})"
+        )
+        PrintStyle.standard(summary)
+        if log_item:
+            log_item.stream(progress=f"\n{summary}")
+
     def _preload_knowledge_folders(
         self,
         log_item: LogItem | None,
         kn_dirs: list[str],
         index: dict[str, knowledge_import.KnowledgeImport],
     ):
-        # load knowledge folders, subfolders by area
+        # scan knowledge folders, subfolders by area
+        jobs: list[knowledge_import.KnowledgeJob] = []
         for kn_dir in kn_dirs:
             for area in Memory.Area:
-                index = knowledge_import.load_knowledge(
+                jobs += knowledge_import.scan_knowledge(
                     log_item,
                     files.get_abs_path("knowledge", kn_dir, area.value),
                     index,
                     {"area": area.value},
                 )
 
-        # load instruments descriptions
-        index = knowledge_import.load_knowledge(
+        # scan instruments descriptions
+        jobs += knowledge_import.scan_knowledge(
             log_item,
             files.get_abs_path("instruments"),
             index,
@@ -293,7 +672,23 @@ class Memory:
             filename_pattern="**/*.md",
         )
 
-        return index
+        return jobs
+
+    async def _replace_knowledge_files(
+        self,
+        index: dict[str, knowledge_import.KnowledgeImport],
+        changed: list[str],
+        replaced: set[str],
+    ):
+        # delete the documents of the previous version of changed files, once per file
+        rem_ids = []
+        for file in dict.fromkeys(changed):
+            if file not in replaced:
+                replaced.add(file)
+                rem_ids += index[file].get("ids", [])
+                index[file]["ids"] = []
+        if rem_ids:
+            await self.delete_documents_by_ids(rem_ids)
 
     async def search_similarity_threshold(
         self, query: str, limit: int, threshold: float, filter: str = ""
@@ -305,13 +700,13 @@ class Memory:
             model_config=self.agent.config.embeddings_model, input=query
         )
 
-        return await self.db.asearch(
-            query,
-            search_type="similarity_score_threshold",
-            k=limit,
-            score_threshold=threshold,
-            filter=comparator,
-        )
+        embedding = await self.db.embedding_function.aembed_query(query)  # type: ignore
+        results = self.db.search_filtered(embedding, limit, comparator)
+        return [
+            doc
+            for doc, score in results
+            if Memory._cosine_normalizer(score) >= threshold
+        ]
 
     async def delete_documents_by_query(
         self, query: str, threshold: float, filter: str = ""
@@ -336,15 +731,13 @@ class Memory:
                 # fnd = self.db.get(where={"id": {"$in": document_ids}})
                 # if fnd["ids"]: self.db.delete(ids=fnd["ids"])
                 # tot += len(fnd["ids"])
-                await self.db.adelete(ids=document_ids)
+                self._delete_ids(document_ids)  # delete and persist
                 tot += len(document_ids)
 
             # If fewer than K document IDs, break the loop
             if len(document_ids) < k:
                 break
 
-        if tot:
-            self._save_db()  # persist
         return removed
 
     async def delete_documents_by_ids(self, ids: list[str]):
@@ -354,10 +747,8 @@ class Memory:
         )  # existing docs to remove (prevents error)
         if rem_docs:
             rem_ids = [doc.metadata["id"] for doc in rem_docs]  # ids to remove
-            await self.db.adelete(ids=rem_ids)
+            self._delete_ids(rem_ids)  # delete and persist
 
-        if rem_docs:
-            self._save_db()  # persist
         return rem_docs
 
     async def insert_text(self, text, metadata: dict = {}):
@@ -382,12 +773,152 @@ class Memory:
                 model_config=self.agent.config.embeddings_model, input=docs_txt
             )
 
-            await self.db.aadd_documents(documents=docs, ids=ids)
-            self._save_db()  # persist
+            texts = [doc.page_content for doc in docs]
+            while True:
+                embedder = self.db.embedding_function
+                embeddings = await embedder.aembed_documents(texts)  # type: ignore
+                with self._get_wal().lock:
+                    # a finished re-indexing may have swapped the model meanwhile
+                    if self.db.embedding_function is embedder:
+                        self._add_embeddings(
+                            ids, texts, [doc.metadata for doc in docs], embeddings
+                        )
+                        break
         return ids
 
+    async def insert_texts_batch(
+        self,
+        texts: list[str],
+        metadata: dict = {},
+        replace_threshold: float = 0,
+        replace_filter: str = "",
+    ) -> tuple[list[str], list[Document]]:
+        # insert many texts at once, optionally replacing existing documents that are too similar
+        # one embedding request, one similarity pass, one delete, one add
+        if not texts:
+            return [], []
+
+        ids = [str(uuid.uuid4()) for _ in range(len(texts))]
+        timestamp = self.get_timestamp()
+        docs = [
+            Document(
+                text,
+                metadata={
+                    **metadata,
+                    "id": id,
+                    "timestamp": timestamp,
+                    "area": metadata.get("area", "") or Memory.Area.MAIN.value,
+                },
+            )
+            for text, id in zip(texts, ids)
+        ]
+
+        # rate limiter
+        docs_txt = "".join(self.format_docs_plain(docs))
+        await self.agent.rate_limiter(
+            model_config=self.agent.config.embeddings_model, input=docs_txt
+        )
+
+        embedder = self.db.embedding_function
+        embeddings = await embedder.aembed_documents(texts)  # type: ignore
+        vectors = np.asarray(embeddings, dtype=np.float32)
+
+        # texts replaced by a later text in the same batch would be deleted right away, skip them
+        keep = list(range(len(docs)))
+        if replace_threshold > 0 and len(docs) > 1:
+            sims = vectors @ vectors.T
+            keep = [
+                i
+                for i in keep
+                if not any(
+                    Memory._cosine_normalizer(sims[i][j]) >= replace_threshold
+                    for j in range(i + 1, len(docs))
+                )
+            ]
+
+        removed: list[Document] = []
+        with self._get_wal().lock:
+            # a finished re-indexing may have swapped the model meanwhile
+            swapped = self.db.embedding_function is not embedder
+            if not swapped:
+                if replace_threshold > 0:
+                    removed = self._search_similar_by_vectors(
+                        vectors, replace_threshold, replace_filter
+                    )
+                    if removed:
+                        self._delete_ids([doc.metadata["id"] for doc in removed])
+
+                self._add_embeddings(
+                    [ids[i] for i in keep],
+                    [texts[i] for i in keep],
+                    [docs[i].metadata for i in keep],
+                    [embeddings[i] for i in keep],
+                )
+        if swapped:
+            # vectors of the old model do not fit the new index, embed again
+            return await self.insert_texts_batch(
+                texts, metadata, replace_threshold, replace_filter
+            )
+        return [ids[i] for i in keep], removed
+
+    def _search_similar_by_vectors(
+        self, vectors: np.ndarray, threshold: float, filter: str = ""
+    ) -> list[Document]:
+        found: dict[str, Document] = {}
+        if filter:
+            # filter applied before top k, documents of other areas must not crowd out matches
+            comparator = Memory._get_comparator(filter)
+            for vector in vectors:
+                for doc, score in self.db.search_filtered(
+                    vector.tolist(), Memory.REPLACE_SEARCH_LIMIT, comparator
+                ):
+                    if Memory._cosine_normalizer(score) < threshold:
+                        break  # best first
+                    found.setdefault(doc.metadata["id"], doc)
+            return list(found.values())
+
+        # single vectorized search for all query vectors
+        for row in self.db.search_vectors(vectors, Memory.REPLACE_SEARCH_LIMIT):
+            for doc_id, score in row:
+                if Memory._cosine_normalizer(score) < threshold or doc_id in found:
+                    continue
+                doc = self.db.get_all_docs().get(doc_id)
+                if doc:
+                    found[doc_id] = doc
+        return list(found.values())
+
+    def _add_embeddings(
+        self,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        embeddings: list[list[float]],
+    ):
+        wal = self._get_wal()
+        with wal.lock:
+            self.db.add_embeddings(
+                text_embeddings=list(zip(texts, embeddings)),
+                metadatas=metadatas,
+                ids=ids,
+            )
+            wal.append_add(ids, texts, metadatas, embeddings)  # persist
+        wal.schedule_compaction(self.db)
+
+    def _delete_ids(self, ids: list[str]):
+        wal = self._get_wal()
+        with wal.lock:
+            self.db.delete(ids=ids)
+            wal.append_delete(ids)  # persist
+        wal.schedule_compaction(self.db)
+
+    def _get_wal(self) -> MemoryWal:
+        if not self.db.wal:
+            self.db.wal = MemoryWal.get(Memory._abs_db_dir(self.memory_subdir))
+        return self.db.wal
+
     def _save_db(self):
         Memory._save_db_file(self.db, self.memory_subdir)
+        self._get_wal().clear()
 
     @staticmethod
     def _save_db_file(db: MyFaiss, memory_subdir: str):
@@ -395,16 +926,9 @@ class Memory:
         db.save_local(folder_path=abs_dir)
 
     @staticmethod
-    def _get_comparator(condition: str):
-        def comparator(data: dict[str, Any]):
-            try:
-                result = simple_eval(condition, names=data)
-                return result
-            except Exception as e:
-                PrintStyle.error(f"Error evaluating condition: {e}")
-                return False
-
-        return comparator
+    def _get_comparator(condition: str) -> MemoryFilter:
+        # compiled once, falls back to simple_eval for unsupported syntax
+        return MemoryFilter(condition)
 
     @staticmethod
     def _score_normalizer(val: float) -> float:
@@ -452,4 +976,7 @@ def get_custom_knowledge_subdir_abs(agent: Agent) -> str:
 
 def reload():
     # clear the memory index, this will force all DBs to reload
+    for db in Memory.index.values():
+        Memory._close(db)
     Memory.index = {}
+    Memory.loading = {}
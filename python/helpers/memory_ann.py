@@ -0,0 +1,235 @@
+import json
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Literal, TYPE_CHECKING
+
+import numpy as np
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from python.helpers import faiss_monkey_patch
+import faiss
+
+from python.helpers import settings
+from python.helpers.print_style import PrintStyle
+
+if TYPE_CHECKING:
+    from python.helpers.memory import MyFaiss
+
+IndexType = Literal["flat", "ivf", "hnsw"]
+
+CONFIG_FILE = "ann.json"  # optional per memory subdir override of the settings
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 64
+IVF_MIN_POINTS_PER_LIST = 39
+IVF_TRAIN_POINTS_PER_LIST = 256
+DRIFT_RATIO = 0.3  # rebuild when this portion of the index changed since the last build
+
+
+@dataclass
+class AnnConfig:
+    type: IndexType = "flat"
+    min_size: int = 50000
+    search_depth: int = 32
+
+    @staticmethod
+    def load(db_dir: str) -> "AnnConfig":
+        set = settings.get_settings()
+        config = AnnConfig(
+            type=set["memory_index_type"],  # type: ignore
+            min_size=set["memory_index_min_size"],
+            search_depth=set["memory_index_search_depth"],
+        )
+        path = os.path.join(db_dir, CONFIG_FILE)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    override = json.load(f)
+                for key, value in override.items():
+                    if hasattr(config, key):
+                        setattr(config, key, type(getattr(config, key))(value))
+            except Exception as e:
+                PrintStyle.error(f"Invalid memory index config {path}: {e}")
+        return config
+
+
+class MemoryAnn:
+    """
+    Approximate nearest neighbour index (IVF-Flat or HNSW) kept next to the flat
+    FAISS index. The flat index stays the source of truth for adds, deletes and
+    persistence, this one only accelerates unfiltered similarity search once the
+    corpus is large enough. Removed documents are dropped from the id map and
+    filtered out of results, the index is rebuilt in background when it drifts.
+    """
+
+    def __init__(self, config: AnnConfig):
+        self.config = config
+        self.lock = threading.RLock()
+        self.index: faiss.Index | None = None
+        self.doc_ids: dict[int, str] = {}  # ann id -> docstore id
+        self.ann_ids: dict[str, int] = {}  # docstore id -> ann id
+        self.next_id = 0
+        self.built_size = 0
+        self.changes = 0
+        self.removed = 0
+        self.building = False
+        self.pending: list[tuple[str, list[str], np.ndarray | None]] = []
+
+    @property
+    def ready(self) -> bool:
+        return self.index is not None
+
+    def on_add(self, db: "MyFaiss", doc_ids: list[str], vectors: np.ndarray):
+        if self.config.type == "flat":
+            return
+        with self.lock:
+            if self.building:
+                self.pending.append(("add", doc_ids, vectors))
+            if self.index is not None:
+                self._add(doc_ids, vectors)
+                self.changes += len(doc_ids)
+        self.maybe_rebuild(db)
+
+    def on_delete(self, db: "MyFaiss", doc_ids: list[str]):
+        if self.config.type == "flat":
+            return
+        with self.lock:
+            if self.building:
+                self.pending.append(("delete", doc_ids, None))
+            if self.index is not None:
+                self._remove(doc_ids)
+                self.changes += len(doc_ids)
+        self.maybe_rebuild(db)
+
+    def maybe_rebuild(self, db: "MyFaiss"):
+        if self.config.type == "flat":
+            return
+        with self.lock:
+            if self.building:
+                return
+            size = db.index.ntotal
+            if size < self.config.min_size:
+                # corpus too small (again), brute force is fine
+                self.index = None
+                return
+            drifted = (
+                self.index is not None
+                and self.changes > self.built_size * DRIFT_RATIO
+            )
+            if self.index is not None and not drifted:
+                return
+            self.building = True
+        threading.Thread(target=self._build_in_thread, args=(db,), daemon=True).start()
+
+    def search(self, vectors: np.ndarray, k: int) -> list[list[tuple[str, float]]]:
+        with self.lock:
+            index = self.index
+            removed = self.removed
+            results: list[list[tuple[str, float]]] = [[] for _ in range(len(vectors))]
+            if index is None:
+                return results
+            total = index.ntotal
+            live = total - removed
+            if k <= 0 or live <= 0:
+                return results
+            # soft-deleted vectors still take result slots, scale k by the removed portion
+            # and search again deeper for rows that still got fewer than k live documents
+            k_search = min(total, math.ceil(k * total / live))
+            rows = list(range(len(vectors)))
+            while rows:
+                scores, indices = index.search(vectors[rows], k_search)  # type: ignore
+                short = []
+                for row, row_scores, row_indices in zip(rows, scores, indices):
+                    found = []
+                    for score, idx in zip(row_scores, row_indices):
+                        doc_id = self.doc_ids.get(int(idx))
+                        if doc_id:
+                            found.append((doc_id, float(score)))
+                    results[row] = found[:k]
+                    if len(found) < k:
+                        short.append(row)
+                if k_search >= total:
+                    break
+                rows = short
+                k_search = min(total, k_search * 2)
+            return results
+
+    def _build_in_thread(self, db: "MyFaiss"):
+        try:
+            self._build(db)
+        except Exception as e:
+            PrintStyle.error(f"Building memory {self.config.type} index failed: {e}")
+            with self.lock:
+                self.building = False
+                self.pending = []
+
+    def _build(self, db: "MyFaiss"):
+        # take a consistent copy of the flat index, later changes are queued in pending
+        with db.get_lock():
+            size = db.index.ntotal
+            vectors = db.index.reconstruct_n(0, size)
+            doc_ids = [db.index_to_docstore_id[i] for i in range(size)]
+            with self.lock:
+                self.pending = []
+
+        PrintStyle.standard(
+            f"Building memory {self.config.type} index for {size} vectors..."
+        )
+        index = self._create_index(vectors)
+        index.add_with_ids(vectors, np.arange(size, dtype=np.int64))  # type: ignore
+
+        with self.lock:
+            self.index = index
+            self.doc_ids = {i: doc_id for i, doc_id in enumerate(doc_ids)}
+            self.ann_ids = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+            self.next_id = size
+            self.built_size = size
+            self.changes = 0
+            self.removed = 0
+            for op, ids, vecs in self.pending:
+                if op == "add" and vecs is not None:
+                    self._add(ids, vecs)
+                else:
+                    self._remove(ids)
+                self.changes += len(ids)
+            self.pending = []
+            self.building = False
+        PrintStyle.standard(f"Memory {self.config.type} index ready.")
+
+    def _create_index(self, vectors: np.ndarray) -> faiss.Index:
+        size, dim = vectors.shape
+        if self.config.type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+            hnsw.hnsw.efSearch = max(1, self.config.search_depth)
+            return faiss.IndexIDMap2(hnsw)
+
+        # ivf-flat, sqrt rule for number of lists, each list needs enough points to train
+        nlist = max(1, min(int(4 * math.sqrt(size)), size // IVF_MIN_POINTS_PER_LIST))
+        quantizer = faiss.IndexFlatIP(dim)
+        ivf = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        train_size = min(size, nlist * IVF_TRAIN_POINTS_PER_LIST)
+        sample = vectors[np.random.choice(size, train_size, replace=False)]
+        ivf.train(sample)  # type: ignore
+        ivf.nprobe = max(1, min(nlist, self.config.search_depth))
+        return ivf
+
+    def _add(self, doc_ids: list[str], vectors: np.ndarray):
+        if self.index is None or not doc_ids:
+            return
+        ids = np.arange(self.next_id, self.next_id + len(doc_ids), dtype=np.int64)
+        self.index.add_with_ids(vectors, ids)  # type: ignore
+        for ann_id, doc_id in zip(ids, doc_ids):
+            self.doc_ids[int(ann_id)] = doc_id
+            self.ann_ids[doc_id] = int(ann_id)
+        self.next_id += len(doc_ids)
+
+    def _remove(self, doc_ids: list[str]):
+        # soft delete, vectors stay in the index until the next rebuild
+        for doc_id in doc_ids:
+            ann_id = self.ann_ids.pop(doc_id, None)
+            if ann_id is not None:
+                self.doc_ids.pop(ann_id, None)
+                self.removed += 1
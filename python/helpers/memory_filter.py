@@ -0,0 +1,221 @@
+import ast
+import operator
+import threading
+from typing import Any, Callable, Hashable
+
+from simpleeval import simple_eval
+
+from python.helpers.print_style import PrintStyle
+
+# metadata keys with an inverted index for pre-filtered search
+INDEXED_KEYS = ("area", "timestamp", "knowledge_source", "file")
+
+Predicate = Callable[[dict[str, Any]], bool]
+
+_COMPARE_OPS: dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+_STRING_METHODS = ("startswith", "endswith", "lower", "upper", "strip")
+
+
+class _Unsupported(Exception):
+    pass
+
+
+class MetadataIndex:
+    """Inverted index of metadata value -> document ids for INDEXED_KEYS."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.values: dict[str, dict[Hashable, set[str]]] = {
+            key: {} for key in INDEXED_KEYS
+        }
+
+    def add(self, doc_id: str, metadata: dict[str, Any]):
+        with self.lock:
+            for key, index in self.values.items():
+                value = metadata.get(key)
+                if _is_indexable(value):
+                    index.setdefault(value, set()).add(doc_id)
+
+    def remove(self, doc_id: str, metadata: dict[str, Any]):
+        with self.lock:
+            for key, index in self.values.items():
+                value = metadata.get(key)
+                if _is_indexable(value) and value in index:
+                    index[value].discard(doc_id)
+                    if not index[value]:
+                        del index[value]
+
+    def lookup(self, key: str, match: Callable[[Any], bool]) -> set[str]:
+        with self.lock:
+            result: set[str] = set()
+            for value, ids in self.values[key].items():
+                try:
+                    if match(value):
+                        result |= ids
+                except Exception:
+                    pass  # incomparable types never match
+            return result
+
+
+class MemoryFilter:
+    """
+    Filter condition compiled once from the python-like syntax used by memory tools.
+    Provides a fast predicate over document metadata and, when the condition
+    constrains indexed keys, the exact set of candidate ids from MetadataIndex.
+    Conditions outside of the supported subset fall back to simple_eval.
+    """
+
+    def __init__(self, condition: str):
+        self.condition = condition
+        self.tree: ast.expr | None = None
+        try:
+            self.tree = ast.parse(condition.strip(), mode="eval").body
+            self.predicate = self._wrap(self._compile(self.tree))
+        except (_Unsupported, SyntaxError):
+            self.tree = None
+            self.predicate = self._simple_eval
+
+    def __call__(self, metadata: dict[str, Any]) -> bool:
+        return self.predicate(metadata)
+
+    def candidates(self, index: MetadataIndex) -> set[str] | None:
+        # None means the condition does not restrict indexed keys
+        if self.tree is None:
+            return None
+        return self._candidates(self.tree, index)
+
+    def _simple_eval(self, metadata: dict[str, Any]) -> bool:
+        try:
+            return simple_eval(self.condition, names=metadata)
+        except Exception as e:
+            PrintStyle.error(f"Error evaluating condition: {e}")
+            return False
+
+    def _wrap(self, fn: Callable[[dict[str, Any]], Any]) -> Predicate:
+        def predicate(metadata: dict[str, Any]) -> bool:
+            try:
+                return bool(fn(metadata))
+            except Exception:
+                # missing keys or incomparable values do not match, same as simple_eval errors
+                return False
+
+        return predicate
+
+    def _compile(self, node: ast.expr) -> Callable[[dict[str, Any]], Any]:
+        if isinstance(node, ast.BoolOp):
+            parts = [self._compile(v) for v in node.values]
+            if isinstance(node.op, ast.And):
+                return lambda m: all(p(m) for p in parts)
+            return lambda m: any(p(m) for p in parts)
+
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = self._compile(node.operand)
+            return lambda m: not inner(m)
+
+        if isinstance(node, ast.Compare):
+            left = self._compile(node.left)
+            ops = [_COMPARE_OPS.get(type(op)) for op in node.ops]
+            if any(op is None for op in ops):
+                raise _Unsupported()
+            rights = [self._compile(c) for c in node.comparators]
+
+            def compare(m):
+                a = left(m)
+                for op, right in zip(ops, rights):
+                    b = right(m)
+                    if not op(a, b):  # type: ignore
+                        return False
+                    a = b
+                return True
+
+            return compare
+
+        if isinstance(node, ast.Name):
+            name = node.id
+            return lambda m: m[name]
+
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda m: value
+
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            items = [self._compile(e) for e in node.elts]
+            return lambda m: [i(m) for i in items]
+
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in _STRING_METHODS
+            and not node.keywords
+        ):
+            target = self._compile(node.func.value)
+            args = [self._compile(a) for a in node.args]
+            method = node.func.attr
+            return lambda m: getattr(str(target(m)), method)(*[a(m) for a in args])
+
+        raise _Unsupported()
+
+    def _candidates(self, node: ast.expr, index: MetadataIndex) -> set[str] | None:
+        if isinstance(node, ast.BoolOp):
+            parts = [self._candidates(v, index) for v in node.values]
+            if isinstance(node.op, ast.And):
+                known = [p for p in parts if p is not None]
+                if not known:
+                    return None
+                return set.intersection(*known)
+            if any(p is None for p in parts):
+                return None
+            return set.union(*parts)  # type: ignore
+
+        if isinstance(node, ast.Compare) and len(node.ops) == 1:
+            left, op, right = node.left, node.ops[0], node.comparators[0]
+            # constant on the left, mirror the comparison
+            if isinstance(right, ast.Name) and isinstance(left, ast.Constant):
+                mirrored = {ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+                if type(op) in mirrored:
+                    left, right, op = right, left, mirrored[type(op)]()
+                elif isinstance(op, (ast.Eq, ast.NotEq)):
+                    left, right = right, left
+            if not (isinstance(left, ast.Name) and left.id in INDEXED_KEYS):
+                return None
+            key = left.id
+            if isinstance(op, ast.Eq) and isinstance(right, ast.Constant):
+                value = right.value
+                return index.lookup(key, lambda v: v == value)
+            if isinstance(op, ast.In) and isinstance(right, (ast.List, ast.Tuple, ast.Set)):
+                if not all(isinstance(e, ast.Constant) for e in right.elts):
+                    return None
+                values = [e.value for e in right.elts]  # type: ignore
+                return index.lookup(key, lambda v: v in values)
+            if type(op) in (ast.Lt, ast.LtE, ast.Gt, ast.GtE) and isinstance(right, ast.Constant):
+                fn, value = _COMPARE_OPS[type(op)], right.value
+                return index.lookup(key, lambda v: fn(v, value))
+            return None
+
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr == "startswith"
+            and isinstance(node.func.value, ast.Name)
+            and node.func.value.id in INDEXED_KEYS
+            and len(node.args) == 1
+            and isinstance(node.args[0], ast.Constant)
+        ):
+            prefix = str(node.args[0].value)
+            return index.lookup(node.func.value.id, lambda v: str(v).startswith(prefix))
+
+        return None
+
+
+def _is_indexable(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
@@ -0,0 +1,256 @@
+import json
+import os
+import shutil
+import threading
+from typing import TYPE_CHECKING
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from python.helpers import faiss_monkey_patch
+import faiss
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
+from langchain_core.embeddings import Embeddings
+
+from python.helpers.memory_ann import MemoryAnn
+from python.helpers.memory_wal import MemoryWal, INDEX_FILE, DOCSTORE_FILE
+from python.helpers.print_style import PrintStyle
+
+if TYPE_CHECKING:
+    from python.helpers.memory import MyFaiss
+
+MIGRATION_DIR = "migration"
+STATE_FILE = "migration.json"
+EMBEDDING_FILE = "embedding.json"
+
+BATCH_SIZE = 256  # documents re-embedded at once
+CHECKPOINT_EVERY = 8  # batches between saves of the partial index
+
+
+class MemoryMigration:
+    """
+    Re-embeds a memory database with a new embedding model in background.
+    The old index keeps serving searches and inserts until the new one has
+    caught up, then the new index is swapped in place under the index lock.
+    Progress is checkpointed to the migration subfolder so a restart resumes
+    where it stopped instead of starting over.
+    """
+
+    def __init__(
+        self,
+        db: "MyFaiss",
+        db_dir: str,
+        embedder: Embeddings,
+        model_provider: str,
+        model_name: str,
+    ):
+        self.db = db
+        self.db_dir = db_dir
+        self.embedder = embedder
+        self.model_provider = model_provider
+        self.model_name = model_name
+        self.done = 0
+        self.total = 0
+        self.running = False
+        self.stopping = False
+        self.thread: threading.Thread | None = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run_in_thread, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # checkpoint and stop, the next load of the database resumes from there
+        self.stopping = True
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def _path(self, *names: str) -> str:
+        return os.path.join(self.db_dir, MIGRATION_DIR, *names)
+
+    def _run_in_thread(self):
+        try:
+            self._run()
+        except Exception as e:
+            PrintStyle.error(
+                f"Memory re-indexing in {self.db_dir} failed, will resume on next start: {e}"
+            )
+            self.db.migration = None
+        finally:
+            self.running = False
+
+    def _run(self):
+        new = self._load_or_create()
+        PrintStyle.standard(
+            f"Re-indexing memory in {self.db_dir} for {self.model_name} in background..."
+        )
+        while True:
+            with self.db.get_lock():
+                old_docs = self.db.get_all_docs()
+                pending = [id for id in old_docs if id not in new.docstore._dict]  # type: ignore
+                self.total = len(old_docs)
+                self.done = self.total - len(pending)
+
+            if self.stopping:
+                return
+            if len(pending) <= BATCH_SIZE:
+                # small remainder, finish under the lock so nothing changes meanwhile
+                self._finish(new)
+                return
+
+            for no, start in enumerate(range(0, len(pending), BATCH_SIZE), start=1):
+                if self.stopping:
+                    self._checkpoint(new, "running")
+                    return
+                with self.db.get_lock():
+                    docs = self.db.get_by_ids(pending[start : start + BATCH_SIZE])
+                self._add(new, docs)
+                self.done += len(docs)
+                if no % CHECKPOINT_EVERY == 0:
+                    self._checkpoint(new, "running")
+                    PrintStyle.standard(
+                        f"Re-indexed {self.done}/{self.total} memories in {self.db_dir}"
+                    )
+            self._checkpoint(new, "running")
+
+    def _finish(self, new: "MyFaiss"):
+        wal = self.db.wal
+        # no compaction may write the old snapshot after the swap,
+        # the compaction slot is claimed under the lock so none can start meanwhile
+        while wal:
+            with wal.lock:
+                if not wal.compacting:
+                    wal.compacting = True
+                    break
+            wal.wait_compaction()
+        with self.db.get_lock():
+            try:
+                old_docs = self.db.get_all_docs()
+                missing = [id for id in old_docs if id not in new.docstore._dict]  # type: ignore
+                removed = [id for id in new.docstore._dict if id not in old_docs]  # type: ignore
+                self._add(new, self.db.get_by_ids(missing))
+                if removed:
+                    new.delete(ids=removed)
+
+                self._checkpoint(new, "complete")
+                self._swap(new)
+                MemoryMigration.promote(self.db_dir)
+            finally:
+                if wal:
+                    wal.compacting = False
+        PrintStyle.standard(f"Memory in {self.db_dir} re-indexed for {self.model_name}")
+
+    def _swap(self, new: "MyFaiss"):
+        # replace the index in place, every holder of the db object sees the new one
+        db = self.db
+        db.index = new.index
+        db.docstore = new.docstore
+        db.index_to_docstore_id = new.index_to_docstore_id
+        db.embedding_function = self.embedder
+        db.meta = None
+        db._positions = None
+        if db.ann:
+            db.ann = MemoryAnn(db.ann.config)
+            db.ann.maybe_rebuild(db)
+        db.migration = None
+
+    def _add(self, new: "MyFaiss", docs: list):
+        if not docs:
+            return
+        texts = [doc.page_content for doc in docs]
+        embeddings = self.embedder.embed_documents(texts)
+        new.add_embeddings(
+            text_embeddings=list(zip(texts, embeddings)),
+            metadatas=[doc.metadata for doc in docs],
+            ids=[doc.metadata["id"] for doc in docs],
+        )
+
+    def _load_or_create(self) -> "MyFaiss":
+        from python.helpers.memory import MyFaiss, Memory
+
+        state = _read_json(self._path(STATE_FILE))
+        if (
+            state.get("model_provider") == self.model_provider
+            and state.get("model_name") == self.model_name
+            and os.path.exists(self._path(INDEX_FILE))
+        ):
+            try:
+                new = MyFaiss.load_local(
+                    folder_path=self._path(),
+                    embeddings=self.embedder,
+                    allow_dangerous_deserialization=True,
+                    distance_strategy=DistanceStrategy.COSINE,
+                    relevance_score_fn=Memory._cosine_normalizer,
+                )  # type: ignore
+                PrintStyle.standard(
+                    f"Resuming memory re-indexing in {self.db_dir} from {new.index.ntotal} documents"
+                )
+                return new  # type: ignore
+            except Exception as e:
+                PrintStyle.error(f"Discarding unreadable re-indexing checkpoint: {e}")
+
+        # different model or no usable checkpoint, start over
+        shutil.rmtree(self._path(), ignore_errors=True)
+        index = faiss.IndexFlatIP(len(self.embedder.embed_query("example")))
+        return MyFaiss(
+            embedding_function=self.embedder,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            distance_strategy=DistanceStrategy.COSINE,
+            relevance_score_fn=Memory._cosine_normalizer,
+        )
+
+    def _checkpoint(self, new: "MyFaiss", state: str):
+        os.makedirs(self._path(), exist_ok=True)
+        new.save_local(folder_path=self._path())
+        _write_json(
+            self._path(STATE_FILE),
+            {
+                "model_provider": self.model_provider,
+                "model_name": self.model_name,
+                "state": state,
+            },
+        )
+
+    @staticmethod
+    def promote(db_dir: str) -> bool:
+        # move a completed migration over the database, safe to repeat after a crash
+        migration_dir = os.path.join(db_dir, MIGRATION_DIR)
+        state = _read_json(os.path.join(migration_dir, STATE_FILE))
+        if state.get("state") != "complete":
+            return False
+        wal = MemoryWal.get(db_dir)
+        for name in (INDEX_FILE, DOCSTORE_FILE):
+            shutil.copyfile(
+                os.path.join(migration_dir, name), os.path.join(db_dir, name + ".tmp")
+            )
+        wal.commit_snapshot()
+        wal.clear()  # logged ops are already in the migrated index
+        _write_json(
+            os.path.join(db_dir, EMBEDDING_FILE),
+            {
+                "model_provider": state["model_provider"],
+                "model_name": state["model_name"],
+            },
+        )
+        shutil.rmtree(migration_dir, ignore_errors=True)
+        return True
+
+
+def _read_json(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def _write_json(path: str, data: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
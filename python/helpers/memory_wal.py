@@ -0,0 +1,246 @@
+import base64
+import json
+import os
+import pickle
+import threading
+from typing import Any, TYPE_CHECKING
+
+import numpy as np
+
+# faiss needs to be patched for python 3.12 on arm #TODO remove once not needed
+from python.helpers import faiss_monkey_patch
+import faiss
+
+from python.helpers.print_style import PrintStyle
+
+if TYPE_CHECKING:
+    from python.helpers.memory import MyFaiss
+
+WAL_FILE = "index.wal"
+WAL_COMPACTING_FILE = "index.wal.compacting"
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+SNAPSHOT_COMMIT_FILE = "index.commit"  # both snapshot files are written, switch them
+
+# compact the log into the snapshot once it grows past any of these
+COMPACT_OPS = 500
+COMPACT_BYTES = 32 * 1024 * 1024
+
+
+class MemoryWal:
+    """
+    Append-only log of add/delete operations on top of the FAISS snapshot
+    (index.faiss + index.pkl). Every change is appended as one JSON line,
+    snapshot is only rewritten by compaction in a background thread.
+    There is one log per database folder, use MemoryWal.get to obtain it.
+    """
+
+    _logs: dict[str, "MemoryWal"] = {}
+    _logs_lock = threading.Lock()
+
+    def __init__(self, db_dir: str):
+        self.db_dir = db_dir
+        self.lock = threading.RLock()
+        self.ops = 0
+        self.bytes = 0
+        self.compacting = False
+        self.thread: threading.Thread | None = None
+
+    @staticmethod
+    def get(db_dir: str) -> "MemoryWal":
+        # shared by every loaded copy of the database so they all serialize on one lock
+        db_dir = os.path.abspath(db_dir)
+        with MemoryWal._logs_lock:
+            wal = MemoryWal._logs.get(db_dir)
+            if not wal:
+                wal = MemoryWal._logs[db_dir] = MemoryWal(db_dir)
+            return wal
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.db_dir, name)
+
+    def append_add(
+        self,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict],
+        embeddings: list[list[float]],
+    ):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        self._append(
+            {
+                "op": "add",
+                "ids": ids,
+                "texts": texts,
+                "metadatas": metadatas,
+                "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                "vectors": base64.b64encode(vectors.tobytes()).decode("ascii"),
+            }
+        )
+
+    def append_delete(self, ids: list[str]):
+        self._append({"op": "delete", "ids": ids})
+
+    def _append(self, entry: dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+        data = line.encode("utf-8")
+        with self.lock:
+            os.makedirs(self.db_dir, exist_ok=True)
+            with open(self._path(WAL_FILE), "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self.ops += 1
+            self.bytes += len(data)
+
+    def replay(self, db: "MyFaiss") -> int:
+        # the compacting log is older than the current one, replay it first
+        # replay is idempotent, so ops already contained in the snapshot are skipped
+        count = 0
+        with self.lock:
+            self.ops = 0
+            self.bytes = 0
+            for name in (WAL_COMPACTING_FILE, WAL_FILE):
+                path = self._path(name)
+                if not os.path.exists(path):
+                    continue
+                with open(path, "rb") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except Exception:
+                            # torn write at the end of the log after a crash
+                            continue
+                        self._apply(db, entry)
+                        count += 1
+                        self.ops += 1
+                        self.bytes += len(line)
+        return count
+
+    def _apply(self, db: "MyFaiss", entry: dict[str, Any]):
+        existing = db.get_all_docs()
+        if entry.get("op") == "add":
+            dim = entry.get("dim", 0)
+            vectors = np.frombuffer(
+                base64.b64decode(entry["vectors"]), dtype=np.float32
+            )
+            vectors = vectors.reshape(-1, dim) if dim else vectors.reshape(0, 0)
+            rows = [
+                (id, text, meta, vec.tolist())
+                for id, text, meta, vec in zip(
+                    entry["ids"], entry["texts"], entry["metadatas"], vectors
+                )
+                if id not in existing
+            ]
+            if rows:
+                db.add_embeddings(
+                    text_embeddings=[(r[1], r[3]) for r in rows],
+                    metadatas=[r[2] for r in rows],
+                    ids=[r[0] for r in rows],
+                )
+        elif entry.get("op") == "delete":
+            ids = [id for id in entry.get("ids", []) if id in existing]
+            if ids:
+                db.delete(ids=ids)
+
+    def needs_compaction(self) -> bool:
+        return self.ops >= COMPACT_OPS or self.bytes >= COMPACT_BYTES
+
+    def schedule_compaction(self, db: "MyFaiss"):
+        with self.lock:
+            if self.compacting or not self.needs_compaction():
+                return
+            self.compacting = True
+            self.thread = threading.Thread(
+                target=self._compact_in_thread, args=(db,), daemon=True
+            )
+            self.thread.start()
+
+    def wait_compaction(self):
+        # block until a running background compaction has written its snapshot
+        thread = self.thread
+        if thread and thread is not threading.current_thread():
+            thread.join()
+
+    def _compact_in_thread(self, db: "MyFaiss"):
+        try:
+            self.compact(db)
+        except Exception as e:
+            PrintStyle.error(f"Memory compaction failed: {e}")
+        finally:
+            with self.lock:
+                self.compacting = False
+
+    def compact(self, db: "MyFaiss"):
+        # rotate the log and take an in-memory copy of the index under the lock,
+        # the slow disk writes happen outside of it so inserts are not blocked
+        with self.lock:
+            if not self._rotate():
+                return
+            index_bytes = faiss.serialize_index(db.index).tobytes()
+            docstore_bytes = pickle.dumps((db.docstore, db.index_to_docstore_id))
+            self.ops = 0
+            self.bytes = 0
+
+        self._write_tmp(INDEX_FILE, index_bytes)
+        self._write_tmp(DOCSTORE_FILE, docstore_bytes)
+        self.commit_snapshot()
+
+        # snapshot now contains everything from the rotated log
+        compacting = self._path(WAL_COMPACTING_FILE)
+        if os.path.exists(compacting):
+            os.remove(compacting)
+
+    def clear(self):
+        # called after a full snapshot has been saved
+        with self.lock:
+            for name in (WAL_COMPACTING_FILE, WAL_FILE):
+                path = self._path(name)
+                if os.path.exists(path):
+                    os.remove(path)
+            self.ops = 0
+            self.bytes = 0
+
+    def _rotate(self) -> bool:
+        current = self._path(WAL_FILE)
+        compacting = self._path(WAL_COMPACTING_FILE)
+        if not os.path.exists(current):
+            return os.path.exists(compacting)
+        if os.path.exists(compacting):
+            # previous compaction did not finish, keep its ops
+            with open(current, "rb") as src, open(compacting, "ab") as dst:
+                dst.write(src.read())
+            os.remove(current)
+        else:
+            os.replace(current, compacting)
+        return True
+
+    def _write_tmp(self, name: str, data: bytes):
+        with open(self._path(name) + ".tmp", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def commit_snapshot(self):
+        # index.faiss and index.pkl must always be a pair, the commit marker makes
+        # the switch of both .tmp files one step that recover() finishes after a crash
+        marker = self._path(SNAPSHOT_COMMIT_FILE)
+        with open(marker, "wb") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self.recover()
+
+    def recover(self):
+        # called before the snapshot is loaded, finishes or drops a half written one
+        marker = self._path(SNAPSHOT_COMMIT_FILE)
+        committed = os.path.exists(marker)
+        for name in (INDEX_FILE, DOCSTORE_FILE):
+            tmp = self._path(name) + ".tmp"
+            if not os.path.exists(tmp):
+                continue
+            if committed:
+                os.replace(tmp, self._path(name))
+            else:
+                os.remove(tmp)  # the other file was not written, keep the old pair
+        if committed:
+            os.remove(marker)
@@ -1,6 +1,10 @@
 from collections import OrderedDict
 from datetime import datetime
 from typing import Any
+import atexit
+import os
+import threading
+import time
 import uuid
 from agent import Agent, AgentConfig, AgentContext, AgentContextType
 from python.helpers import files, history
@@ -8,10 +12,16 @@ import json
 from initialize import initialize_agent
 
 from python.helpers.log import Log, LogItem
+from python.helpers.print_style import PrintStyle
 
 CHATS_FOLDER = "tmp/chats"
 LOG_SIZE = 1000
 CHAT_FILE_NAME = "chat.json"
+JOURNAL_FILE_NAME = "chat.jsonl"
+COMPACT_MIN_SIZE = 256 * 1024  # journal bytes below which it is never compacted
+SAVE_DELAY = 1.0  # seconds save requests of a chat are collected into one save
+INDEX_FILE = "tmp/chats_index.json"
+UNLOAD_AFTER = 30 * 60  # seconds without access after which an idle chat is unloaded
 
 
 def get_chat_folder_path(ctxid: str):
@@ -28,38 +38,92 @@ def get_chat_folder_path(ctxid: str):
 
 
 def save_tmp_chat(context: AgentContext):
-    """Save context to the chats folder"""
-    path = _get_chat_file_path(context.id)
-    files.make_dirs(path)
-    data = _serialize_context(context)
-    js = _safe_json_serialize(data, ensure_ascii=False)
-    files.write_file(path, js)
+    """Schedule saving of context to the chats folder, requests within SAVE_DELAY are saved once"""
+    _saver.schedule(context)
+
+
+def save_tmp_chat_now(context: AgentContext):
+    """Save context to the chats folder right away"""
+    _saver.cancel(context.id)
+    _get_store(context.id).save(context)
 
 
 def save_tmp_chats():
-    """Save all contexts to the chats folder"""
-    for _, context in AgentContext._contexts.items():
-        save_tmp_chat(context)
+    """Save all contexts to the chats folder right away"""
+    for _, context in list(AgentContext._contexts.items()):
+        save_tmp_chat_now(context)
+
+
+def flush():
+    """Write all scheduled saves now, called on shutdown"""
+    _saver.flush()
 
 
 def load_tmp_chats():
-    """Load all contexts from the chats folder"""
+    """Register all contexts from the chats folder, each is loaded on first access"""
     _convert_v080_chats()
-    folders = files.list_files(CHATS_FOLDER, "*")
-    json_files = []
-    for folder_name in folders:
-        json_files.append(_get_chat_file_path(folder_name))
+    folders = [
+        folder
+        for folder in files.list_files(CHATS_FOLDER, "*")
+        if os.path.isdir(get_chat_folder_path(folder))
+    ]
+    entries = _index.load(folders)
 
     ctxids = []
-    for file in json_files:
+    for entry in entries:
+        if entry["id"] not in AgentContext._contexts:
+            AgentContext._counter += 1
+            AgentContext._unloaded[entry["id"]] = {**entry, "no": AgentContext._counter}
+        ctxids.append(entry["id"])
+    return ctxids
+
+
+_hydrate_lock = threading.Lock()
+
+
+def hydrate_chat(ctxid: str) -> AgentContext | None:
+    """Load a registered context from the chats folder"""
+    with _hydrate_lock:
+        context = AgentContext._contexts.get(ctxid)
+        if context:
+            return context
+        entry = AgentContext._unloaded.get(ctxid)
+        if not entry:
+            return None
         try:
-            js = files.read_file(file)
-            data = json.loads(js)
-            ctx = _deserialize_context(data)
-            ctxids.append(ctx.id)
+            data = ChatStore.read(_get_chat_file_path(ctxid))
+            # log items are numbered anew, the first save writes a new snapshot
+            _stores.pop(ctxid, None)
+            context = _deserialize_context(data)
+            context.no = entry["no"]
+            return context
         except Exception as e:
-            print(f"Error loading chat {file}: {e}")
-    return ctxids
+            AgentContext._unloaded.pop(ctxid, None)
+            PrintStyle.error(f"Error loading chat {ctxid}: {e}")
+            return None
+
+
+def unload_idle_chats():
+    """Save and unload contexts not accessed for UNLOAD_AFTER, they are loaded again on access"""
+    now = time.monotonic()
+    for context in list(AgentContext._contexts.values()):
+        if now - context.accessed < UNLOAD_AFTER:
+            continue
+        if context.task and context.task.is_alive():
+            continue
+        with _hydrate_lock:
+            try:
+                save_tmp_chat_now(context)
+            except Exception as e:
+                PrintStyle.error(f"Error saving chat {context.id}: {e}")
+                continue
+            entry = _index.get(context.id)
+            if not entry or AgentContext._contexts.get(context.id) is not context:
+                continue
+            # registered before it is removed, a lookup meanwhile always finds it
+            AgentContext._unloaded[context.id] = {**entry, "no": context.no}
+            AgentContext._contexts.pop(context.id, None)
+            _stores.pop(context.id, None)
 
 
 def _get_chat_file_path(ctxid: str):
@@ -96,19 +160,481 @@ def export_json_chat(context: AgentContext):
 
 def remove_chat(ctxid):
     """Remove a chat or task context"""
+    _saver.cancel(ctxid)
+    _index.remove(ctxid)
+    store = _stores.pop(ctxid, None)
     path = get_chat_folder_path(ctxid)
-    files.delete_dir(path)
+    if store:
+        with store.lock:
+            files.delete_dir(path)
+    else:
+        files.delete_dir(path)
 
 
-def _serialize_context(context: AgentContext):
-    # serialize agents
-    agents = []
-    agent = context.agent0
-    while agent:
-        agents.append(_serialize_agent(agent))
-        agent = agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+class ChatStore:
+    """
+    Chat persisted as a snapshot in chat.json and a journal of changes in chat.jsonl.
+    A save appends only what changed since the previous one: new history messages
+    and topics, updated log items, changed agent data and context metadata.
+    Changes that are not appends, like history compression, write the whole part.
+    The journal is compacted into a new snapshot once it outgrows the snapshot,
+    it belongs to the snapshot of the same generation and is ignored otherwise.
+    """
+
+    def __init__(self, ctxid: str):
+        self.ctxid = ctxid
+        self.lock = threading.RLock()
+        self.generation = ""  # empty until the first save writes a snapshot
+        self.snapshot_size = 0
+        self.journal_size = 0
+        # state at the previous save, changes are detected against it
+        self.agents: list[Agent] = []
+        self.histories: list[tuple] = []
+        self.data: list[str] = []
+        self.meta = ""
+        self.log_guid = ""
+        self.log_updates = 0
+
+    def save(self, context: AgentContext):
+        with self.lock:
+            if (
+                not self.generation
+                or self.journal_size > max(COMPACT_MIN_SIZE, self.snapshot_size)
+                or not os.path.exists(self._path(JOURNAL_FILE_NAME))
+            ):
+                self.compact(context)
+                return
+            state = self._get_state()
+            try:
+                records = self._changes(context)
+                if records:
+                    self._append(records)
+            except BaseException:
+                # not written, the same changes are found again by the next save
+                self._set_state(state)
+                raise
+
+    def compact(self, context: AgentContext):
+        with self.lock:
+            generation = str(uuid.uuid4())
+            # state is taken before serializing, changes made meanwhile by the
+            # running agent are then written again by the next save
+            agents = list(_iter_agents(context.agent0))
+            histories = [_history_state(agent.history) for agent in agents]
+            agents_data = [_agent_data_json(agent) for agent in agents]
+            log_guid, log_updates = context.log.guid, len(context.log.updates)
+            meta = _safe_json_serialize(_serialize_meta(context), ensure_ascii=False)
+            data = _serialize_context(context, agents=False)
+            data["agents"] = _serialize_agents(context, _by_agent(agents, histories))
+            data["journal"] = generation
+            js = _safe_json_serialize(data, ensure_ascii=False)
+            # the new snapshot replaces the old one before the journal is reset,
+            # a journal of the old generation left by a crash is ignored on load
+            self.generation = ""  # compact again if this one does not complete
+            _write_atomic(self._path(CHAT_FILE_NAME), js)
+            header = _safe_json_serialize({"t": "journal", "journal": generation}) + "\n"
+            _write_atomic(self._path(JOURNAL_FILE_NAME), header)
+            self.generation = generation
+            self.snapshot_size = len(js)
+            self.journal_size = len(header)
+            self._remember_agents(agents, histories, agents_data)
+            self.log_guid, self.log_updates = log_guid, log_updates
+            self.meta = meta
+            _index.update(json.loads(meta))
+
+    @staticmethod
+    def read(path: str) -> dict[str, Any]:
+        # snapshot with the changes of its journal replayed
+        data = json.loads(files.read_file(path))
+        journal = os.path.join(os.path.dirname(path), JOURNAL_FILE_NAME)
+        if not data.get("journal") or not os.path.exists(journal):
+            return data
+        with open(journal, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                break  # incomplete last line of an interrupted save
+        if not records or records[0].get("journal") != data["journal"]:
+            return data
+        for record in records[1:]:
+            _replay(data, record)
+        return data
+
+    def _path(self, name: str) -> str:
+        return files.get_abs_path(CHATS_FOLDER, self.ctxid, name)
+
+    def _append(self, records: list[dict[str, Any]]):
+        content = "".join(
+            _safe_json_serialize(record, ensure_ascii=False) + "\n" for record in records
+        )
+        content = files.sanitize_string(content)
+        with open(self._path(JOURNAL_FILE_NAME), "a", encoding="utf-8") as f:
+            f.write(content)
+        self.journal_size += len(content)
+
+    def _changes(self, context: AgentContext) -> list[dict[str, Any]]:
+        records: list[dict[str, Any]] = []
+
+        # agents, a changed tree is written whole
+        agents = list(_iter_agents(context.agent0))
+        if len(agents) != len(self.agents) or any(
+            a is not b for a, b in zip(agents, self.agents)
+        ):
+            histories = [_history_state(agent.history) for agent in agents]
+            agents_data = [_agent_data_json(agent) for agent in agents]
+            records.append(
+                {
+                    "t": "agents",
+                    "agents": _serialize_agents(context, _by_agent(agents, histories)),
+                }
+            )
+            self._remember_agents(agents, histories, agents_data)
+        else:
+            for index, agent in enumerate(agents):
+                records += self._history_changes(index, agent.history)
+                data = _agent_data_json(agent)
+                if data != self.data[index]:
+                    records.append({"t": "data", "agent": index, "data": json.loads(data)})
+                    self.data[index] = data
+
+        # log items updated since the last save, a reset log is written whole
+        log = context.log
+        guid, count = log.guid, len(log.updates)
+        if guid != self.log_guid:
+            records.append({"t": "log", "log": _serialize_log(log)})
+        else:
+            updated = dict.fromkeys(log.updates[self.log_updates : count])
+            if updated:
+                records.append(
+                    {"t": "log_items", "items": [log.logs[no].output() for no in updated]}
+                )
+        self.log_guid = guid
+        self.log_updates = count
+
+        # context metadata
+        meta = _serialize_meta(context)
+        meta_json = _safe_json_serialize(meta, ensure_ascii=False)
+        if meta_json != self.meta:
+            records.append({"t": "meta", **meta})
+            self.meta = meta_json
+            _index.update(meta)
+
+        return records
+
+    def _get_state(self) -> tuple:
+        return (
+            self.agents,
+            list(self.histories),
+            list(self.data),
+            self.meta,
+            self.log_guid,
+            self.log_updates,
+        )
+
+    def _set_state(self, state: tuple):
+        (
+            self.agents,
+            self.histories,
+            self.data,
+            self.meta,
+            self.log_guid,
+            self.log_updates,
+        ) = state
+
+    def _remember_agents(
+        self, agents: list[Agent], histories: list[tuple], data: list[str]
+    ):
+        self.agents = agents
+        self.histories = histories
+        self.data = data
+
+    def _history_changes(self, index: int, hist: history.History) -> list[dict[str, Any]]:
+        version, bulks, topics, current, count, last = self.histories[index]
+        state = _history_state(hist)
+        new_version, new_bulks, new_topics, new_current, new_count, _ = state
+        self.histories[index] = state
+        # messages are appended to the current topic, topics only added after the known ones
+        chain = [*new_topics[len(topics) :], new_current]
+        appended = (
+            new_version == version
+            and len(new_bulks) == len(bulks)
+            and all(a is b for a, b in zip(new_bulks, bulks))
+            and len(new_topics) >= len(topics)
+            and all(a is b for a, b in zip(new_topics, topics))
+            and chain[0] is current
+            and len(current.messages) >= count
+            and (not count or current.messages[count - 1] is last)
+        )
+        if not appended:
+            return [{"t": "history", "agent": index, "history": _history_dict(state)}]
+
+        records: list[dict[str, Any]] = []
+        for no, topic in enumerate(chain):
+            if no:
+                records.append({"t": "topic", "agent": index})
+            start = count if no == 0 else 0
+            end = new_count if topic is new_current else len(topic.messages)
+            messages = topic.messages[start:end]
+            if messages:
+                records.append(
+                    {
+                        "t": "messages",
+                        "agent": index,
+                        "messages": [m.to_dict() for m in messages],
+                    }
+                )
+        return records
+
+
+class ChatSaver:
+    """
+    Collects save requests per chat and writes them on a worker thread.
+    A chat is saved SAVE_DELAY after the first of its pending requests, later
+    requests join that save, so bursts of iterations and tool calls cost one write.
+    """
+
+    def __init__(self):
+        self.pending: dict[str, tuple[AgentContext, float]] = {}  # ctxid -> context, due time
+        self.saving: dict[str, AgentContext] = {}  # taken by the worker
+        self.condition = threading.Condition()
+        self.thread: threading.Thread | None = None
+
+    def schedule(self, context: AgentContext):
+        with self.condition:
+            due = self.pending.get(context.id, (None, time.monotonic() + SAVE_DELAY))[1]
+            self.pending[context.id] = (context, due)
+            if not self.thread:
+                self.thread = threading.Thread(
+                    target=self._run, name="chat-saver", daemon=True
+                )
+                self.thread.start()
+            self.condition.notify()
+
+    def cancel(self, ctxid: str):
+        with self.condition:
+            self.pending.pop(ctxid, None)
+
+    def flush(self):
+        # a save running on the worker may have started before the latest changes,
+        # the chat store lock orders the saves and the second one writes the rest
+        with self.condition:
+            contexts = {ctxid: context for ctxid, (context, _) in self.pending.items()}
+            contexts.update(self.saving)
+            self.pending.clear()
+        for context in contexts.values():
+            self._save(context)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                now = time.monotonic()
+                due = [ctxid for ctxid, (_, at) in self.pending.items() if at <= now]
+                if not due:
+                    wait = min((at for _, at in self.pending.values()), default=now + 60)
+                    self.condition.wait(wait - now)
+                    continue
+                contexts = [self.pending.pop(ctxid)[0] for ctxid in due]
+                self.saving = {context.id: context for context in contexts}
+            for context in contexts:
+                self._save(context)
+            with self.condition:
+                self.saving = {}
+
+    def _save(self, context: AgentContext):
+        try:
+            _get_store(context.id).save(context)
+        except RuntimeError:
+            # the running agent changed a collection while it was serialized
+            self.schedule(context)
+        except Exception as e:
+            PrintStyle.error(f"Error saving chat {context.id}: {e}")
+
+
+class ChatIndex:
+    """
+    Id, name, dates and type of every saved chat in a single file, read at startup
+    instead of the chats themselves. Updated by chat saves when these fields change.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.lock = threading.RLock()
+
+    def load(self, folders: list[str]) -> list[dict[str, Any]]:
+        with self.lock:
+            try:
+                self.entries = json.loads(files.read_file(self.path))
+            except Exception:
+                self.entries = {}
+            changed = False
+            # chats saved without the index, like from older versions, are read once
+            for ctxid in folders:
+                if ctxid in self.entries:
+                    continue
+                try:
+                    data = ChatStore.read(_get_chat_file_path(ctxid))
+                    self.entries[ctxid] = _index_entry({**data, "id": ctxid})
+                    changed = True
+                except Exception as e:
+                    print(f"Error loading chat {ctxid}: {e}")
+            for ctxid in [ctxid for ctxid in self.entries if ctxid not in folders]:
+                del self.entries[ctxid]
+                changed = True
+            if changed:
+                self._write()
+            return list(self.entries.values())
+
+    def get(self, ctxid: str) -> dict[str, Any] | None:
+        with self.lock:
+            return self.entries.get(ctxid)
+
+    def update(self, meta: dict[str, Any]):
+        entry = _index_entry(meta)
+        with self.lock:
+            if self.entries.get(entry["id"]) != entry:
+                self.entries[entry["id"]] = entry
+                self._write()
+
+    def remove(self, ctxid: str):
+        with self.lock:
+            if self.entries.pop(ctxid, None):
+                self._write()
+
+    def _write(self):
+        _write_atomic(
+            files.get_abs_path(self.path),
+            _safe_json_serialize(self.entries, ensure_ascii=False),
+        )
+
 
+def _index_entry(data: dict[str, Any]) -> dict[str, Any]:
+    epoch = datetime.fromtimestamp(0).isoformat()
     return {
+        "id": data["id"],
+        "name": data.get("name"),
+        "created_at": data.get("created_at") or epoch,
+        "last_message": data.get("last_message") or epoch,
+        "type": data.get("type", AgentContextType.USER.value),
+    }
+
+
+_saver = ChatSaver()
+_index = ChatIndex(INDEX_FILE)
+atexit.register(flush)
+
+_stores: dict[str, ChatStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _get_store(ctxid: str) -> ChatStore:
+    with _stores_lock:
+        store = _stores.get(ctxid)
+        if not store:
+            store = _stores[ctxid] = ChatStore(ctxid)
+        return store
+
+
+def _by_agent(agents: list[Agent], histories: list[tuple]) -> dict[int, tuple]:
+    return {id(agent): state for agent, state in zip(agents, histories)}
+
+
+def _history_dict(state: tuple) -> dict[str, Any]:
+    # history as it was when the state was taken, later messages are left out
+    _, bulks, topics, current, count, _ = state
+    return {
+        "_cls": "History",
+        "bulks": [b.to_dict() for b in bulks],
+        "topics": [t.to_dict() for t in topics],
+        "current": {
+            "_cls": "Topic",
+            "summary": current.summary,
+            "messages": [m.to_dict() for m in current.messages[:count]],
+        },
+    }
+
+
+def _history_state(hist: history.History) -> tuple:
+    messages = hist.current.messages
+    return (
+        hist.version,
+        list(hist.bulks),
+        list(hist.topics),
+        hist.current,
+        len(messages),
+        messages[-1] if messages else None,
+    )
+
+
+def _serialize_meta(context: AgentContext) -> dict[str, Any]:
+    meta = _serialize_context(context, agents=False, log=False)
+    meta["progress"] = context.log.progress
+    meta["progress_no"] = context.log.progress_no
+    return meta
+
+
+def _agent_data_json(agent: Agent) -> str:
+    return _safe_json_serialize(
+        {k: v for k, v in agent.data.items() if not k.startswith("_")},
+        ensure_ascii=False,
+    )
+
+
+def _replay(data: dict[str, Any], record: dict[str, Any]):
+    # applies a journal record to the serialized context
+    kind = record.get("t")
+    if kind == "agents":
+        data["agents"] = record["agents"]
+    elif kind == "meta":
+        log = data.setdefault("log", {})
+        log["progress"] = record.pop("progress", log.get("progress"))
+        log["progress_no"] = record.pop("progress_no", log.get("progress_no"))
+        data.update({k: v for k, v in record.items() if k != "t"})
+    elif kind == "log":
+        data["log"] = record["log"]
+    elif kind == "log_items":
+        logs = data.setdefault("log", {}).setdefault("logs", [])
+        positions = {item["no"]: i for i, item in enumerate(logs)}
+        for item in record["items"]:
+            if item["no"] in positions:
+                logs[positions[item["no"]]] = item
+            elif not logs or item["no"] > logs[-1]["no"]:
+                positions[item["no"]] = len(logs)
+                logs.append(item)
+        del logs[:-LOG_SIZE]
+    else:
+        agent = data["agents"][record["agent"]]
+        if kind == "data":
+            agent["data"] = record["data"]
+        elif kind == "history":
+            agent["history"] = _safe_json_serialize(record["history"], ensure_ascii=False)
+        else:
+            hist = json.loads(agent["history"]) if agent.get("history") else {
+                "_cls": "History", "bulks": [], "topics": [],
+                "current": {"_cls": "Topic", "summary": "", "messages": []},
+            }
+            if kind == "topic":
+                if hist["current"]["messages"]:
+                    hist["topics"].append(hist["current"])
+                    hist["current"] = {"_cls": "Topic", "summary": "", "messages": []}
+            elif kind == "messages":
+                hist["current"]["messages"] += record["messages"]
+            agent["history"] = _safe_json_serialize(hist, ensure_ascii=False)
+
+
+def _write_atomic(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(files.sanitize_string(content))
+    os.replace(tmp, path)
+
+
+def _serialize_context(context: AgentContext, agents: bool = True, log: bool = True):
+    data = {
         "id": context.id,
         "name": context.name,
         "created_at": (
@@ -120,24 +646,63 @@ def _serialize_context(context: AgentContext):
             context.last_message.isoformat() if context.last_message
             else datetime.fromtimestamp(0).isoformat()
         ),
-        "agents": agents,
         "streaming_agent": (
             context.streaming_agent.number if context.streaming_agent else 0
         ),
-        "log": _serialize_log(context.log),
+        "streaming_agent_index": next(
+            (i for i, a in enumerate(_iter_agents(context.agent0)) if a is context.streaming_agent),
+            0,
+        ),
     }
+    if agents:
+        data["agents"] = _serialize_agents(context)
+    if log:
+        data["log"] = _serialize_log(context.log)
+    return data
+
+
+def _serialize_agents(
+    context: AgentContext, histories: dict[int, tuple] | None = None
+) -> list[dict[str, Any]]:
+    # serialize agents, the tree is flattened depth first with superior indexes
+    agents = []
 
+    def add_agent(agent: Agent, superior: int | None):
+        index = len(agents)
+        data = _serialize_agent(agent, (histories or {}).get(id(agent)))
+        if superior is not None:
+            data["superior"] = superior
+        agents.append(data)
+        for sub in agent.get_subordinates():
+            add_agent(sub, index)
 
-def _serialize_agent(agent: Agent):
+    add_agent(context.agent0, None)
+    return agents
+
+
+def _iter_agents(agent: Agent):
+    # same depth first order as the serialized agents list
+    yield agent
+    for sub in agent.get_subordinates():
+        yield from _iter_agents(sub)
+
+
+def _serialize_agent(agent: Agent, history_state: tuple | None = None):
     data = {k: v for k, v in agent.data.items() if not k.startswith("_")}
 
-    history = agent.history.serialize()
+    if history_state:
+        history = _safe_json_serialize(_history_dict(history_state), ensure_ascii=False)
+    else:
+        history = agent.history.serialize()
 
-    return {
+    result = {
         "number": agent.number,
         "data": data,
         "history": history,
     }
+    if agent.branch:
+        result["branch"] = agent.branch
+    return result
 
 
 def _serialize_log(log: Log):
@@ -178,10 +743,14 @@ def _deserialize_context(data):
     )
 
     agents = data.get("agents", [])
-    agent0 = _deserialize_agents(agents, config, context)
-    streaming_agent = agent0
-    while streaming_agent.number != data.get("streaming_agent", 0):
-        streaming_agent = streaming_agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
+    agent0, loaded = _deserialize_agents(agents, config, context)
+    if "streaming_agent_index" in data:
+        index = data["streaming_agent_index"]
+        streaming_agent = loaded[index] if 0 <= index < len(loaded) else agent0
+    else:
+        streaming_agent = agent0
+        while streaming_agent.number != data.get("streaming_agent", 0):
+            streaming_agent = streaming_agent.data.get(Agent.DATA_NAME_SUBORDINATE, None)
 
     context.agent0 = agent0
     context.streaming_agent = streaming_agent
@@ -191,9 +760,8 @@ def _deserialize_context(data):
 
 def _deserialize_agents(
     agents: list[dict[str, Any]], config: AgentConfig, context: AgentContext
-) -> Agent:
-    prev: Agent | None = None
-    zero: Agent | None = None
+) -> tuple[Agent, list[Agent]]:
+    loaded: list[Agent] = []
 
     for ag in agents:
         current = Agent(
@@ -205,15 +773,26 @@ def _deserialize_agents(
         current.history = history.deserialize_history(
             ag.get("history", ""), agent=current
         )
-        if not zero:
-            zero = current
-
-        if prev:
-            prev.set_data(Agent.DATA_NAME_SUBORDINATE, current)
-            current.set_data(Agent.DATA_NAME_SUPERIOR, prev)
-        prev = current
-
-    return zero or Agent(0, config, context)
+        if ag.get("branch"):
+            current.set_branch(ag["branch"])
+
+        # older chats store a chain without superior indexes
+        superior_index = ag.get("superior", len(loaded) - 1 if loaded else None)
+        if superior_index is not None and 0 <= superior_index < len(loaded):
+            superior = loaded[superior_index]
+            current.set_data(Agent.DATA_NAME_SUPERIOR, superior)
+            if current.branch:
+                superior.set_data(
+                    Agent.DATA_NAME_SUBORDINATES,
+                    [*(superior.get_data(Agent.DATA_NAME_SUBORDINATES) or []), current],
+                )
+            else:
+                superior.set_data(Agent.DATA_NAME_SUBORDINATE, current)
+        loaded.append(current)
+
+    if not loaded:
+        loaded.append(Agent(0, config, context))
+    return loaded[0], loaded
 
 
 # def _deserialize_history(history: list[dict[str, Any]]):
@@ -246,6 +825,7 @@ def _deserialize_log(data: dict[str, Any]) -> "Log":
                 content=item_data.get("content", ""),
                 kvps=OrderedDict(item_data["kvps"]) if item_data["kvps"] else None,
                 temp=item_data.get("temp", False),
+                agent=item_data.get("agent", None),
             )
         )
         log.updates.append(i)
@@ -255,21 +835,10 @@ def _deserialize_log(data: dict[str, Any]) -> "Log":
 
 
 def _safe_json_serialize(obj, **kwargs):
-    def serializer(o):
-        if isinstance(o, dict):
-            return {k: v for k, v in o.items() if is_json_serializable(v)}
-        elif isinstance(o, (list, tuple)):
-            return [item for item in o if is_json_serializable(item)]
-        elif is_json_serializable(o):
-            return o
-        else:
-            return None  # Skip this property
+    # json calls the default only for values it cannot serialize, those are skipped
+    # as null without testing every other value by serializing it separately
+    return json.dumps(obj, default=_skip_value, **kwargs)
 
-    def is_json_serializable(item):
-        try:
-            json.dumps(item)
-            return True
-        except (TypeError, OverflowError):
-            return False
 
-    return json.dumps(obj, default=serializer, **kwargs)
+def _skip_value(o):
+    return None
@@ -21,6 +21,9 @@ def stop_server():
 
 def reload():
     stop_server()
+    # exec does not run exit handlers, scheduled chat saves are written now
+    from python.helpers import persist_chat
+    persist_chat.flush()
     if runtime.is_dockerized():
         exit_process()
     else:
@@ -0,0 +1,180 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Any
+
+from python.helpers import files
+
+CHECK_INTERVAL = 1.0  # seconds between mtime checks of a cached template
+
+# includes first so their braces are not taken for a placeholder
+TOKEN_PATTERN = re.compile(
+    r"{{\s*include\s*['\"](.*?)['\"]\s*}}|{{([^{}]+)}}"
+)
+
+TEXT, VAR, INCLUDE, DYNAMIC_INCLUDE = range(4)
+
+
+class PromptTemplate:
+    """
+    Prompt file compiled once into literal segments, placeholders and included
+    templates. Rendering only joins strings, files are re-read when the mtime of
+    any file in the include graph (including the companion variables plugin)
+    changes, or when a file appears that would now be resolved instead.
+    """
+
+    def __init__(self, path: str, backup_dirs: tuple[str, ...]):
+        self.path = path
+        self.backup_dirs = backup_dirs
+        self.segments: list[tuple[int, Any]] = []
+        self.plugin_class: type[files.VariablesPlugin] | None = None
+        self.deps: dict[str, float | None] = {}  # file -> mtime, None if missing
+        self.checked = 0.0
+        self.parsed: tuple[bool, str] | None = None
+        self._compile()
+
+    def _compile(self):
+        backup_dirs = list(self.backup_dirs)
+        absolute_path = files.find_file_in_dirs(self.path, backup_dirs)
+        with open(absolute_path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+        # the requested location is watched too, a new file there takes precedence
+        self._track(files.get_abs_path(self.path))
+        self._track(absolute_path)
+        if self.path.endswith(".md"):
+            self._track(
+                files.get_abs_path(
+                    files.dirname(self.path), files.basename(self.path, ".md") + ".py"
+                )
+            )
+        plugin_file = files.find_plugin_file(self.path, backup_dirs)
+        if plugin_file:
+            self._track(plugin_file)
+            self.plugin_class = files.load_plugin_class(plugin_file)
+
+        base_path = os.path.dirname(self.path)
+        pos = 0
+        for match in TOKEN_PATTERN.finditer(content):
+            if match.start() > pos:
+                self.segments.append((TEXT, content[pos : match.start()]))
+            pos = match.end()
+            include_path, key = match.group(1), match.group(2)
+            if key is not None:
+                self.segments.append((VAR, key))
+            elif "{{" in include_path:
+                # include path built from placeholders, resolved on render
+                self.segments.append((DYNAMIC_INCLUDE, (base_path, include_path)))
+            else:
+                child = _include(base_path, include_path, self.backup_dirs)
+                self._track(files.get_abs_path(base_path, include_path))
+                self.deps.update(child.deps)
+                self.segments.append((INCLUDE, child))
+        if pos < len(content):
+            self.segments.append((TEXT, content[pos:]))
+
+    def _track(self, path: str):
+        self.deps[path] = _mtime(path)
+
+    def is_fresh(self) -> bool:
+        now = time.monotonic()
+        if now - self.checked < CHECK_INTERVAL:
+            return True
+        fresh = all(_mtime(path) == mtime for path, mtime in self.deps.items())
+        if fresh:
+            self.checked = now
+        return fresh
+
+    def variables(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        if not self.plugin_class:
+            return kwargs
+        # plugin variables are dynamic, only the plugin class is cached
+        variables = self.plugin_class().get_variables() or {}
+        variables.update(kwargs)
+        return variables
+
+    def render(self, kwargs: dict[str, Any], variables: dict[str, Any] | None = None) -> str:
+        if variables is None:
+            variables = self.variables(kwargs)
+        parts = []
+        for kind, value in self.segments:
+            if kind == TEXT:
+                parts.append(value)
+            elif kind == VAR:
+                parts.append(
+                    str(variables[value]) if value in variables else "{{" + value + "}}"
+                )
+            elif kind == INCLUDE:
+                # here we use kwargs, the plugin variables are not inherited
+                parts.append(value.render(kwargs))
+            else:
+                base_path, include_path = value
+                include_path = files.replace_placeholders_text(include_path, **variables)
+                parts.append(
+                    _include(base_path, include_path, self.backup_dirs).render(kwargs)
+                )
+        return "".join(parts)
+
+    def parse(self, kwargs: dict[str, Any]) -> Any:
+        # same steps as files.parse_file: text render without kwargs, then typed values
+        if self.plugin_class or self.parsed is None:
+            variables = self.variables({})
+            content = self.render({}, variables)
+            is_json = files.is_full_json_template(content)
+            content = files.remove_code_fences(content)
+            if not self.plugin_class:
+                self.parsed = (is_json, content)
+        else:
+            variables = {}
+            is_json, content = self.parsed
+        variables = {**variables, **kwargs}
+        if is_json:
+            return json.loads(files.replace_placeholders_json(content, **variables))
+        return files.replace_placeholders_text(content, **variables)
+
+
+_templates: dict[tuple[str, tuple[str, ...]], PromptTemplate] = {}
+_lock = threading.RLock()
+
+
+def get_template(path: str, backup_dirs: list[str] | tuple[str, ...] | None = None) -> PromptTemplate:
+    key = (path, tuple(backup_dirs or ()))
+    template = _templates.get(key)
+    if template and template.is_fresh():
+        return template
+    with _lock:
+        template = _templates.get(key)
+        if not template or not template.is_fresh():
+            template = PromptTemplate(*key)
+            _templates[key] = template
+        return template
+
+
+def read_prompt(path: str, backup_dirs: list[str] | None = None, **kwargs) -> str:
+    return get_template(path, backup_dirs).render(kwargs)
+
+
+def parse_prompt(path: str, backup_dirs: list[str] | None = None, **kwargs) -> Any:
+    return get_template(path, backup_dirs).parse(kwargs)
+
+
+def clear():
+    with _lock:
+        _templates.clear()
+
+
+def _include(base_path: str, include_path: str, backup_dirs: tuple[str, ...]) -> PromptTemplate:
+    # resolve relative to the including file first, like files.process_includes
+    full_include_path = files.find_file_in_dirs(
+        os.path.join(base_path, include_path), list(backup_dirs)
+    )
+    return get_template(full_include_path, backup_dirs)
+
+
+def _mtime(path: str) -> float | None:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
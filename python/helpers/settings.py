@@ -22,6 +22,7 @@ class Settings(TypedDict):
     chat_model_ctx_length: int
     chat_model_ctx_history: float
     chat_model_vision: bool
+    chat_model_prompt_cache: bool
     chat_model_rl_requests: int
     chat_model_rl_input: int
     chat_model_rl_output: int
@@ -35,6 +36,9 @@ class Settings(TypedDict):
     util_model_rl_requests: int
     util_model_rl_input: int
     util_model_rl_output: int
+    util_model_cache: bool
+    util_model_cache_ttl_hours: int
+    util_model_cache_semantic: bool
 
     embed_model_provider: str
     embed_model_name: str
@@ -52,6 +56,13 @@ class Settings(TypedDict):
     agent_prompts_subdir: str
     agent_memory_subdir: str
     agent_knowledge_subdir: str
+    agent_parallel_tools: bool
+    agent_subordinates_concurrency: int
+
+    memory_index_type: str
+    memory_index_min_size: int
+    memory_index_search_depth: int
+    memory_embedding_cache_mb: int
 
     api_keys: dict[str, str]
 
@@ -194,6 +205,16 @@ def convert_out(settings: Settings) -> SettingsOutput:
         }
     )
 
+    chat_model_fields.append(
+        {
+            "id": "chat_model_prompt_cache",
+            "title": "Prompt caching",
+            "description": "Marks the stable beginning of the prompt (system prompt and message history) as cacheable for providers that support prompt caching, like Anthropic. Reduces latency and input cost of long chats.",
+            "type": "switch",
+            "value": settings["chat_model_prompt_cache"],
+        }
+    )
+
     chat_model_fields.append(
         {
             "id": "chat_model_rl_requests",
@@ -304,6 +325,36 @@ def convert_out(settings: Settings) -> SettingsOutput:
         }
     )
 
+    util_model_fields.append(
+        {
+            "id": "util_model_cache",
+            "title": "Utility model response cache",
+            "description": "Reuse responses of identical utility calls (same model, system prompt and message) instead of calling the model again, also across restarts.",
+            "type": "switch",
+            "value": settings["util_model_cache"],
+        }
+    )
+
+    util_model_fields.append(
+        {
+            "id": "util_model_cache_ttl_hours",
+            "title": "Utility model cache lifetime",
+            "description": "Hours a cached utility response stays valid. 0 keeps responses until evicted.",
+            "type": "number",
+            "value": settings["util_model_cache_ttl_hours"],
+        }
+    )
+
+    util_model_fields.append(
+        {
+            "id": "util_model_cache_semantic",
+            "title": "Utility model semantic cache",
+            "description": "Also reuse memory query rewrites for near-identical short messages, compared by the embedding model. Summaries always need an exact match. Costs an embedding per cache miss.",
+            "type": "switch",
+            "value": settings["util_model_cache_semantic"],
+        }
+    )
+
     util_model_fields.append(
         {
             "id": "util_model_kwargs",
@@ -558,6 +609,26 @@ def convert_out(settings: Settings) -> SettingsOutput:
         }
     )
 
+    agent_fields.append(
+        {
+            "id": "agent_parallel_tools",
+            "title": "Multiple tool calls",
+            "description": "Allow the agent to request multiple tool calls in one response. Independent lookups like search, memory and document queries run concurrently, results are returned in order.",
+            "type": "switch",
+            "value": settings["agent_parallel_tools"],
+        }
+    )
+
+    agent_fields.append(
+        {
+            "id": "agent_subordinates_concurrency",
+            "title": "Parallel subordinates",
+            "description": "Maximum number of subordinate agents running at the same time when an agent delegates multiple tasks at once.",
+            "type": "number",
+            "value": settings["agent_subordinates_concurrency"],
+        }
+    )
+
     agent_section: SettingsSection = {
         "id": "agent",
         "title": "Agent Config",
@@ -566,6 +637,62 @@ def convert_out(settings: Settings) -> SettingsOutput:
         "tab": "agent",
     }
 
+    # Memory section
+    memory_fields: list[SettingsField] = []
+
+    memory_fields.append(
+        {
+            "id": "memory_index_type",
+            "title": "Memory index type",
+            "description": "Index used for similarity search in memory. Flat is exact brute-force search. IVF-Flat and HNSW are approximate indexes built automatically in background once the memory grows over the size threshold, making recall fast even with millions of memories. Can be overridden per memory subdirectory with an ann.json file.",
+            "type": "select",
+            "value": settings["memory_index_type"],
+            "options": [
+                {"value": "flat", "label": "Flat (exact)"},
+                {"value": "ivf", "label": "IVF-Flat (approximate)"},
+                {"value": "hnsw", "label": "HNSW (approximate)"},
+            ],
+        }
+    )
+
+    memory_fields.append(
+        {
+            "id": "memory_index_min_size",
+            "title": "Approximate index size threshold",
+            "description": "Number of memories from which the approximate index is built. Smaller memories always use exact search.",
+            "type": "number",
+            "value": settings["memory_index_min_size"],
+        }
+    )
+
+    memory_fields.append(
+        {
+            "id": "memory_index_search_depth",
+            "title": "Approximate index search depth",
+            "description": "Recall/latency trade-off of the approximate index (nprobe for IVF-Flat, efSearch for HNSW). Higher values find more of the true nearest memories but are slower.",
+            "type": "number",
+            "value": settings["memory_index_search_depth"],
+        }
+    )
+
+    memory_fields.append(
+        {
+            "id": "memory_embedding_cache_mb",
+            "title": "Embedding cache size (MB)",
+            "description": "Maximum size of the persistent embedding cache shared by all memories. Least recently used embeddings are evicted when the cache grows over this size.",
+            "type": "number",
+            "value": settings["memory_embedding_cache_mb"],
+        }
+    )
+
+    memory_section: SettingsSection = {
+        "id": "memory",
+        "title": "Memory",
+        "description": "Settings for the memory vector database.",
+        "fields": memory_fields,
+        "tab": "agent",
+    }
+
     dev_fields: list[SettingsField] = []
 
     if runtime.is_development():
@@ -886,6 +1013,7 @@ def convert_out(settings: Settings) -> SettingsOutput:
             util_model_section,
             browser_model_section,
             embed_model_section,
+            memory_section,
             speech_section,
             api_keys_section,
             auth_section,
@@ -1038,6 +1166,7 @@ def get_default_settings() -> Settings:
         chat_model_ctx_length=100000,
         chat_model_ctx_history=0.7,
         chat_model_vision=True,
+        chat_model_prompt_cache=True,
         chat_model_rl_requests=0,
         chat_model_rl_input=0,
         chat_model_rl_output=0,
@@ -1050,6 +1179,9 @@ def get_default_settings() -> Settings:
         util_model_rl_requests=0,
         util_model_rl_input=0,
         util_model_rl_output=0,
+        util_model_cache=True,
+        util_model_cache_ttl_hours=168,
+        util_model_cache_semantic=False,
         embed_model_provider=ModelProvider.HUGGINGFACE.name,
         embed_model_name="sentence-transformers/all-MiniLM-L6-v2",
         embed_model_api_base="",
@@ -1068,6 +1200,12 @@ def get_default_settings() -> Settings:
         agent_prompts_subdir="agent0",
         agent_memory_subdir="default",
         agent_knowledge_subdir="custom",
+        agent_parallel_tools=False,
+        agent_subordinates_concurrency=3,
+        memory_index_type="flat",
+        memory_index_min_size=50000,
+        memory_index_search_depth=32,
+        memory_embedding_cache_mb=1024,
         rfc_auto_docker=True,
         rfc_url="localhost",
         rfc_password="",
@@ -1100,10 +1238,11 @@ def _apply_settings(previous: Settings | None):
         for ctx in AgentContext._contexts.values():
             ctx.config = config  # reinitialize context config with new settings
             # apply config to agents
-            agent = ctx.agent0
-            while agent:
+            agents = [ctx.agent0]
+            while agents:
+                agent = agents.pop()
                 agent.config = ctx.config
-                agent = agent.get_data(agent.DATA_NAME_SUBORDINATE)
+                agents += agent.get_subordinates()
 
         # reload whisper model if necessary
         if not previous or _settings["stt_model_size"] != previous["stt_model_size"]:
@@ -1111,16 +1250,40 @@ def _apply_settings(previous: Settings | None):
                 whisper.preload, _settings["stt_model_size"]
             )  # TODO overkill, replace with background task
 
-        # force memory reload on embedding model change
+        # force memory reload on embedding model or memory index change
         if not previous or (
             _settings["embed_model_name"] != previous["embed_model_name"]
             or _settings["embed_model_provider"] != previous["embed_model_provider"]
             or _settings["embed_model_kwargs"] != previous["embed_model_kwargs"]
+            or _settings["memory_index_type"] != previous["memory_index_type"]
+            or _settings["memory_index_min_size"] != previous["memory_index_min_size"]
+            or _settings["memory_index_search_depth"]
+            != previous["memory_index_search_depth"]
         ):
             from python.helpers.memory import reload as memory_reload
 
             memory_reload()
 
+        # resize embedding cache if necessary
+        if (
+            previous
+            and _settings["memory_embedding_cache_mb"]
+            != previous["memory_embedding_cache_mb"]
+        ):
+            from python.helpers.embedding_cache import set_max_mb
+
+            set_max_mb(_settings["memory_embedding_cache_mb"])
+
+        # update utility cache lifetime if necessary
+        if (
+            previous
+            and _settings["util_model_cache_ttl_hours"]
+            != previous["util_model_cache_ttl_hours"]
+        ):
+            from python.helpers.utility_cache import set_ttl_hours
+
+            set_ttl_hours(_settings["util_model_cache_ttl_hours"])
+
         # update mcp settings if necessary
         if not previous or _settings["mcp_servers"] != previous["mcp_servers"]:
             from python.helpers.mcp_handler import MCPConfig
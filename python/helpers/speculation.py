@@ -0,0 +1,87 @@
+import asyncio
+from typing import Any, Coroutine, Hashable
+
+from agent import Agent
+from python.helpers.log import Log, LogItem
+
+
+class DeferredLogItem:
+    """
+    Log item of speculative work. Its output is collected and only written to
+    the log once the result is used, discarded work leaves no item behind.
+    """
+
+    def __init__(self, log: Log, **kwargs):
+        self.log = log
+        self.kwargs = kwargs
+        self.item: LogItem | None = None
+
+    def update(self, **kwargs):
+        if self.item:
+            self.item.update(**kwargs)
+        else:
+            self.kwargs.update(kwargs)
+
+    def stream(self, **kwargs):
+        if self.item:
+            self.item.stream(**kwargs)
+        else:
+            for k, v in kwargs.items():
+                self.kwargs[k] = (self.kwargs.get(k) or "") + v
+
+    def show(self):
+        if not self.item:
+            self.item = self.log.log(**self.kwargs)
+
+
+class Speculation:
+    """
+    Work started ahead of time for an expected state of the agent.
+    The result is used only if the state at the time it is needed still matches
+    the key, otherwise the work is cancelled and done again on the critical path.
+    """
+
+    def __init__(
+        self, key: Hashable, task: asyncio.Task, log_item: DeferredLogItem | None
+    ):
+        self.key = key
+        self.task = task
+        self.log_item = log_item
+
+
+def start(
+    agent: Agent,
+    name: str,
+    key: Hashable,
+    coro: Coroutine[Any, Any, Any],
+    log_item: DeferredLogItem | None = None,
+):
+    cancel(agent, name)
+    agent.set_data(name, Speculation(key, asyncio.create_task(coro), log_item))
+
+
+def take(agent: Agent, name: str, key: Hashable) -> asyncio.Task | None:
+    speculation: Speculation | None = agent.get_data(name)
+    agent.set_data(name, None)
+    if not speculation:
+        return None
+    if speculation.key == key and not speculation.task.cancelled():
+        if speculation.log_item:
+            speculation.log_item.show()  # the result is used now, so is its output
+        return speculation.task
+    _discard(speculation.task)
+    return None
+
+
+def cancel(agent: Agent, name: str):
+    speculation: Speculation | None = agent.get_data(name)
+    if speculation:
+        _discard(speculation.task)
+        agent.set_data(name, None)
+
+
+def _discard(task: asyncio.Task):
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()  # retrieved, an unused failure is not reported as unhandled
@@ -1,9 +1,15 @@
+import math
 from typing import Literal
 import tiktoken
 
 APPROX_BUFFER = 1.1
 TRIM_BUFFER = 0.8
 
+# fast estimate, cl100k averages about 4 characters of english text or code per token
+CHARS_PER_TOKEN = 4.0
+NON_ASCII_WEIGHT = 1.5  # extra weight per additional utf-8 byte, multibyte scripts use more tokens
+EXACT_LIMIT_RATIO = 0.8  # estimates above this share of a limit are replaced by exact counts
+
 
 def count_tokens(text: str, encoding_name="cl100k_base") -> int:
     if not text:
@@ -25,6 +31,48 @@ def approximate_tokens(
     return int(count_tokens(text) * APPROX_BUFFER)
 
 
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return math.ceil(_estimate_weight(text) / CHARS_PER_TOKEN * APPROX_BUFFER)
+
+
+def approximate_tokens_for_limit(text: str, limit: int | float | None) -> int:
+    # cheap estimate while far from the limit, exact encoding only when it matters
+    estimate = estimate_tokens(text)
+    if limit and estimate >= limit * EXACT_LIMIT_RATIO:
+        return approximate_tokens(text)
+    return estimate
+
+
+class DeltaEstimator:
+    """
+    Running token estimate over a stream of text deltas without encoding them.
+    Counts returned for the deltas add up to the estimate of the whole text,
+    so tiny chunks do not accumulate rounding errors.
+    """
+
+    def __init__(self):
+        self.weight = 0.0
+        self.tokens = 0
+
+    def add(self, delta: str) -> int:
+        if not delta:
+            return 0
+        self.weight += _estimate_weight(delta)
+        total = math.ceil(self.weight / CHARS_PER_TOKEN * APPROX_BUFFER)
+        added = total - self.tokens
+        self.tokens = total
+        return added
+
+
+def _estimate_weight(text: str) -> float:
+    if text.isascii():
+        return len(text)
+    extra = len(text.encode("utf-8", errors="replace")) - len(text)
+    return len(text) + extra * NON_ASCII_WEIGHT
+
+
 def trim_to_tokens(
     text: str,
     max_tokens: int,
@@ -13,6 +13,9 @@ class Response:
 
 class Tool:
 
+    # safe to execute together with other calls from the same response
+    concurrent: bool = False
+
     def __init__(self, agent: Agent, name: str, method: str | None, args: dict[str,str], message: str, loop_data: LoopData | None, **kwargs) -> None:
         self.agent = agent
         self.name = name
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from python.helpers import files
+from python.helpers.print_style import PrintStyle
+
+CACHE_FILE = "memory/utility_cache.db"
+
+MAX_ENTRIES = 5000  # least recently used responses above this are evicted
+EVICT_TARGET_RATIO = 0.9  # evict a bit below the limit so not every insert evicts
+SEMANTIC_THRESHOLD = 0.97  # cosine similarity of messages to reuse a response
+SEMANTIC_CANDIDATES = 500  # most recent entries compared in the similarity tier
+SEMANTIC_MAX_CHARS = 1000  # longer messages differ in details a similar embedding misses
+
+
+class UtilityCache:
+    """
+    Persistent cache of utility model responses in a single SQLite file.
+    The exact tier is keyed by hash of the model, system prompt and message.
+    The optional semantic tier reuses a response for a message embedding close
+    enough to a cached one with the same model and system prompt.
+    Entries expire after the TTL, least recently used ones are evicted above the limit.
+    """
+
+    def __init__(self, path: str, ttl_hours: float, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, system TEXT NOT NULL, "
+            "response TEXT NOT NULL, embedding BLOB, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_model_system ON responses(model, system, created)"
+        )
+        self.conn.commit()
+        self.entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(model: str, system: str, message: str) -> str:
+        return _hash(model, system, message)
+
+    def get(self, model: str, system: str, message: str) -> str | None:
+        key = self.key(model, system, message)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response FROM responses WHERE key=? AND created>=?",
+                (key, self._oldest()),
+            ).fetchone()
+            if row:
+                self._touch(key)
+                self.hits += 1
+                return row[0]
+        return None
+
+    def get_similar(
+        self, model: str, system: str, embedding: list[float]
+    ) -> str | None:
+        query = _normalize(embedding)
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT key, response, embedding FROM responses "
+                "WHERE model=? AND system=? AND created>=? AND embedding IS NOT NULL "
+                "ORDER BY created DESC LIMIT ?",
+                (model, _hash(system), self._oldest(), SEMANTIC_CANDIDATES),
+            ).fetchall()
+            vectors = [np.frombuffer(blob, dtype=np.float32) for _, _, blob in rows]
+            # a changed embedding model leaves vectors of another size behind
+            candidates = [
+                (row, vector)
+                for row, vector in zip(rows, vectors)
+                if vector.shape == query.shape
+            ]
+            if candidates:
+                scores = np.stack([vector for _, vector in candidates]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= SEMANTIC_THRESHOLD:
+                    key, response, _ = candidates[best][0]
+                    self._touch(key)
+                    self.semantic_hits += 1
+                    return response
+        return None
+
+    def miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def set(
+        self,
+        model: str,
+        system: str,
+        message: str,
+        response: str,
+        embedding: list[float] | None = None,
+    ):
+        key = self.key(model, system, message)
+        blob = _normalize(embedding).tobytes() if embedding is not None else None
+        with self.lock:
+            now = time.time()
+            exists = self.conn.execute(
+                "SELECT 1 FROM responses WHERE key=?", (key,)
+            ).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, system, response, embedding, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, _hash(system), response, blob, now, now),
+            )
+            self.conn.commit()
+            if not exists:
+                self.entries += 1
+            if self.entries > self.max_entries:
+                self._evict()
+
+    def set_ttl_hours(self, ttl_hours: float):
+        with self.lock:
+            self.ttl = ttl_hours * 3600
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+            self.entries = 0
+
+    def stats(self) -> dict[str, int | float]:
+        with self.lock:
+            hits = self.hits + self.semantic_hits
+            total = hits + self.misses
+            return {
+                "entries": self.entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "evicted": self.evicted,
+            }
+
+    def _oldest(self) -> float:
+        return time.time() - self.ttl if self.ttl > 0 else 0.0
+
+    def _touch(self, key: str):
+        self.conn.execute(
+            "UPDATE responses SET accessed=? WHERE key=?", (time.time(), key)
+        )
+        self.conn.commit()
+
+    def _evict(self):
+        # expired entries first, then least recently used down to the target count
+        expired = self.conn.execute(
+            "DELETE FROM responses WHERE created<?", (self._oldest(),)
+        ).rowcount
+        target = int(self.max_entries * EVICT_TARGET_RATIO)
+        excess = max(0, self.entries - expired - target)
+        if excess:
+            self.conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+        self.conn.commit()
+        self.entries -= expired + excess
+        self.evicted += expired + excess
+        hits = self.hits + self.semantic_hits
+        total = hits + self.misses
+        PrintStyle.standard(
+            f"Utility cache evicted {expired + excess} entries ({expired} expired), "
+            f"{hits} hits, {self.misses} misses ({hits / total if total else 0.0:.0%})"
+        )
+
+
+_cache: UtilityCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> UtilityCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from python.helpers import settings
+
+            ttl_hours = settings.get_settings()["util_model_cache_ttl_hours"]
+            _cache = UtilityCache(files.get_abs_path(CACHE_FILE), ttl_hours)
+        return _cache
+
+
+def set_ttl_hours(ttl_hours: float):
+    # only applies to an already opened cache, a new one reads the settings
+    if _cache:
+        _cache.set_ttl_hours(ttl_hours)
+
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _normalize(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
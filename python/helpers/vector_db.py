@@ -8,7 +8,6 @@ import faiss
 
 
 from langchain_core.documents import Document
-from langchain.storage import InMemoryByteStore
 from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores.utils import (
     DistanceStrategy,
@@ -16,6 +15,7 @@ from langchain_community.vectorstores.utils import (
 from langchain.embeddings import CacheBackedEmbeddings
 
 from agent import Agent
+from python.helpers import embedding_cache
 
 
 class MyFaiss(FAISS):
@@ -46,11 +46,10 @@ class VectorDB:
             "default",
         )
         if namespace not in VectorDB._cached_embeddings:
-            store = InMemoryByteStore()
             VectorDB._cached_embeddings[namespace] = (
                 CacheBackedEmbeddings.from_bytes_store(
                     model,
-                    store,
+                    embedding_cache.get_cache(),
                     namespace=namespace,
                 )
             )
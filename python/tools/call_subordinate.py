@@ -1,10 +1,17 @@
+import asyncio
+import dataclasses
 from agent import Agent, UserMessage
+from python.helpers import errors, log
 from python.helpers.tool import Tool, Response
 
 
 class Delegation(Tool):
 
-    async def execute(self, message="", reset="", **kwargs):
+    async def execute(self, message="", reset="", tasks=None, **kwargs):
+        # multiple tasks are delegated to parallel subordinates
+        if isinstance(tasks, list) and tasks:
+            return await self.execute_parallel(tasks, kwargs.get("prompt_profile"))
+
         # create subordinate agent using the data object on this agent and set superior agent to his data object
         if (
             self.agent.get_data(Agent.DATA_NAME_SUBORDINATE) is None
@@ -33,10 +40,70 @@ class Delegation(Tool):
         # result
         return Response(message=result, break_loop=False)
 
+    async def execute_parallel(self, tasks: list, prompt_profile: str | None):
+        # every task gets a new subordinate with its own history and config copy
+        subordinates: list[tuple[Agent, str]] = []
+        for branch, task in enumerate(tasks, start=1):
+            if isinstance(task, dict):
+                message = str(task.get("message", ""))
+                profile = task.get("prompt_profile") or prompt_profile
+            else:
+                message = str(task)
+                profile = prompt_profile
+            config = dataclasses.replace(
+                self.agent.config, prompts_subdir=profile or "default"
+            )
+            sub = Agent(self.agent.number + 1, config, self.agent.context)
+            sub.set_branch(branch)
+            sub.set_data(Agent.DATA_NAME_SUPERIOR, self.agent)
+            subordinates.append((sub, message))
+        self.agent.set_data(
+            Agent.DATA_NAME_SUBORDINATES, [sub for sub, _ in subordinates]
+        )
+
+        semaphore = asyncio.Semaphore(max(1, self.agent.config.subordinates_concurrency))
+        # branches being run, the context delivers user interventions to each of them
+        running: list[Agent] = []
+        self.agent.set_data(Agent.DATA_NAME_BRANCHES, running)
+
+        async def run(sub: Agent, message: str) -> str:
+            async with semaphore:
+                # runs in its own task, log items of this branch are labeled with its name
+                log.current_agent.set(sub.agent_name)
+                sub.hist_add_user_message(UserMessage(message=message, attachments=[]))
+                running.append(sub)
+                try:
+                    return await sub.monologue()
+                finally:
+                    running.remove(sub)
+
+        try:
+            results = await asyncio.gather(
+                *[run(sub, message) for sub, message in subordinates],
+                return_exceptions=True,
+            )
+        finally:
+            self.agent.set_data(Agent.DATA_NAME_BRANCHES, None)
+
+        # results in the order of tasks
+        parts = []
+        for (sub, _), result in zip(subordinates, results):
+            if isinstance(result, asyncio.CancelledError):
+                raise result
+            if isinstance(result, BaseException):
+                result = f"Subordinate failed: {errors.format_error(result)}"
+            parts.append(f"## {sub.agent_name}\n{result}")
+        return Response(message="\n\n".join(parts), break_loop=False)
+
     def get_log_object(self):
+        tasks = self.args.get("tasks") if isinstance(self.args, dict) else None
+        if isinstance(tasks, list) and tasks:
+            heading = f"icon://communication Father Ted: Calling {len(tasks)} Subordinate Agents"
+        else:
+            heading = f"icon://communication Father Ted: Calling Subordinate Agent"
         return self.agent.context.log.log(
             type="tool",
-            heading=f"icon://communication Father Ted: Calling Subordinate Agent",
+            heading=heading,
             content="",
             kvps=self.args,
-        )
\ No newline at end of file
+        )
@@ -3,6 +3,7 @@ from python.helpers.document_query import DocumentQueryHelper
 
 
 class DocumentQueryTool(Tool):
+    concurrent = True
 
     async def execute(self, **kwargs):
         document_uri = kwargs["document"] or None
@@ -10,6 +10,7 @@ SEARCH_ENGINE_RESULTS = 10
 
 
 class SearchEngine(Tool):
+    concurrent = True
     async def execute(self, query="", **kwargs):
 
 
@@ -15,7 +15,7 @@ import initialize
 from python.helpers import errors, files, git, mcp_server
 from python.helpers.files import get_abs_path
 from python.helpers import runtime, dotenv, process
-from python.helpers.extract_tools import load_classes_from_folder
+from python.helpers.extract_tools import load_classes_from_folder, watch_class_folders
 from python.helpers.api import ApiHandler
 from python.helpers.print_style import PrintStyle
 
@@ -235,6 +235,9 @@ def run():
     process.set_server(server)
     server.log_startup()
 
+    # exit normally on termination so exit handlers flush scheduled chat saves
+    signal.signal(signal.SIGTERM, lambda signum, frame: process.exit_process())
+
     # Start init_a0 in a background thread when server starts
     # threading.Thread(target=init_a0, daemon=True).start()
     init_a0()
@@ -247,8 +250,14 @@ def init_a0():
     # initialize contexts and MCP
     init_chats = initialize.initialize_chats()
     initialize.initialize_mcp()
+    # warm up memory in background, keep a reference so the task is not killed
+    global init_memory
+    init_memory = initialize.initialize_memory()
     # start job loop
     initialize.initialize_job_loop()
+    # pick up changed extensions and tools without restart when developing
+    if runtime.is_development():
+        watch_class_folders()
     # preload
     initialize.initialize_preload()
 
@@ -0,0 +1,65 @@
+import asyncio
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("webcolors")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from python.helpers.embedding_worker import EmbeddingWorker
+
+
+class SlowModel:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def encode(self, texts, convert_to_numpy=True):
+        time.sleep(self.delay)
+        return np.ones((len(texts), 3), dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 3
+
+
+def create_worker(delay: float) -> EmbeddingWorker:
+    # skip loading sentence-transformers, the worker thread is what is tested
+    worker = EmbeddingWorker.__new__(EmbeddingWorker)
+    worker.model_name = "test"
+    worker.model = SlowModel(delay)
+    worker.requests = queue.Queue()
+    worker.thread = threading.Thread(target=worker._run, daemon=True)
+    worker.thread.start()
+    return worker
+
+
+def test_cancelled_aencode_does_not_stop_worker():
+    worker = create_worker(delay=0.2)
+
+    async def cancel_in_flight():
+        task = asyncio.create_task(worker.aencode(["a", "b"]))
+        await asyncio.sleep(0.05)  # batch is being encoded now
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_in_flight())
+
+    result = worker.submit(["c"]).result(timeout=5)
+    assert result.shape == (1, 3)
+    assert worker.thread.is_alive()
+
+
+def test_cancelled_request_is_skipped():
+    worker = create_worker(delay=0.2)
+    first = worker.submit(["a"])
+    time.sleep(0.05)  # first batch is being encoded
+    queued = worker.submit(["b"])
+    assert queued.cancel()
+    assert worker.submit(["c"]).result(timeout=5).shape == (1, 3)
+    assert first.result(timeout=5).shape == (1, 3)
@@ -0,0 +1,34 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("regex")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from python.helpers.extract_tools import json_parse_dirty
+
+CALLS = [
+    {"tool_name": "search_engine", "tool_args": {"query": "dogs"}},
+    {"tool_name": "memory_load", "tool_args": {"query": "cats", "limit": 3}},
+]
+
+
+def test_compact_tool_calls_array():
+    message = json.dumps({"tool_calls": CALLS}, separators=(",", ":"))
+    assert json_parse_dirty(message) == {"tool_calls": CALLS}
+
+
+def test_pretty_tool_calls_array_with_surrounding_text():
+    message = "Calling tools:\n" + json.dumps({"tool_calls": CALLS}, indent=4) + "\ndone"
+    assert json_parse_dirty(message) == {"tool_calls": CALLS}
+
+
+def test_dirty_json_still_repaired():
+    message = "{tool_name: 'response', tool_args: {text: 'hi'},}"
+    assert json_parse_dirty(message) == {
+        "tool_name": "response",
+        "tool_args": {"text": "hi"},
+    }
@@ -0,0 +1,58 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+recall = pytest.importorskip(
+    "python.extensions.message_loop_prompts_after._50_recall_memories"
+)
+
+from agent import LoopData
+from python.helpers import speculation
+from python.helpers.history import History
+
+
+class FakeAgent:
+    def __init__(self):
+        self.data = {}
+        self.history = History(self)
+
+    def get_data(self, field: str):
+        return self.data.get(field)
+
+    def set_data(self, field: str, value):
+        self.data[field] = value
+
+
+async def speculate_then_take(add_messages: bool):
+    agent = FakeAgent()
+    extension = recall.RecallMemories(agent)  # type: ignore
+    loop_data = LoopData()
+    loop_data.user_message = agent.history.add_message(False, "find my notes")
+
+    speculation.start(
+        agent,  # type: ignore
+        recall.DATA_NAME_SPECULATION,
+        extension.get_key(loop_data, 3),
+        asyncio.sleep(0, "query"),
+    )
+    if add_messages:
+        # response and tool result of the iteration the search started in
+        agent.history.add_message(True, "calling a tool")
+        agent.history.add_message(False, "tool result")
+
+    task = speculation.take(
+        agent, recall.DATA_NAME_SPECULATION, extension.get_key(loop_data, 3)  # type: ignore
+    )
+    return await task if task else None
+
+
+def test_speculation_used_when_history_unchanged():
+    assert asyncio.run(speculate_then_take(add_messages=False)) == "query"
+
+
+def test_stale_speculation_rejected_after_messages_added():
+    assert asyncio.run(speculate_then_take(add_messages=True)) is None
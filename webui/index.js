@@ -228,8 +228,8 @@ function updateUserTime() {
 updateUserTime();
 setInterval(updateUserTime, 1000);
 
-function setMessage(id, type, heading, content, temp, kvps = null) {
-  const result = msgs.setMessage(id, type, heading, content, temp, kvps);
+function setMessage(id, type, heading, content, temp, kvps = null, agent = null) {
+  const result = msgs.setMessage(id, type, heading, content, temp, kvps, agent);
   if (autoScroll) chatHistory.scrollTop = chatHistory.scrollHeight;
   return result;
 }
@@ -360,7 +360,8 @@ async function poll() {
           log.heading,
           log.content,
           log.temp,
-          log.kvps
+          log.kvps,
+          log.agent
         );
       }
       afterMessagesUpdate(response.logs);
@@ -369,7 +370,13 @@ async function poll() {
     lastLogVersion = response.log_version;
     lastLogGuid = response.log_guid;
 
-    updateProgress(response.log_progress, response.log_progress_active);
+    if (!response.log_progress_active && response.memory_status === "loading") {
+      updateProgress("Loading memory...", true);
+    } else if (!response.log_progress_active && response.memory_status === "migrating") {
+      updateProgress("Re-indexing memory for new embedding model...", true);
+    } else {
+      updateProgress(response.log_progress, response.log_progress_active);
+    }
 
     //set ui model vars from backend
     if (window.Alpine && inputSection) {
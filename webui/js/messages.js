@@ -9,7 +9,10 @@ const chatHistory = document.getElementById("chat-history");
 
 let messageGroup = null;
 
-export function setMessage(id, type, heading, content, temp, kvps = null) {
+export function setMessage(id, type, heading, content, temp, kvps = null, agent = null) {
+  // messages of parallel subordinates are labeled with the agent name
+  if (agent && heading) heading = `${agent}: ${heading}`;
+
   // Search for the existing message container by id
   let messageContainer = document.getElementById(`message-${id}`);
 
@@ -57,12 +60,14 @@ export function setMessage(id, type, heading, content, temp, kvps = null) {
     if (
       !messageGroup || // no group yet exists
       groupStart[type] || // message type forces new group
-      groupType != messageGroup.getAttribute("data-group-type") // message type changes group
+      groupType != messageGroup.getAttribute("data-group-type") || // message type changes group
+      (agent || "") != (messageGroup.getAttribute("data-agent") || "") // another parallel agent
     ) {
       messageGroup = document.createElement("div");
       messageGroup.id = `message-group-${id}`;
       messageGroup.classList.add(`message-group`, `message-group-${groupType}`);
       messageGroup.setAttribute("data-group-type", groupType);
+      if (agent) messageGroup.setAttribute("data-agent", agent);
     }
 
     messageGroup.appendChild(messageContainer);